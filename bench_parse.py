@@ -0,0 +1,176 @@
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+from fixtures import FIXTURES_DIR, load_fixtures, read_fixture
+from pao_api import product_record as linx_product_record
+from parsing import SpecParser, available_backends
+from retailer_specs import SPECS
+from vtex_api import CATALOG_SEARCH_PATH, INTELLIGENT_SEARCH_PATH, product_record
+
+# Replays the recorded fixture corpus (see fixtures.py) through each retailer's
+# extraction code and reports records/sec, ms per page and peak memory. Runs offline,
+# so it can go in CI:
+#
+#   python bench_parse.py                              # every retailer, every installed backend
+#   python bench_parse.py santaluzia -b lxml -r 20
+#   python bench_parse.py --baseline bench_baseline.json --save-baseline
+#   python bench_parse.py --baseline bench_baseline.json   # fails on >50% slowdowns
+#
+# It exits non-zero when a fixture yields a different number of records than were
+# extracted when it was recorded (selector breakage) or when ms/page regresses past
+# --tolerance times the baseline. With no fixtures recorded it says so and exits 0,
+# unless a --baseline is given: a baseline check with nothing to check is a failure.
+
+DEFAULT_REPEAT = 5
+DEFAULT_TOLERANCE = 1.5
+
+
+def base_url_for(fixture):
+    # Links are resolved against what the scraper had when it recorded the fixture: the
+    # page's own URL, or for API responses the store root the API hangs off (Angeloni's
+    # is www.angeloni.com.br/super, not the spec's base_url)
+    default = SPECS[fixture.retailer]["base_url"] if fixture.retailer in SPECS else ""
+    if not fixture.url:
+        return default
+    if fixture.kind == "html":
+        return fixture.url
+    for path in (INTELLIGENT_SEARCH_PATH, CATALOG_SEARCH_PATH):
+        if path in fixture.url:
+            return fixture.url.partition(path)[0]
+    return default
+
+
+def extractor_for(retailer, kind, backend):
+    # Returns a function (content, base_url) -> records for one fixture kind
+    if kind == "vtex":
+        return lambda payload, base_url: [product_record(p, base_url) for p in payload["products"]]
+    if kind == "vtex-catalog":
+        return lambda payload, base_url: [product_record(p, base_url) for p in payload]
+    if kind == "linx":
+        return lambda payload, base_url: [linx_product_record(p) for p in payload["products"]]
+    parser = SpecParser(SPECS[retailer], backend)
+    return lambda html, base_url: parser.records(parser.parse(html), base_url)
+
+
+def check_records(fixture, records):
+    # Same count and same leading records as when the page was recorded
+    problems = []
+    if fixture.expected_records is not None and len(records) != fixture.expected_records:
+        problems.append(f"expected {fixture.expected_records} records, got {len(records)}")
+    for expected, actual in zip(fixture.sample, records):
+        if expected.get("description") != actual.get("description"):
+            problems.append(f"description changed: {expected.get('description')!r} -> {actual.get('description')!r}")
+            break
+    return problems
+
+
+def bench_group(retailer, kind, backend, fixtures, repeat):
+    extract = extractor_for(retailer, kind, backend)
+    contents = [read_fixture(fixture) for fixture in fixtures]
+    base_urls = [base_url_for(fixture) for fixture in fixtures]
+
+    # Warm up once so one-off initialisation (selector compilation, lazy imports) isn't measured
+    extract(contents[0], base_urls[0])
+
+    problems = []
+    records = 0
+    tracemalloc.start()
+    for fixture, content, base_url in zip(fixtures, contents, base_urls):
+        result = extract(content, base_url)
+        records += len(result)
+        problems.extend(f"{fixture.path}: {p}" for p in check_records(fixture, result))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Timing runs are separate from the memory run, since tracemalloc slows everything down
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        for content, base_url in zip(contents, base_urls):
+            extract(content, base_url)
+    elapsed = time.perf_counter() - start_time
+
+    pages = len(fixtures) * repeat
+    return {
+        "retailer": retailer,
+        "kind": kind,
+        "backend": backend if kind == "html" else "json",
+        "pages": len(fixtures),
+        "records": records,
+        "ms_per_page": round(elapsed * 1000 / pages, 3),
+        "records_per_sec": round(records * repeat / elapsed, 1) if elapsed else 0.0,
+        "peak_kib": round(peak / 1024, 1),
+        "problems": problems,
+    }
+
+
+def run(retailers, backends, repeat, fixtures_dir):
+    fixtures = [f for f in load_fixtures(fixtures_dir=fixtures_dir) if not retailers or f.retailer in retailers]
+    groups = {}
+    for fixture in fixtures:
+        groups.setdefault((fixture.retailer, fixture.kind), []).append(fixture)
+
+    results = []
+    for (retailer, kind), group in sorted(groups.items()):
+        if kind == "html" and retailer not in SPECS:
+            print(f"Skipping {retailer}: no selectors in retailer_specs.py")
+            continue
+        for backend in (backends if kind == "html" else [None]):
+            results.append(bench_group(retailer, kind, backend, group, repeat))
+    return results
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    regressions = []
+    for result in results:
+        key = f"{result['retailer']}/{result['kind']}/{result['backend']}"
+        previous = baseline.get(key)
+        if previous and result["ms_per_page"] > previous * tolerance:
+            regressions.append(f"{key}: {result['ms_per_page']} ms/page vs baseline {previous}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark extraction against recorded fixtures")
+    parser.add_argument("retailers", nargs="*", help="retailers to benchmark (default: all with fixtures)")
+    parser.add_argument("-b", "--backend", action="append", help="parser backend(s) (default: all installed)")
+    parser.add_argument("-r", "--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--baseline", help="JSON file with ms/page per retailer/kind/backend")
+    parser.add_argument("--save-baseline", action="store_true", help="write this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = run(args.retailers, args.backend or available_backends(), args.repeat, args.fixtures)
+    if not results:
+        # Nothing to check is only fine when nothing was asked to be checked; a baseline
+        # run without fixtures (a wrong --fixtures path in CI, say) must not pass silently
+        print(f"No fixtures found in {args.fixtures}, nothing to benchmark. Record some with SCRAPER_RECORD_FIXTURES=1.")
+        sys.exit(1 if args.baseline else 0)
+
+    print(f"{'retailer':<12} {'backend':<12} {'pages':>5} {'records':>8} {'ms/page':>9} {'records/s':>10} {'peak KiB':>9}")
+    for r in results:
+        print(f"{r['retailer']:<12} {r['backend']:<12} {r['pages']:>5} {r['records']:>8} "
+              f"{r['ms_per_page']:>9.3f} {r['records_per_sec']:>10.1f} {r['peak_kib']:>9.1f}")
+
+    failures = [problem for r in results for problem in r["problems"]]
+
+    if args.baseline:
+        if args.save_baseline:
+            with open(args.baseline, "w", encoding="utf-8") as f:
+                json.dump({f"{r['retailer']}/{r['kind']}/{r['backend']}": r["ms_per_page"] for r in results}, f, indent=2)
+            print(f"Baseline saved to '{args.baseline}'")
+        else:
+            with open(args.baseline, encoding="utf-8") as f:
+                failures.extend(compare_to_baseline(results, json.load(f), args.tolerance))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,161 @@
+import os
+
+from selenium.common.exceptions import WebDriverException
+
+from fixtures import record_html, recording_enabled
+from metrics import count_page, span
+
+# Runs a retailer's selectors inside the page with execute_script and returns a compact
+# list of {description, price, url} records, instead of transferring the whole
+# driver.page_source (several MB after "Mostrar mais") and re-parsing it in Python.
+#
+# Each scraper describes its product cards with a small spec:
+#
+#   {
+#       "item": "div.product-card",                  # one element per product
+#       "description": ["span.productBrand", ...],    # first selector that matches ("" = the item)
+#       "description_attr": "data-product-name",      # ...or an attribute of the item itself
+#       "price": ["span.int", "span.dec", "span.frac"],  # parts concatenated; all must exist
+#       "price_strip": ["R$"],                        # substrings removed from the price
+#       "url": "a[href]",                             # link inside the item ("" = the item itself)
+#       "url_closest": "a",                           # ...or the closest ancestor matching this
+#       "url_attr": "href",                           # attribute holding the link (default href)
+#       "url_fallback": "a.product-link",             # link inside the item used if the above is empty
+#   }
+#
+# Missing values come back as None. Parsing page_source with the same spec (parsing.py)
+# stays available as the fallback: SCRAPER_EXTRACT=soup forces it, and the scrapers
+# also use it if the script fails. The spec's "strainer" key is only used by parsing.py.
+
+EXTRACT_MODE = os.environ.get("SCRAPER_EXTRACT", "js")
+
+# Shared by the scripts below: builds one {description, price, url} record from a card
+_RECORD_JS = """
+function first(root, selectors) {
+    for (var i = 0; i < selectors.length; i++) {
+        var el = selectors[i] === '' ? root : root.querySelector(selectors[i]);
+        if (el) { return el; }
+    }
+    return null;
+}
+function text(el) {
+    return el ? el.textContent.replace(/\\s+/g, ' ').trim() : null;
+}
+function absolute(value) {
+    if (!value) { return null; }
+    try { return new URL(value, location.href).href; } catch (e) { return value; }
+}
+
+function record(spec, item) {
+    var description = null;
+    if (spec.description_attr) {
+        description = item.getAttribute(spec.description_attr);
+    } else if (spec.description) {
+        description = text(first(item, spec.description));
+    }
+
+    var price = null;
+    if (spec.price) {
+        var parts = [];
+        for (var p = 0; p < spec.price.length; p++) {
+            var part = item.querySelector(spec.price[p]);
+            if (!part) { parts = null; break; }
+            parts.push(text(part));
+        }
+        if (parts) {
+            price = parts.join('');
+            (spec.price_strip || []).forEach(function (s) { price = price.split(s).join(''); });
+            price = price.replace(/\\u00a0/g, '').trim();
+        }
+    }
+
+    var link = null;
+    if (spec.url_closest) {
+        link = item.closest(spec.url_closest);
+    } else if (spec.url === '') {
+        link = item;
+    } else if (spec.url) {
+        link = item.querySelector(spec.url);
+    }
+    var url = link ? absolute(link.getAttribute(spec.url_attr || 'href')) : null;
+    if (!url && spec.url_fallback) {
+        var fallback = item.querySelector(spec.url_fallback);
+        url = fallback ? absolute(fallback.getAttribute('href')) : null;
+    }
+
+    return {description: description, price: price, url: url};
+}
+"""
+
+_EXTRACT_JS = _RECORD_JS + """
+var spec = arguments[0];
+var records = [];
+var items = document.querySelectorAll(spec.item);
+for (var i = 0; i < items.length; i++) {
+    records.push(record(spec, items[i]));
+}
+return records;
+"""
+
+# Only the cards not harvested yet, for pages that keep appending cards ("Mostrar mais").
+# Cards are flagged with a JS property rather than an attribute, so harvesting doesn't
+# count as a DOM mutation for wait_for_dom_quiet().
+_HARVEST_JS = _RECORD_JS + """
+var spec = arguments[0];
+var records = [];
+var items = document.querySelectorAll(spec.item);
+for (var i = 0; i < items.length; i++) {
+    if (items[i].__harvested) { continue; }
+    items[i].__harvested = true;
+    records.push(record(spec, items[i]));
+}
+return records;
+"""
+
+# How many cards have not been harvested yet
+_PENDING_JS = """
+var items = document.querySelectorAll(arguments[0]);
+var pending = 0;
+for (var i = 0; i < items.length; i++) {
+    if (!items[i].__harvested) { pending++; }
+}
+return pending;
+"""
+
+
+def use_browser_extraction():
+    return EXTRACT_MODE != "soup"
+
+
+def extract_in_browser(driver, spec):
+    # Returns the records, or None if the script could not run (callers then fall back to soup)
+    try:
+        with span("extraction", spec.get("retailer")):
+            records = driver.execute_script(_EXTRACT_JS, spec)
+    except WebDriverException as e:
+        print(f"In-browser extraction failed ({e.msg}), falling back to parsing page_source.")
+        return None
+    if not isinstance(records, list):
+        return None
+    count_page(len(records), spec.get("retailer"))
+    if recording_enabled() and spec.get("retailer"):
+        # Keep the rendered page with what we extracted from it, for bench_parse.py
+        record_html(spec["retailer"], driver.current_url, driver.page_source, records)
+    return records
+
+
+def harvest_in_browser(driver, spec):
+    # Records of the cards that appeared since the last call (every card the first time),
+    # or None if the script could not run
+    try:
+        with span("extraction", spec.get("retailer")):
+            records = driver.execute_script(_HARVEST_JS, spec)
+    except WebDriverException as e:
+        print(f"In-browser harvesting failed ({e.msg}).")
+        return None
+    return records if isinstance(records, list) else None
+
+
+def pending_cards(driver, spec):
+    # Cards on the page that harvest_in_browser() hasn't returned yet
+    return driver.execute_script(_PENDING_JS, spec["item"])
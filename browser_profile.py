@@ -0,0 +1,220 @@
+import json
+import os
+import threading
+import urllib.parse
+
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+
+from metrics import add_bytes
+
+# Lean Chrome profile for the scrapers. We only ever read text and hrefs, so:
+#   - Chrome runs headless unless SCRAPER_HEADLESS=0
+#   - images, fonts and media are blocked through CDP (Network.setBlockedURLs)
+#   - ad / analytics trackers are blocked from the browser's first page on, and for
+#     retailers with a declared allowlist any other third-party host seen on a page is
+#     blocked from the next page on, in every browser of the process
+#   - the performance log is used to count what was transferred (measured, from
+#     Network.loadingFinished) and what was blocked; a blocked request never says how
+#     big it would have been, so the bytes it saved are only ever an estimate
+#
+# driver_pool.py builds its browsers with build_options() and keeps a BrowserProfile
+# per browser, applied when a job checks the browser out for a retailer.
+# SCRAPER_BLOCK_RESOURCES=0 turns the resource blocking off (trackers stay blocked).
+
+HEADLESS = os.environ.get("SCRAPER_HEADLESS", "1") == "1"
+BLOCK_RESOURCES = os.environ.get("SCRAPER_BLOCK_RESOURCES", "1") == "1"
+
+BLOCKED_EXTENSIONS = [
+    "jpg", "jpeg", "png", "gif", "webp", "avif", "svg", "ico", "bmp",
+    "woff", "woff2", "ttf", "otf", "eot",
+    "mp4", "webm", "ogg", "mp3", "m3u8",
+]
+
+TRACKER_DOMAINS = [
+    "google-analytics.com", "googletagmanager.com", "googleadservices.com", "doubleclick.net",
+    "googlesyndication.com", "facebook.net", "facebook.com", "connect.facebook.net",
+    "hotjar.com", "clarity.ms", "bing.com", "tiktok.com", "analytics.tiktok.com",
+    "criteo.com", "criteo.net", "rtbhouse.com", "taboola.com", "outbrain.com",
+    "newrelic.com", "nr-data.net", "sentry.io", "onesignal.com", "zendesk.com",
+    "zopim.com", "blip.ai", "smartsuppchat.com", "rdstation.com.br", "hubspot.com",
+    "youtube.com", "ytimg.com", "pinterest.com", "linkedin.com", "snapchat.com",
+    "adnxs.com", "amazon-adsystem.com", "adsrvr.org", "pubmatic.com", "rubiconproject.com",
+    "casalemedia.com", "smartadserver.com", "scorecardresearch.com", "quantserve.com",
+]
+
+# Third-party hosts each retailer needs for its listing to render (suffix match).
+# Retailers listed here get every other third-party host blocked once it has been seen.
+THIRD_PARTY_ALLOWLIST = {
+    "angeloni": ["vtexassets.com", "vteximg.com.br", "vtex.com.br", "vtexcommercestable.com.br"],
+    "aurora": ["vtexassets.com", "vteximg.com.br", "vtex.com.br", "vtexcommercestable.com.br"],
+    "santaluzia": ["vtexassets.com", "vteximg.com.br", "vtex.com.br", "vtexcommercestable.com.br"],
+    "zonasul": ["vtexassets.com", "vteximg.com.br", "vtex.com.br", "vtexcommercestable.com.br"],
+    "pao": ["gpa.digital", "linximpulse.com", "gpasa.com.br"],
+    "mistral": ["algolia.net", "algolianet.com", "algolia.io"],
+    # Loja Integrada's CDN: product images, and the store's own scripts and styles
+    "karamell": ["awsli.com.br"],
+}
+
+# Typical transfer size of what we block, used to estimate the bytes saved
+ESTIMATED_BYTES = {"Image": 40_000, "Font": 30_000, "Media": 500_000, "Script": 60_000, "Other": 5_000}
+
+RESOURCE_TYPES_BY_EXTENSION = {
+    **{ext: "Image" for ext in ["jpg", "jpeg", "png", "gif", "webp", "avif", "svg", "ico", "bmp"]},
+    **{ext: "Font" for ext in ["woff", "woff2", "ttf", "otf", "eot"]},
+    **{ext: "Media" for ext in ["mp4", "webm", "ogg", "mp3", "m3u8"]},
+}
+
+
+def build_options(headless=HEADLESS):
+    options = Options()
+    if headless:
+        options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--disable-notifications")
+    options.add_argument("--mute-audio")
+    options.add_argument("--no-first-run")
+    # Same effect as --start-maximized, but also works headless
+    options.add_argument("--window-size=1920,1080")
+    if BLOCK_RESOURCES:
+        # Belt and braces for images: Chrome won't even decode them
+        options.add_argument("--blink-settings=imagesEnabled=false")
+    options.page_load_strategy = "eager"
+    # Needed to read Network.* events back for the byte counters
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return options
+
+
+def _host(url):
+    return urllib.parse.urlparse(url).netloc.split(":")[0].lower()
+
+
+def _matches(host, domains):
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+
+class ResourceStats:
+    # Per-retailer counters, shared by every browser in the process
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.by_retailer = {}
+
+    def add(self, retailer, requests=0, bytes_transferred=0, blocked=0, estimated_bytes_saved=0):
+        with self._lock:
+            stats = self.by_retailer.setdefault(retailer, {
+                "requests": 0, "bytes_transferred": 0, "blocked": 0, "estimated_bytes_saved": 0,
+            })
+            stats["requests"] += requests
+            stats["bytes_transferred"] += bytes_transferred
+            stats["blocked"] += blocked
+            stats["estimated_bytes_saved"] += estimated_bytes_saved
+
+    def summary(self):
+        with self._lock:
+            return {retailer: dict(stats) for retailer, stats in self.by_retailer.items()}
+
+    def print_summary(self):
+        for retailer, stats in sorted(self.summary().items()):
+            print(f"[{retailer}] {stats['requests']} requests, "
+                  f"{stats['bytes_transferred'] / 1024:.0f} KiB transferred, "
+                  f"{stats['blocked']} blocked (an estimated {stats['estimated_bytes_saved'] / 1024:.0f} KiB saved)")
+
+
+resource_stats = ResourceStats()
+
+# Third-party hosts learned per retailer, shared by every browser: a browser's first
+# page for a retailer already has what the others learned blocked
+_learned_blocks = {}
+_learned_lock = threading.Lock()
+
+
+def learned_blocks(retailer):
+    with _learned_lock:
+        return set(_learned_blocks.get(retailer, ()))
+
+
+def learn_block(retailer, host):
+    with _learned_lock:
+        _learned_blocks.setdefault(retailer, set()).add(host)
+
+
+class BrowserProfile:
+    # Blocking state for one browser: which retailer it is serving and which
+    # third-party hosts it has learned to block
+    def __init__(self, driver):
+        # The trackers are blocked right away, before the browser loads anything
+        self.driver = driver
+        self.retailer = None
+        self.first_party = set()
+        self.learned_blocks = set()
+        self.apply(None)
+
+    def patterns(self):
+        urls = []
+        if BLOCK_RESOURCES:
+            urls += [f"*.{ext}" for ext in BLOCKED_EXTENSIONS]
+            urls += [f"*.{ext}?*" for ext in BLOCKED_EXTENSIONS]
+        # Anchored to the host (and its subdomains), so a first-party URL that merely
+        # mentions a tracker in its query string isn't blocked
+        urls += [pattern for domain in TRACKER_DOMAINS for pattern in (f"*://{domain}/*", f"*://*.{domain}/*")]
+        urls += [f"*://{host}/*" for host in sorted(self.learned_blocks)]
+        return urls
+
+    def apply(self, retailer, base_url=None):
+        if retailer != self.retailer:
+            self.retailer = retailer
+            self.learned_blocks = learned_blocks(retailer)
+            self.first_party = {_host(base_url).removeprefix("www.")} if base_url else set()
+        try:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.patterns()})
+        except WebDriverException as e:
+            print(f"Could not enable resource blocking: {e.msg}")
+
+    def collect(self):
+        # Drain the performance log into the counters, and learn third-party hosts to block
+        try:
+            entries = self.driver.get_log("performance")
+        except WebDriverException:
+            return
+        # Bytes are what Chrome reports for the requests it let through; for the
+        # blocked ones there is nothing to measure, only the estimate
+        requests = {}
+        transferred = 0
+        blocked = 0
+        saved = 0
+        for entry in entries:
+            message = json.loads(entry["message"])["message"]
+            method = message.get("method")
+            params = message.get("params", {})
+            if method == "Network.requestWillBeSent":
+                url = params.get("request", {}).get("url", "")
+                requests[params.get("requestId")] = (url, params.get("type", "Other"))
+                self._learn(url)
+            elif method == "Network.loadingFinished":
+                transferred += params.get("encodedDataLength", 0)
+            elif method == "Network.loadingFailed" and params.get("blockedReason"):
+                blocked += 1
+                url, resource_type = requests.get(params.get("requestId"), ("", params.get("type", "Other")))
+                extension = urllib.parse.urlparse(url).path.rsplit(".", 1)[-1].lower()
+                resource_type = RESOURCE_TYPES_BY_EXTENSION.get(extension, resource_type)
+                saved += ESTIMATED_BYTES.get(resource_type, ESTIMATED_BYTES["Other"])
+        resource_stats.add(self.retailer or "unknown", len(requests), transferred, blocked, saved)
+        add_bytes(transferred, "browser", self.retailer)
+        if self.retailer:
+            self.learned_blocks |= learned_blocks(self.retailer)
+            if self.learned_blocks:
+                self.apply(self.retailer)
+
+    def _learn(self, url):
+        allowlist = THIRD_PARTY_ALLOWLIST.get(self.retailer)
+        host = _host(url)
+        if allowlist is None or not host or not url.startswith("http"):
+            return
+        if _matches(host, self.first_party) or _matches(host, allowlist) or host in self.learned_blocks:
+            return
+        self.learned_blocks.add(host)
+        learn_block(self.retailer, host)
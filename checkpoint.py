@@ -0,0 +1,169 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+# Checkpoints for multi-page scrapes, so a run that dies halfway (Chrome crash, network
+# drop, timeout) continues where it stopped instead of starting over. A scrape is split
+# into work units ("adega/page=3"); each finished unit is saved with what it extracted,
+# and a rerun hands the saved result back instead of fetching the unit again:
+#
+#   checkpoint = Checkpoint("santaluzia")
+#   products = checkpoint.run("adega/page=3", lambda: fetch_page(...))
+#   ...
+#   checkpoint.finish()     # whole scrape written out: the next run starts fresh
+#
+# Units are only saved once they finish, so an interrupted unit is fetched again.
+# Unfinished state older than SCRAPER_CHECKPOINT_MAX_AGE seconds is thrown away rather
+# than resumed (prices move), and SCRAPER_RESUME=0 always starts from scratch.
+#
+#   python checkpoint.py                  # what each retailer would resume from
+#   python checkpoint.py --clear aurora
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CHECKPOINT_PATH = os.environ.get("SCRAPER_CHECKPOINTS", os.path.join(HERE, ".cache", "checkpoints.db"))
+MAX_AGE = float(os.environ.get("SCRAPER_CHECKPOINT_MAX_AGE", str(24 * 3600)))
+RESUME = os.environ.get("SCRAPER_RESUME", "1") != "0"
+
+PENDING = "pending"
+DONE = "done"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    retailer TEXT NOT NULL,
+    unit TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    started_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (retailer, unit)
+) WITHOUT ROWID;
+"""
+
+
+def connect(path=None):
+    path = path or CHECKPOINT_PATH
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Units finish on worker threads; the Checkpoint's lock serializes them
+    connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+class Checkpoint:
+    def __init__(self, retailer, path=None, resume=RESUME, max_age=MAX_AGE):
+        self.retailer = retailer
+        self._lock = threading.Lock()
+        self._connection = connect(path)
+        self.resumed = 0
+
+        with self._lock, self._connection:
+            oldest = self._connection.execute(
+                "SELECT MIN(started_at) FROM units WHERE retailer = ?", (retailer,)
+            ).fetchone()[0]
+            if oldest is not None and (not resume or time.time() - oldest > max_age):
+                print(f"[{retailer}] discarding checkpoint from {time.strftime('%Y-%m-%d %H:%M', time.localtime(oldest))}")
+                self._connection.execute("DELETE FROM units WHERE retailer = ?", (retailer,))
+                oldest = None
+            self.started_at = oldest or time.time()
+            done = self._connection.execute(
+                "SELECT COUNT(*) FROM units WHERE retailer = ? AND status = ?", (retailer, DONE)
+            ).fetchone()[0]
+        if done:
+            print(f"[{retailer}] resuming: {done} unit(s) already done")
+
+    def plan(self, units):
+        # Records the frontier up front, so `python checkpoint.py` can show what is left
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO units (retailer, unit, status, started_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(self.retailer, unit, PENDING, self.started_at, now) for unit in units],
+            )
+
+    def result(self, unit):
+        # The saved result of a finished unit, or None
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT result FROM units WHERE retailer = ? AND unit = ? AND status = ?",
+                (self.retailer, unit, DONE),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def complete(self, unit, result):
+        # result must be JSON-serializable (lists of records, counts, ...)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO units (retailer, unit, status, result, started_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self.retailer, unit, DONE, json.dumps(result, ensure_ascii=False), self.started_at, time.time()),
+            )
+
+    def run(self, unit, fetch):
+        # fetch()'s result for the unit: saved from an earlier run, or fetched and saved now
+        result = self.result(unit)
+        if result is not None:
+            with self._lock:
+                self.resumed += 1
+            print(f"[{self.retailer}] {unit}: resumed from checkpoint")
+            return result
+        result = fetch()
+        self.complete(unit, result)
+        return result
+
+    def finish(self):
+        # The scrape completed and its output is written; nothing left to resume
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM units WHERE retailer = ?", (self.retailer,))
+        if self.resumed:
+            print(f"[{self.retailer}] {self.resumed} unit(s) were resumed from the checkpoint")
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Only a run that got all the way through clears its checkpoint
+        if exc_type is None:
+            self.finish()
+        else:
+            self.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show or clear scrape checkpoints")
+    parser.add_argument("--path", default=CHECKPOINT_PATH)
+    parser.add_argument("--clear", nargs="*", metavar="RETAILER", help="drop the checkpoint of these retailers (all if none given)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"No checkpoints at '{args.path}'.")
+        sys.exit(0)
+
+    connection = connect(args.path)
+    with connection:
+        if args.clear is not None:
+            if args.clear:
+                connection.executemany("DELETE FROM units WHERE retailer = ?", [(r,) for r in args.clear])
+            else:
+                connection.execute("DELETE FROM units")
+            print("Checkpoints cleared.")
+
+        rows = connection.execute(
+            "SELECT retailer, status, COUNT(*), MIN(started_at), MAX(updated_at) FROM units "
+            "GROUP BY retailer, status ORDER BY retailer, status"
+        ).fetchall()
+    connection.close()
+    if not rows:
+        print("No unfinished scrapes.")
+    for retailer, status, count, started_at, updated_at in rows:
+        print(f"{retailer:<12} {status:<8} {count:>5} unit(s)  started {time.strftime('%Y-%m-%d %H:%M', time.localtime(started_at))}"
+              f"  last update {time.strftime('%Y-%m-%d %H:%M', time.localtime(updated_at))}")
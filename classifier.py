@@ -0,0 +1,246 @@
+import argparse
+import bisect
+import csv
+import json
+import os
+import re
+import sys
+import unicodedata
+from collections import namedtuple
+
+# Decides whether a product description is a US product. One combined regex is built
+# from the rule set and run over accent-stripped, lowercased text, so a record is
+# classified in a single pass however many terms there are.
+#
+# Rule kinds (each a list of terms, matched on whole words):
+#   include  - origin terms ("estados unidos", "americano", "napa valley"...)
+#   brands   - US brands, which count as an origin match on their own
+#   ignore   - phrases that contain an origin term but don't mean the origin
+#              ("copo americano", "cafe americano"); the longer phrase wins
+#   exclude  - veto terms: another origin is named ("chileno", "escoces"...)
+#   require  - if given, at least one must match too (Angeloni: vinho / whisky)
+#
+# mode "include" keeps a record only if it matches an origin term or brand; mode
+# "exclude" trusts the site (the page is already filtered by origin) and only drops
+# vetoed records. RULES["default"] is merged into every retailer's rules; a JSON file
+# in SCRAPER_RULES can add to or override them.
+#
+#   python classifier.py "santaluzia U.S. products.csv" --retailer santaluzia --column Description
+#   python classifier.py output/aurora.jsonl --retailer aurora --out aurora_us.jsonl
+
+RULES = {
+    "default": {
+        "mode": "include",
+        "include": [
+            "americano", "americana", "americanos", "americanas", "norte americano", "norte americana",
+            "estados unidos", "eua", "made in usa", "u s a", "california", "napa", "napa valley",
+            "sonoma", "oregon", "washington state", "kentucky", "tennessee", "bourbon",
+        ],
+        "brands": [
+            # Whiskey
+            "jack daniel's", "gentleman jack", "jim beam", "maker's mark", "wild turkey", "bulleit",
+            "woodford reserve", "four roses", "buffalo trace", "eagle rare", "evan williams",
+            "knob creek", "basil hayden", "elijah craig", "old forester", "heaven hill",
+            # Wine
+            "robert mondavi", "beringer", "kendall-jackson", "e&j gallo", "barefoot", "apothic",
+            "sutter home", "woodbridge", "carlo rossi", "j. lohr", "josh cellars", "meiomi",
+            "la crema", "menage a trois", "cupcake vineyards",
+            # Grocery
+            "hershey's", "reese's", "ghirardelli", "jelly belly", "twizzlers", "jif", "skippy",
+            "smucker's", "dr pepper", "mountain dew", "a&w", "arizona", "hidden valley",
+            "sweet baby ray's", "stubb's", "cheez-it", "pop-tarts", "lucky charms", "cap'n crunch",
+            "duncan hines", "betty crocker", "jell-o", "kool-aid", "pop secret",
+        ],
+        "ignore": [
+            "copo americano", "cafe americano", "tipo americano", "estilo americano",
+            "queijo americano", "queijo tipo americano", "sanduiche americano", "pao americano",
+            "corte americano", "futebol americano", "panqueca americana", "torta americana",
+            "american pale ale", "american ipa", "salada americana", "mostarda americana",
+        ],
+        "exclude": [
+            "chileno", "chilena", "argentino", "argentina", "frances", "francesa", "italiano",
+            "italiana", "portugues", "portuguesa", "espanhol", "espanhola", "escoces", "escocesa",
+            "irlandes", "irlandesa", "australiano", "australiana", "sul africano", "sul africana",
+            "uruguaio", "uruguaia", "sul americano", "sul americana", "latino americano",
+            "latino americana", "alemao", "alema", "belga", "mexicano", "mexicana", "neozelandes",
+            "canadense", "japones", "japonesa",
+        ],
+    },
+    "angeloni": {
+        "require": ["vinho", "whisky", "whiskey", "bourbon"],
+    },
+    # These pages are already filtered on the country of origin
+    "mistral": {"mode": "exclude"},
+    "santaluzia": {"mode": "exclude"},
+    "zonasul": {"mode": "exclude"},
+    # Import store; product names rarely say where they come from
+    "karamell": {"mode": "exclude"},
+}
+
+RULE_KINDS = ("include", "brands", "ignore", "exclude", "require")
+
+Classification = namedtuple("Classification", ["keep", "reason", "terms"])
+
+
+def _accent_table():
+    # Latin-1 + Latin Extended-A letters -> their unaccented base letter
+    table = {}
+    for code in range(0x00C0, 0x0250):
+        base = unicodedata.normalize("NFKD", chr(code)).encode("ascii", "ignore").decode("ascii")
+        if base:
+            table[code] = base
+    return table
+
+
+_ACCENTS = _accent_table()
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text):
+    # "Vinho Tinto Americano — Napa Valley" -> "vinho tinto americano napa valley"
+    return _NON_WORD.sub(" ", (text or "").lower().translate(_ACCENTS)).strip()
+
+
+def load_rules(path=None):
+    # RULES, plus the JSON rule file in SCRAPER_RULES (same shape as RULES) if there is one
+    rules = {name: dict(retailer_rules) for name, retailer_rules in RULES.items()}
+    path = path or os.environ.get("SCRAPER_RULES")
+    if path:
+        with open(path, encoding="utf-8") as f:
+            for name, extra in json.load(f).items():
+                merged = rules.setdefault(name, {})
+                for key, value in extra.items():
+                    merged[key] = merged.get(key, []) + value if isinstance(value, list) else value
+    return rules
+
+
+def rules_for(retailer, rules=None):
+    # The default rules with the retailer's on top (lists are added, the mode replaced)
+    rules = rules or load_rules()
+    merged = dict(rules.get("default", {}))
+    for key, value in rules.get(retailer, {}).items():
+        merged[key] = merged.get(key, []) + value if isinstance(value, list) else value
+    return merged
+
+
+class Classifier:
+    def __init__(self, rules):
+        self.mode = rules.get("mode", "include")
+        self.requires = bool(rules.get("require"))
+        self.kinds = {}
+        for kind in RULE_KINDS:
+            for term in rules.get(kind, []):
+                self.kinds.setdefault(normalize(term), set()).add(kind)
+
+        # Longest terms first, so "copo americano" is matched before "americano" can be
+        terms = sorted((t for t in self.kinds if t), key=len, reverse=True)
+        self.pattern = re.compile(
+            r"(?<![a-z0-9])(?:" + "|".join(re.escape(t) for t in terms) + r")(?![a-z0-9])"
+        ) if terms else None
+
+    def _decide(self, matches):
+        found = {kind: [] for kind in RULE_KINDS}
+        for term in matches:
+            for kind in self.kinds[term]:
+                found[kind].append(term)
+        if found["exclude"]:
+            return Classification(False, "excluded", found["exclude"])
+        if self.requires and not found["require"]:
+            return Classification(False, "missing required term", [])
+        if found["brands"]:
+            return Classification(True, "brand", found["brands"])
+        if found["include"]:
+            return Classification(True, "origin", found["include"])
+        if self.mode == "exclude":
+            return Classification(True, "trusted", [])
+        return Classification(False, "no match", [])
+
+    def classify(self, text):
+        matches = self.pattern.findall(normalize(text)) if self.pattern else []
+        return self._decide(matches)
+
+    def classify_many(self, texts):
+        # One regex pass over the whole batch: texts are joined with newlines (which
+        # normalize() never produces) and matches are mapped back by offset
+        normalized = [normalize(text) for text in texts]
+        if not self.pattern:
+            return [self._decide([]) for _ in normalized]
+        starts = []
+        offset = 0
+        for text in normalized:
+            starts.append(offset)
+            offset += len(text) + 1
+        matches = [[] for _ in normalized]
+        for match in self.pattern.finditer("\n".join(normalized)):
+            matches[bisect.bisect_right(starts, match.start()) - 1].append(match.group())
+        return [self._decide(found) for found in matches]
+
+    def filter(self, records, field="description", batch_size=1000):
+        # Yields the records to keep, classifying them in batches
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                yield from self._kept(batch, field)
+                batch = []
+        yield from self._kept(batch, field)
+
+    def _kept(self, batch, field):
+        results = self.classify_many([record.get(field) for record in batch])
+        return (record for record, result in zip(batch, results) if result.keep)
+
+
+_classifiers = {}
+
+
+def get_classifier(retailer):
+    if retailer not in _classifiers:
+        _classifiers[retailer] = Classifier(rules_for(retailer))
+    return _classifiers[retailer]
+
+
+def _read_records(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            return [json.loads(line) for line in f if line.strip()]
+        return list(csv.DictReader(f))
+
+
+def _write_records(path, records, fieldnames):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            f.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        else:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(records)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Classify scraped products (CSV or JSONL) as US / not US")
+    parser.add_argument("path")
+    parser.add_argument("--retailer", default="default", help="whose rules to use")
+    parser.add_argument("--column", default="description", help="field holding the product description")
+    parser.add_argument("--rules", help="JSON rule file to merge into the built-in rules")
+    parser.add_argument("--out", help="write the kept records here (CSV or JSONL)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every decision")
+    args = parser.parse_args()
+
+    classifier = Classifier(rules_for(args.retailer, load_rules(args.rules)))
+    records = _read_records(args.path)
+    if records and args.column not in records[0]:
+        print(f"No '{args.column}' column in {args.path} (columns: {', '.join(records[0])})")
+        sys.exit(1)
+
+    results = classifier.classify_many([record.get(args.column) for record in records])
+    reasons = {}
+    for record, result in zip(records, results):
+        reasons[result.reason] = reasons.get(result.reason, 0) + 1
+        if args.verbose:
+            print(f"{'KEEP' if result.keep else 'DROP'}  {result.reason:<22} {', '.join(result.terms):<30} {record.get(args.column)}")
+
+    kept = [record for record, result in zip(records, results) if result.keep]
+    print(f"{len(kept)} of {len(records)} records kept ({', '.join(f'{k}: {v}' for k, v in sorted(reasons.items()))})")
+    if args.out:
+        _write_records(args.out, kept, list(records[0]) if records else [])
+        print(f"Kept records saved to '{args.out}'")
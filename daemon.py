@@ -0,0 +1,283 @@
+import argparse
+import contextvars
+import heapq
+import io
+import json
+import os
+import random
+import runpy
+import signal
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from governor import governor_status
+from metrics import export, retailer_context
+from retailers import run as run_retailer
+from run_all import HERE, RETAILERS, count_rows
+
+# Long-running scheduler: one Python process that keeps Selenium imported, chromedriver
+# resolved and a pool of Chrome instances warm, and runs each retailer script on its
+# own schedule. A cron job per script pays all of that again on every run; here a
+# repeated run only costs the page work itself.
+#
+#   python daemon.py                                  # every retailer every 6 h
+#   python daemon.py --every aurora=2h --every pao=30m --jitter 0.1
+#   curl localhost:8765/status                        # last run, duration, products, domain health
+#
+# Scripts are run in-process with runpy (they do their work at import time), one at a
+# time by default; --workers runs several at once, sharing the browser pool. Each run's
+# output (its worker threads' too) goes to logs/<retailer>.log, and its metrics are
+# exported as soon as it finishes (SCRAPER_METRICS). Every next run is scheduled
+# `interval` after the previous one finished, moved by up to +/- jitter * interval so
+# the stores don't see us at the same minute every day. SIGINT / SIGTERM let running jobs finish, then exit.
+
+DEFAULT_INTERVAL = float(os.environ.get("SCRAPER_DAEMON_INTERVAL", str(6 * 3600)))
+DEFAULT_JITTER = float(os.environ.get("SCRAPER_DAEMON_JITTER", "0.1"))
+DEFAULT_PORT = int(os.environ.get("SCRAPER_DAEMON_PORT", "8765"))
+DEFAULT_WORKERS = int(os.environ.get("SCRAPER_DAEMON_WORKERS", "1"))
+
+# The first round is spread over this many seconds instead of starting everything at once
+FIRST_ROUND_SPREAD = 60
+
+UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_duration(text):
+    # "90", "30m", "2h", "1d" -> seconds
+    text = text.strip().lower()
+    if text and text[-1] in UNITS:
+        return float(text[:-1]) * UNITS[text[-1]]
+    return float(text)
+
+
+_job_log = contextvars.ContextVar("job_log", default=None)
+
+
+class _JobOutput(io.TextIOBase):
+    # sys.stdout / sys.stderr replacement that sends each job's output to that job's log
+    # file, so concurrent jobs don't interleave (redirect_stdout is process-wide). The
+    # log is a context variable, so the threads a job starts through asyncio or
+    # metrics.ContextThreadPoolExecutor write to it too.
+    def __init__(self, fallback):
+        self.fallback = fallback
+
+    def _target(self):
+        return _job_log.get() or self.fallback
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        self._target().flush()
+
+    @property
+    def encoding(self):
+        return self._target().encoding
+
+
+class Job:
+    def __init__(self, name, interval):
+        self.name = name
+        self.script, self.domain, self.output_file = RETAILERS[name]
+        self.interval = interval
+        self.next_run = None
+        self.running = False
+        self.runs = 0
+        self.failures = 0
+        self.last = None
+
+    def status(self):
+        return {
+            "retailer": self.name,
+            "interval_seconds": self.interval,
+            "running": self.running,
+            "runs": self.runs,
+            "failures": self.failures,
+            "next_run": _timestamp(self.next_run) if self.next_run and not self.running else None,
+            "last_run": self.last,
+        }
+
+
+def _timestamp(seconds):
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(seconds))
+
+
+class Scheduler:
+    def __init__(self, jobs, jitter=DEFAULT_JITTER, workers=DEFAULT_WORKERS, log_dir=None):
+        self.jobs = {job.name: job for job in jobs}
+        self.jitter = jitter
+        self.workers = workers
+        self.log_dir = log_dir or os.path.join(HERE, "logs")
+        self.started_at = time.time()
+        self._queue = []
+        # Reentrant: the signal handler (stop) runs on the main thread, maybe while it holds the lock
+        self._lock = threading.RLock()
+        self._wakeup = threading.Condition(self._lock)
+        self._stopping = False
+
+    def _schedule(self, job, delay):
+        # Called with the lock held
+        job.next_run = time.time() + delay
+        heapq.heappush(self._queue, (job.next_run, job.name))
+        self._wakeup.notify()
+
+    def _jittered(self, interval):
+        return max(0.0, interval * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def warm_up(self):
+        # Import Selenium, resolve chromedriver and start the browsers before the first job
+        from driver_pool import get_pool
+        pool = get_pool(int(os.environ.get("SCRAPER_POOL_SIZE", "0")) or 4)
+        start_time = time.time()
+        pool.start()
+        print(f"{pool.size} browser(s) ready in {time.time() - start_time:.1f} seconds")
+
+    def run_job(self, job):
+        # Runs the retailer script in this process; its output goes to logs/<retailer>.log
+        log_path = os.path.join(self.log_dir, f"{job.name}.log")
+        start_time = time.time()
+        status = "ok"
+        with open(log_path, "w", encoding="utf-8") as log, retailer_context(job.name):
+            token = _job_log.set(log)
+            try:
+                if job.script:
+                    runpy.run_path(os.path.join(HERE, job.script), run_name="__main__")
+                else:
+                    # Declared in retailers.py only
+                    run_retailer(job.name)
+            except SystemExit as e:
+                if e.code not in (None, 0):
+                    status = f"failed (exit {e.code})"
+            except BaseException as e:
+                traceback.print_exc()
+                status = f"failed ({type(e).__name__}: {e})"
+            finally:
+                # Unlabelled spans of the run were recorded for job.name
+                try:
+                    export(retailer=job.name, started_at=start_time)
+                except OSError as e:
+                    print(f"Could not export metrics: {e}")
+                _job_log.reset(token)
+        elapsed = time.time() - start_time
+
+        output_path = os.path.join(HERE, job.output_file) if job.output_file else None
+        result = {
+            "status": status,
+            "started_at": _timestamp(start_time),
+            "duration_seconds": round(elapsed, 2),
+            "products": count_rows(output_path) if status == "ok" else None,
+            "log": log_path,
+        }
+        with self._lock:
+            job.running = False
+            job.runs += 1
+            job.failures += status != "ok"
+            job.last = result
+            if not self._stopping:
+                self._schedule(job, self._jittered(job.interval))
+        print(f"[{job.name}] {status} in {elapsed:.2f} seconds"
+              + (f", {result['products']} products" if result["products"] is not None else "")
+              + (f"; next run {_timestamp(job.next_run)}" if not self._stopping else ""))
+
+    def status(self):
+        with self._lock:
+            return {
+                "started_at": _timestamp(self.started_at),
+                "uptime_seconds": round(time.time() - self.started_at),
+                "jobs": [job.status() for job in self.jobs.values()],
+                # Shared by every job in this process: current rate and circuit per store
+                "domains": governor_status(),
+            }
+
+    def stop(self, *_):
+        with self._lock:
+            if not self._stopping:
+                print("Stopping after the running jobs finish...")
+            self._stopping = True
+            self._wakeup.notify()
+
+    def run(self):
+        os.makedirs(self.log_dir, exist_ok=True)
+        # Scripts write their output files relative to the working directory
+        os.chdir(HERE)
+        sys.stdout = _JobOutput(sys.stdout)
+        sys.stderr = _JobOutput(sys.stderr)
+        with self._lock:
+            spread = min(FIRST_ROUND_SPREAD, *(job.interval for job in self.jobs.values()))
+            for job in self.jobs.values():
+                self._schedule(job, random.uniform(0, spread))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while True:
+                with self._lock:
+                    while not self._stopping and (not self._queue or self._queue[0][0] > time.time()):
+                        timeout = self._queue[0][0] - time.time() if self._queue else None
+                        self._wakeup.wait(timeout)
+                    if self._stopping:
+                        break
+                    _, name = heapq.heappop(self._queue)
+                    job = self.jobs[name]
+                    job.running = True
+                print(f"[{job.name}] starting")
+                executor.submit(self.run_job, job)
+
+
+def serve_status(scheduler, port):
+    # GET /status (or /) -> JSON; bound to localhost only
+    class StatusHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") not in ("", "/status"):
+                self.send_error(404)
+                return
+            body = json.dumps(scheduler.status(), indent=2, ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), StatusHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Status at http://127.0.0.1:{port}/status")
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the retailer scrapers on a schedule, with warm browsers")
+    parser.add_argument("retailers", nargs="*", help=f"retailers to schedule (default: all of {', '.join(RETAILERS)})")
+    parser.add_argument("--interval", type=parse_duration, default=DEFAULT_INTERVAL,
+                        help="default time between runs (e.g. 6h, 30m)")
+    parser.add_argument("--every", action="append", default=[], metavar="RETAILER=INTERVAL",
+                        help="per-retailer interval, e.g. aurora=2h (repeatable)")
+    parser.add_argument("--jitter", type=float, default=DEFAULT_JITTER, help="fraction of the interval to randomize by")
+    parser.add_argument("-w", "--workers", type=int, default=DEFAULT_WORKERS, help="jobs run at the same time")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="status endpoint port (0 turns it off)")
+    parser.add_argument("--no-warm", action="store_true", help="don't start the browsers until a job needs them")
+    args = parser.parse_args()
+
+    names = args.retailers or list(RETAILERS)
+    unknown = [name for name in names if name not in RETAILERS]
+    intervals = {}
+    for item in args.every:
+        name, _, value = item.partition("=")
+        if name not in RETAILERS or not value:
+            parser.error(f"bad --every '{item}' (expected RETAILER=INTERVAL)")
+        intervals[name] = parse_duration(value)
+    if unknown:
+        parser.error(f"unknown retailer(s): {', '.join(unknown)}")
+
+    scheduler = Scheduler([Job(name, intervals.get(name, args.interval)) for name in names], args.jitter, args.workers)
+    signal.signal(signal.SIGINT, scheduler.stop)
+    signal.signal(signal.SIGTERM, scheduler.stop)
+    if args.port:
+        serve_status(scheduler, args.port)
+    if not args.no_warm:
+        scheduler.warm_up()
+    scheduler.run()
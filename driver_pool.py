@@ -0,0 +1,191 @@
+import atexit
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.service import Service
+
+from browser_profile import BrowserProfile, build_options, resource_stats
+from metrics import ContextThreadPoolExecutor, span
+
+# Shared pool of pre-started Chrome instances. Chrome cold start is the biggest fixed
+# cost of a scrape, so we pay it once per pool slot and hand the same browsers out to
+# every job instead of calling webdriver.Chrome() per script / per URL.
+#
+#   from driver_pool import get_pool
+#   with get_pool().driver("aurora", base_url) as driver:
+#       driver.get(url)
+#
+# Browsers use the lean profile from browser_profile.py (headless, images/fonts/media
+# and trackers blocked); passing the retailer applies its third-party allowlist.
+
+DEFAULT_POOL_SIZE = int(os.environ.get("SCRAPER_POOL_SIZE", "1"))
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def chrome_service():
+    # Resolve chromedriver once per process. Selenium >= 4.6 finds it on its own;
+    # webdriver_manager is only used if it is installed (mistral.py used to call it per URL).
+    global _service
+    with _service_lock:
+        if _service is None:
+            try:
+                from webdriver_manager.chrome import ChromeDriverManager
+                _service = Service(ChromeDriverManager().install())
+            except ImportError:
+                _service = Service()
+        return _service
+
+
+class DriverPool:
+    def __init__(self, size=DEFAULT_POOL_SIZE, options_factory=build_options):
+        self.size = max(1, size)
+        self.options_factory = options_factory
+        self._idle = queue.Queue()
+        self._all = []
+        self._profiles = {}
+        self._lock = threading.Lock()
+        self._started = False
+        self._closed = False
+
+    def _new_driver(self):
+        with span("driver_startup"):
+            driver = webdriver.Chrome(service=chrome_service(), options=self.options_factory())
+        with self._lock:
+            self._all.append(driver)
+            self._profiles[id(driver)] = BrowserProfile(driver)
+        return driver
+
+    def start(self):
+        # Launch every browser up front, in parallel, so the first jobs don't wait on cold starts
+        with self._lock:
+            if self._started:
+                return self
+            self._started = True
+        with ContextThreadPoolExecutor(max_workers=self.size) as executor:
+            for driver in executor.map(lambda _: self._try_new_driver(), range(self.size)):
+                self._idle.put(driver)
+        return self
+
+    def _try_new_driver(self):
+        # A new browser, or None if Chrome wouldn't start. None goes on the idle queue
+        # like a browser would, so the slot isn't lost; the next checkout relaunches it.
+        try:
+            return self._new_driver()
+        except Exception as e:
+            print(f"Could not start Chrome: {e}")
+            return None
+
+    def _discard(self, driver):
+        with self._lock:
+            if driver in self._all:
+                self._all.remove(driver)
+            self._profiles.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def _is_alive(self, driver):
+        try:
+            driver.window_handles
+            return True
+        except WebDriverException:
+            return False
+
+    def _reset(self, driver):
+        # Leave the browser the way a fresh one would be for the next job:
+        # one tab, no cookies/storage, blank page.
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        # delete_all_cookies() only clears the current domain's cookies; CDP clears them
+        # all, and the storage of the origin the job ended on
+        driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        origin = driver.execute_script("return window.location.origin")
+        if origin and origin.startswith("http"):
+            driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+            driver.execute_script("window.sessionStorage.clear()")
+        driver.get("about:blank")
+
+    def _checkout(self, timeout):
+        # An idle browser, relaunched if it crashed while idle (or during the previous
+        # job) or if its slot is empty; the slot goes back on the queue if that fails
+        driver = self._idle.get(timeout=timeout)
+        if driver is not None and self._is_alive(driver):
+            return driver
+        if driver is not None:
+            self._discard(driver)
+        try:
+            return self._new_driver()
+        except BaseException:
+            self._idle.put(None)
+            raise
+
+    def _checkin(self, driver, healthy):
+        if self._closed:
+            self._discard(driver)
+            return
+        if not healthy:
+            self._discard(driver)
+            driver = self._try_new_driver()
+        self._idle.put(driver)
+
+    @contextmanager
+    def driver(self, retailer=None, base_url=None, timeout=None):
+        if self._closed:
+            raise RuntimeError("driver pool is closed")
+        self.start()
+
+        driver = self._checkout(timeout)
+        profile = self._profiles.get(id(driver)) or BrowserProfile(driver)
+        healthy = True
+        try:
+            profile.apply(retailer, base_url)
+            yield driver
+        except WebDriverException:
+            healthy = self._is_alive(driver)
+            raise
+        finally:
+            if healthy:
+                try:
+                    profile.collect()
+                    self._reset(driver)
+                except WebDriverException:
+                    healthy = False
+            self._checkin(driver, healthy)
+
+    def close(self):
+        self._closed = True
+        with self._lock:
+            drivers = list(self._all)
+            self._all.clear()
+            self._profiles.clear()
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        resource_stats.print_summary()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(size=None):
+    # Process-wide pool shared by every scraper; closed automatically at exit
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DriverPool(size or DEFAULT_POOL_SIZE)
+            atexit.register(_pool.close)
+        return _pool
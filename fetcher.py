@@ -0,0 +1,292 @@
+import asyncio
+import http.client
+import json
+import os
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from governor import CircuitOpenError, RetryableError, get_governor
+from metrics import add_bytes, page_source, span
+from page_cache import cache_enabled, get_cache, store_html
+from parsing import SpecParser
+from vtex_api import USER_AGENT
+
+# Tiered page fetching: a plain HTTP GET first, and a browser from the pool only when
+# the response doesn't contain the retailer's product cards (the listing is rendered
+# client-side). Which tier a kind of URL needs is remembered per URL pattern, so once a
+# listing is known to need Chrome we go straight there, and once it is known to be
+# server-rendered we never start Chrome for it.
+#
+#   fetcher = TieredFetcher(SPECS["karamell"])
+#   pages = fetcher.fetch_all([page_url(n) for n in range(1, 9)])   # Page objects, in order
+#
+# HTTP requests run concurrently on one asyncio loop with a pooled client (httpx if it
+# is installed, otherwise urllib in worker threads). Browser renders go through the
+# driver pool, so at most as many run at once as the pool has browsers. Decisions are
+# kept in SCRAPER_TIERS_FILE and re-probed over HTTP after SCRAPER_TIERS_TTL seconds,
+# in case the site changes how it renders. Both tiers go through the domain's governor
+# (governor.py): requests are paced, and throttled or failed ones retried with backoff.
+# With the page cache on, a stale page that came with an ETag or Last-Modified is
+# revalidated over HTTP, and a 304 serves the cached copy.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TIERS_FILE = os.environ.get("SCRAPER_TIERS_FILE", os.path.join(HERE, ".cache", "fetch_tiers.json"))
+TIERS_TTL = float(os.environ.get("SCRAPER_TIERS_TTL", str(7 * 24 * 3600)))
+HTTP_CONCURRENCY = int(os.environ.get("SCRAPER_HTTP_CONCURRENCY", "16"))
+HTTP_TIMEOUT = 15
+
+TIER_HTTP = "http"
+TIER_BROWSER = "browser"
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# What a failed request raises, with either client: HTTP errors, refused / dropped
+# connections and timeouts (OSError, URLError included), truncated bodies
+HTTP_ERRORS = (http.client.HTTPException, OSError) + ((httpx.HTTPError,) if httpx else ())
+
+_DIGITS = re.compile(r"\d+")
+
+
+def url_pattern(url):
+    # Pages of the same listing share a pattern: numbers in the path become "*" and only
+    # the query parameter names are kept ("/produtos?page&q")
+    parsed = urllib.parse.urlsplit(url)
+    path = _DIGITS.sub("*", parsed.path or "/")
+    keys = sorted({key for key, _ in urllib.parse.parse_qsl(parsed.query, keep_blank_values=True)})
+    return f"{parsed.hostname or ''}{path}" + (f"?{'&'.join(keys)}" if keys else "")
+
+
+class Page:
+    def __init__(self, url, html, tier, records=None):
+        self.url = url
+        self.html = html
+        self.tier = tier
+        self.records = records or []
+
+    def __repr__(self):
+        return f"Page({self.url!r}, tier={self.tier!r}, records={len(self.records)})"
+
+
+class TierDecisions:
+    # retailer -> URL pattern -> {"tier": ..., "decided_at": ...}, shared by every fetcher
+    def __init__(self, path=TIERS_FILE, ttl=TIERS_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding="utf-8") as f:
+                self._decisions = json.load(f)
+        except (OSError, ValueError):
+            self._decisions = {}
+
+    def get(self, retailer, pattern):
+        with self._lock:
+            decision = self._decisions.get(retailer, {}).get(pattern)
+        if decision is None or time.time() - decision["decided_at"] > self.ttl:
+            return None
+        return decision["tier"]
+
+    def set(self, retailer, pattern, tier):
+        with self._lock:
+            current = self._decisions.setdefault(retailer, {}).get(pattern)
+            if current is not None and current["tier"] == tier and time.time() - current["decided_at"] <= self.ttl:
+                return
+            self._decisions[retailer][pattern] = {"tier": tier, "decided_at": time.time()}
+            if current is None or current["tier"] != tier:
+                print(f"[{retailer}] {pattern} -> {tier}")
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._decisions, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+
+_decisions = None
+_decisions_lock = threading.Lock()
+
+
+def get_decisions():
+    global _decisions
+    with _decisions_lock:
+        if _decisions is None:
+            _decisions = TierDecisions()
+        return _decisions
+
+
+def default_render(spec, settle="dom_quiet", not_found=None):
+    # Navigate, wait for the first product card (or give up after 15 s) and let the
+    # page settle: until the DOM stops changing, or with settle="network_idle" until
+    # its requests are done. With a not_found selector (the "no products found" box),
+    # a page that shows neither is slow or throttled rather than empty, and is retried.
+    # Scrapers with their own waits pass `render` instead.
+    def render(driver, url):
+        from waits import wait_for_any_element, wait_for_dom_quiet, wait_for_network_idle
+
+        with span("navigation", spec["retailer"]):
+            driver.get(url)
+        ready = wait_for_any_element(driver, [spec["item"]] + ([not_found] if not_found else []), timeout=15)
+        if not_found and not ready.satisfied:
+            raise RetryableError(f"{url} showed neither products nor 'not found' after {ready.waited:.0f} s")
+        if settle == "network_idle":
+            wait_for_network_idle(driver)
+        else:
+            wait_for_dom_quiet(driver, timeout=5)
+        return None
+    return render
+
+
+class TieredFetcher:
+    def __init__(self, spec, render=None, parser=None, concurrency=HTTP_CONCURRENCY, decisions=None):
+        # render(driver, url) loads the page in a pooled browser; it may return the HTML
+        # itself, otherwise driver.page_source is read afterwards
+        self.spec = spec
+        self.retailer = spec["retailer"]
+        self.parser = parser or SpecParser(spec)
+        self.render = render or default_render(spec)
+        self.concurrency = concurrency
+        self.decisions = decisions or get_decisions()
+        self.governor = get_governor(spec["base_url"])
+
+    def complete_records(self, html, url):
+        # The page "has the products" if at least one card yields a description and a link
+        records = self.parser.extract(html, url)
+        return records if any(r["description"] and r["url"] for r in records) else []
+
+    # --- HTTP tier
+
+    # Both clients return (html, response headers), and (None, headers) for a 304
+
+    async def _get_httpx(self, client, url, headers):
+        with span("http", self.retailer):
+            response = await client.get(url, headers=headers)
+        if response.status_code == 304:
+            return None, dict(response.headers)
+        response.raise_for_status()
+        add_bytes(len(response.content), "http", self.retailer)
+        return response.text, dict(response.headers)
+
+    def _get_urllib(self, url, headers):
+        request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT, "Accept": "text/html", **headers})
+        try:
+            with span("http", self.retailer), urllib.request.urlopen(request, timeout=HTTP_TIMEOUT) as response:
+                charset = response.headers.get_content_charset() or "utf-8"
+                body = response.read()
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return None, dict(e.headers)
+            raise
+        add_bytes(len(body), "http", self.retailer)
+        return body.decode(charset, errors="replace"), dict(response.headers)
+
+    async def _get(self, client, url, entry=None):
+        # (HTML over plain HTTP, its response headers), or (None, None) if the request
+        # still fails after the retries. A stale cache entry is revalidated when it can
+        # be; if it still holds, its HTML comes back with headers None (nothing to store)
+        headers = entry.conditional_headers() if entry is not None else {}
+
+        async def get():
+            if client is not None:
+                return await self._get_httpx(client, url, headers)
+            return await asyncio.to_thread(self._get_urllib, url, headers)
+
+        try:
+            html, response_headers = await self.governor.call_async(get, retailer=self.retailer)
+        except (CircuitOpenError,) + HTTP_ERRORS as e:
+            print(f"[{self.retailer}] HTTP request for {url} failed: {e}")
+            return None, None
+        if html is None:
+            if not headers:
+                # A 304 to a request that wasn't conditional: nothing to serve
+                return None, None
+            get_cache().refresh(entry)
+            return entry.read(), None
+        return html, response_headers
+
+    # --- browser tier
+
+    def _render(self, url, need_html):
+        # Imported here so pages that never need a browser don't need Selenium either
+        from selenium.common.exceptions import WebDriverException
+
+        # A render that times out or loses its browser is retried like a failed request
+        return self.governor.call(lambda: self._render_once(url, need_html), retry_on=(WebDriverException,),
+                                  retailer=self.retailer, timed=False)
+
+    def _render_once(self, url, need_html):
+        from browser_extract import extract_in_browser, use_browser_extraction
+        from driver_pool import get_pool
+
+        with get_pool().driver(self.retailer, self.spec["base_url"]) as driver:
+            html = self.render(driver, url)
+            if html is None:
+                # Read the cards inside the page unless the caller or the cache wants the HTML
+                if not need_html and not cache_enabled() and use_browser_extraction():
+                    records = extract_in_browser(driver, self.spec)
+                    if records is not None:
+                        return Page(url, None, TIER_BROWSER, records)
+                html = page_source(driver, self.retailer)
+        store_html(self.retailer, url, html)
+        return Page(url, html, TIER_BROWSER, self.parser.extract(html, url))
+
+    async def _fetch_browser(self, url, need_html):
+        # Runs in a worker thread; the pool itself caps how many pages render at once
+        return await asyncio.to_thread(self._render, url, need_html)
+
+    # --- both
+
+    async def _fetch(self, client, url, http_slots, need_html):
+        cache = get_cache()
+        entry = cache.get(self.retailer, url) if cache else None
+        if entry is not None and entry.fresh:
+            html = entry.read()
+            return Page(url, html, "cache", self.parser.extract(html, url))
+
+        pattern = url_pattern(url)
+        decision = self.decisions.get(self.retailer, pattern)
+        if decision == TIER_BROWSER:
+            return await self._fetch_browser(url, need_html)
+
+        async with http_slots:
+            html, headers = await self._get(client, url, entry)
+        records = self.complete_records(html, url) if html else []
+        if records:
+            self.decisions.set(self.retailer, pattern, TIER_HTTP)
+            if headers is not None:
+                store_html(self.retailer, url, html, headers)
+            return Page(url, html, TIER_HTTP, records)
+        if html and decision == TIER_HTTP:
+            # The listing is known to be server-rendered, so this page is simply empty
+            # (past the last page, say); no need for a browser to confirm it
+            return Page(url, html, TIER_HTTP, [])
+
+        page = await self._fetch_browser(url, need_html)
+        # Only a page the browser found products on, where the HTML had none, sends the
+        # pattern to the browser; a failed request or an empty result decides nothing
+        if html and page.records:
+            self.decisions.set(self.retailer, pattern, TIER_BROWSER)
+        return page
+
+    async def fetch_all_async(self, urls, need_html=False):
+        # need_html: keep each page's HTML (Page.html) even when the browser tier could
+        # hand back just the records
+        http_slots = asyncio.Semaphore(self.concurrency)
+        if httpx is None:
+            return await asyncio.gather(*(self._fetch(None, url, http_slots, need_html) for url in urls))
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        async with httpx.AsyncClient(headers={"User-Agent": USER_AGENT, "Accept": "text/html"},
+                                     limits=limits, timeout=HTTP_TIMEOUT, follow_redirects=True) as client:
+            return await asyncio.gather(*(self._fetch(client, url, http_slots, need_html) for url in urls))
+
+    def fetch_all(self, urls, need_html=False):
+        # Page objects in the same order as urls
+        return asyncio.run(self.fetch_all_async(list(urls), need_html))
+
+    def fetch(self, url, need_html=False):
+        return self.fetch_all([url], need_html)[0]
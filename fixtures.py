@@ -0,0 +1,88 @@
+import hashlib
+import json
+import os
+import time
+from collections import namedtuple
+
+# Offline fixture corpus: the rendered HTML (or API JSON) each scraper actually saw,
+# plus the records extracted from it at the time. bench_parse.py replays these through
+# the extraction code without touching the network.
+#
+# Recording is off unless SCRAPER_RECORD_FIXTURES=1:
+#
+#   SCRAPER_RECORD_FIXTURES=1 python santaluzia.py
+#
+# Layout: fixtures/<retailer>/<id>.html (or .json) + <id>.meta.json, where <id> is a
+# hash of the content, so rerecording an unchanged page doesn't add a new file.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.environ.get("SCRAPER_FIXTURES_DIR", os.path.join(HERE, "fixtures"))
+
+# How many extracted records are kept in the metadata to spot-check selector output
+SAMPLE_SIZE = 3
+
+Fixture = namedtuple("Fixture", ["retailer", "kind", "url", "path", "expected_records", "sample"])
+
+
+def recording_enabled():
+    return os.environ.get("SCRAPER_RECORD_FIXTURES") == "1"
+
+
+def _save(retailer, kind, url, content, extension, records):
+    directory = os.path.join(FIXTURES_DIR, retailer)
+    os.makedirs(directory, exist_ok=True)
+    fixture_id = hashlib.sha1(content.encode("utf-8")).hexdigest()[:12]
+    path = os.path.join(directory, f"{fixture_id}{extension}")
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    meta = {
+        "retailer": retailer,
+        "kind": kind,
+        "url": url,
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "file": os.path.basename(path),
+        "records": len(records) if records is not None else None,
+        "sample": list(records[:SAMPLE_SIZE]) if records else [],
+    }
+    with open(os.path.join(directory, f"{fixture_id}.meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2, ensure_ascii=False)
+    return path
+
+
+def record_html(retailer, url, html, records=None):
+    return _save(retailer, "html", url, html, ".html", records)
+
+
+def record_json(retailer, url, payload, kind, records=None):
+    # kind says how to replay it: "vtex" (intelligent-search), "vtex-catalog" or "linx" (pao_api.py)
+    return _save(retailer, kind, url, json.dumps(payload, ensure_ascii=False), ".json", records)
+
+
+def load_fixtures(retailer=None, fixtures_dir=None):
+    fixtures_dir = fixtures_dir or FIXTURES_DIR
+    if not os.path.isdir(fixtures_dir):
+        return []
+    retailers = [retailer] if retailer else sorted(os.listdir(fixtures_dir))
+
+    fixtures = []
+    for name in retailers:
+        directory = os.path.join(fixtures_dir, name)
+        if not os.path.isdir(directory):
+            continue
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith(".meta.json"):
+                continue
+            with open(os.path.join(directory, filename), encoding="utf-8") as f:
+                meta = json.load(f)
+            fixtures.append(Fixture(
+                meta["retailer"], meta["kind"], meta.get("url"),
+                os.path.join(directory, meta["file"]), meta.get("records"), meta.get("sample", []),
+            ))
+    return fixtures
+
+
+def read_fixture(fixture):
+    with open(fixture.path, encoding="utf-8") as f:
+        content = f.read()
+    return json.loads(content) if fixture.kind != "html" else content
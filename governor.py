@@ -0,0 +1,342 @@
+import asyncio
+import email.utils
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+
+from metrics import span
+
+# Per-domain request governor: every request to a store (API call, plain HTTP page,
+# browser navigation) goes through the governor of its domain, which
+#
+#   - paces requests with a token bucket, so parallel workers share one rate per domain;
+#   - adapts that rate: it creeps up while responses are fast and clean, drops slightly
+#     when latency climbs well above the best seen, and halves on a 429 / 5xx / timeout
+#     (waiting out Retry-After when the server sends one);
+#   - retries throttled and failed requests with exponential backoff and full jitter;
+#   - opens a circuit breaker after SCRAPER_BREAKER_FAILURES failures in a row, so a
+#     store that is down or blocking us fails fast (CircuitOpenError) instead of eating
+#     every worker's retries. After SCRAPER_BREAKER_COOLDOWN seconds one trial request
+#     is let through; if it works the circuit closes, if not it stays open twice as long.
+#
+#   governor = get_governor("https://www.santaluzia.com.br")
+#   body = governor.call(lambda: opener.open(request, timeout=15).read())
+#
+# Only errors that mean "try again later" are retried: 429, 5xx, timeouts, dropped
+# connections, RetryableError, and whatever the caller passes in retry_on (Selenium's
+# WebDriverException for browser work). Anything else (a 404, a parse error) is raised
+# straight away and doesn't count against the domain. Governors live per process; the
+# daemon runs every retailer in one process, so there they are shared by all jobs.
+
+DEFAULT_RATE = float(os.environ.get("SCRAPER_RATE", "4"))  # requests / second to start with
+MAX_RATE = float(os.environ.get("SCRAPER_MAX_RATE", "16"))
+MIN_RATE = float(os.environ.get("SCRAPER_MIN_RATE", "0.2"))
+BURST = float(os.environ.get("SCRAPER_BURST", "8"))
+RETRIES = int(os.environ.get("SCRAPER_RETRIES", "3"))
+BACKOFF_BASE = float(os.environ.get("SCRAPER_BACKOFF_BASE", "1"))
+BACKOFF_MAX = float(os.environ.get("SCRAPER_BACKOFF_MAX", "60"))
+BREAKER_FAILURES = int(os.environ.get("SCRAPER_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.environ.get("SCRAPER_BREAKER_COOLDOWN", "60"))
+
+# Rate changes: additive increase per clean response, multiplicative decrease on trouble
+RATE_STEP = 0.25
+SLOW_FACTOR = 0.9
+THROTTLE_FACTOR = 0.5
+# A response this many times slower than the fastest recent one counts as "slow"
+SLOW_LATENCY = 3.0
+# Weight of the newest sample in the latency average
+LATENCY_ALPHA = 0.2
+# Concurrent requests fail together; one burst of failures should cut the rate once
+DECREASE_EVERY = 1.0
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+class CircuitOpenError(Exception):
+    # The domain failed too often lately; raised instead of sending the request
+    def __init__(self, domain, retry_in):
+        super().__init__(f"{domain} is failing, not retrying for another {retry_in:.0f} s")
+        self.domain = domain
+        self.retry_in = retry_in
+
+
+class RetryableError(Exception):
+    # Raised by callers for failures only they can see (a page that rendered neither
+    # products nor a "not found" box before the wait ran out)
+    pass
+
+
+def domain_of(url_or_domain):
+    return urllib.parse.urlsplit(url_or_domain).hostname or url_or_domain
+
+
+def parse_retry_after(value):
+    # Retry-After is either seconds or an HTTP date
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def classify(error, retry_on=()):
+    # (retryable, HTTP status or None, Retry-After seconds or None)
+    if isinstance(error, urllib.error.HTTPError):
+        status = error.code
+        return status == 429 or status >= 500, status, parse_retry_after(error.headers.get("Retry-After") if error.headers else None)
+    if httpx is not None and isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500, status, parse_retry_after(error.response.headers.get("Retry-After"))
+    if isinstance(error, (urllib.error.URLError, TimeoutError, ConnectionError, RetryableError)):
+        return True, None, None
+    if httpx is not None and isinstance(error, httpx.TransportError):
+        return True, None, None
+    return isinstance(error, tuple(retry_on)), None, None
+
+
+class Governor:
+    def __init__(self, domain, rate=DEFAULT_RATE, burst=BURST, min_rate=MIN_RATE, max_rate=MAX_RATE,
+                 retries=RETRIES, failure_threshold=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN):
+        self.domain = domain
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.retries = retries
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self._decreased_at = 0.0
+        self._paused_until = 0.0
+        self._latency = None
+        self._best_latency = None
+        self._failures = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._open_for = cooldown
+        self._trial_running = False
+        self.requests = 0
+        self.retried = 0
+        self.throttled = 0
+
+    # --- token bucket
+
+    def _reserve(self):
+        # Books the next free send slot and returns how long to sleep until it; raises
+        # CircuitOpenError if the circuit is open. Slots are 1 / rate apart, and up to
+        # `burst` of them may be in the past (unused capacity), which is the token bucket;
+        # booked slots keep their time when the rate changes later.
+        with self._lock:
+            now = time.monotonic()
+            if self._state == OPEN:
+                retry_in = self._opened_at + self._open_for - now
+                if retry_in > 0 or self._trial_running:
+                    raise CircuitOpenError(self.domain, max(retry_in, 0.0))
+                self._state = HALF_OPEN
+            if self._state == HALF_OPEN:
+                if self._trial_running:
+                    raise CircuitOpenError(self.domain, 0.0)
+                self._trial_running = True
+
+            interval = 1 / self.rate
+            slot = max(self._next_slot, now - (self.burst - 1) * interval, self._paused_until)
+            self._next_slot = slot + interval
+            self.requests += 1
+            return slot - now
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    # --- outcomes
+
+    def _close_trial(self):
+        # Called with the lock held
+        if self._trial_running:
+            self._trial_running = False
+            if self._state == HALF_OPEN:
+                self._state = CLOSED
+                self._open_for = self.cooldown
+                print(f"[{self.domain}] circuit closed")
+
+    def success(self, latency=None):
+        # latency None: a request whose duration says little about the server (a browser
+        # navigation), which only counts as a clean response
+        with self._lock:
+            self._failures = 0
+            self._close_trial()
+            if latency is None:
+                self.rate = min(self.max_rate, self.rate + RATE_STEP)
+                return
+            self._latency = latency if self._latency is None else (1 - LATENCY_ALPHA) * self._latency + LATENCY_ALPHA * latency
+            # The best latency drifts up slowly, so one lucky response doesn't make every later one "slow"
+            self._best_latency = latency if self._best_latency is None else min(latency, self._best_latency * 1.01)
+            if self._latency > SLOW_LATENCY * self._best_latency:
+                now = time.monotonic()
+                if now - self._decreased_at >= DECREASE_EVERY:
+                    self.rate = max(self.min_rate, self.rate * SLOW_FACTOR)
+                    self._decreased_at = now
+            else:
+                self.rate = min(self.max_rate, self.rate + RATE_STEP)
+
+    def failure(self, status=None, retry_after=None):
+        with self._lock:
+            self._failures += 1
+            now = time.monotonic()
+            if now - self._decreased_at >= DECREASE_EVERY:
+                self.rate = max(self.min_rate, self.rate * THROTTLE_FACTOR)
+                self._decreased_at = now
+            if status == 429:
+                self.throttled += 1
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+            if self._state == HALF_OPEN:
+                # The trial failed: stay open, twice as long as last time
+                self._trial_running = False
+                self._open_for = min(self._open_for * 2, BACKOFF_MAX * 10)
+                self._trip()
+            elif self._state == CLOSED and self._failures >= self.failure_threshold:
+                self._trip()
+
+    def _trip(self):
+        # Called with the lock held
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        print(f"[{self.domain}] circuit open for {self._open_for:.0f} s after {self._failures} failure(s) in a row")
+
+    def release(self):
+        # The request got an answer that says nothing about the domain's health (a 404...)
+        with self._lock:
+            self._close_trial()
+
+    def abandon(self):
+        # The request never finished (interrupted, cancelled): let another one be the trial
+        with self._lock:
+            self._trial_running = False
+
+    def backoff(self, attempt, retry_after=None):
+        # Full jitter: anywhere between 0 and base * 2^attempt, but at least Retry-After
+        delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+        return max(delay, retry_after or 0.0)
+
+    # --- calls
+
+    def _retry_delay(self, error, attempt, retry_on):
+        # Records a failed attempt; returns the delay before the next one, or None if
+        # the error should be raised
+        retryable, status, retry_after = classify(error, retry_on)
+        if not retryable:
+            self.release()
+            return None
+        self.failure(status, retry_after)
+        if attempt >= self.retries or self._state != CLOSED:
+            # Out of retries, or this failure just opened the circuit
+            return None
+        with self._lock:
+            self.retried += 1
+        delay = self.backoff(attempt, retry_after)
+        print(f"[{self.domain}] {error.__class__.__name__}{f' {status}' if status else ''}: "
+              f"retry {attempt + 1}/{self.retries} in {delay:.1f} s")
+        return delay
+
+    def call(self, fn, retry_on=(), retailer=None, timed=True):
+        # fn()'s result, retried on transient failures; raises the last error, or
+        # CircuitOpenError once the domain's circuit opens. timed=False leaves the
+        # latency tracking out (browser work, which is slow for reasons of its own).
+        attempt = 0
+        while True:
+            self.acquire()
+            start_time = time.monotonic()
+            try:
+                result = fn()
+            except BaseException as e:
+                if not isinstance(e, Exception):
+                    self.abandon()
+                    raise
+                delay = self._retry_delay(e, attempt, retry_on)
+                if delay is None:
+                    raise
+                with span("backoff", retailer):
+                    time.sleep(delay)
+                attempt += 1
+                continue
+            self.success(time.monotonic() - start_time if timed else None)
+            return result
+
+    async def call_async(self, fn, retry_on=(), retailer=None, timed=True):
+        # Same as call() for a coroutine function
+        attempt = 0
+        while True:
+            await self.acquire_async()
+            start_time = time.monotonic()
+            try:
+                result = await fn()
+            except BaseException as e:
+                # Includes cancellation, which mustn't leave a half-open trial hanging
+                if not isinstance(e, Exception):
+                    self.abandon()
+                    raise
+                delay = self._retry_delay(e, attempt, retry_on)
+                if delay is None:
+                    raise
+                with span("backoff", retailer):
+                    await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self.success(time.monotonic() - start_time if timed else None)
+            return result
+
+    def status(self):
+        with self._lock:
+            return {
+                "domain": self.domain,
+                "rate": round(self.rate, 2),
+                "circuit": self._state,
+                "failures_in_a_row": self._failures,
+                "latency_seconds": round(self._latency, 3) if self._latency is not None else None,
+                "requests": self.requests,
+                "retried": self.retried,
+                "throttled": self.throttled,
+            }
+
+
+_governors = {}
+_governors_lock = threading.Lock()
+
+
+def get_governor(url_or_domain):
+    # The process-wide governor of a domain (a URL works too)
+    domain = domain_of(url_or_domain)
+    with _governors_lock:
+        governor = _governors.get(domain)
+        if governor is None:
+            governor = _governors[domain] = Governor(domain)
+        return governor
+
+
+def governor_status():
+    with _governors_lock:
+        governors = list(_governors.values())
+    return [governor.status() for governor in governors]
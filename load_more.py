@@ -0,0 +1,137 @@
+import os
+
+from selenium.common.exceptions import WebDriverException
+
+from browser_extract import harvest_in_browser, pending_cards
+from metrics import count_page
+from waits import wait_for_dom_quiet, wait_until
+
+# Harvests pages that append cards behind a "Mostrar mais" button (aurora, zonasul).
+# Instead of counting the whole grid after every click and parsing the full page_source
+# at the end, each click only reads the cards that were appended since the last one
+# (browser_extract.harvest_in_browser), drops the ones already seen, and stops as soon
+# as a click brings nothing new:
+#
+#   with get_pool().driver("zonasul", base_url) as driver:
+#       driver.get(url)
+#       records = LoadMoreHarvester(driver, SPECS["zonasul"], ["//div[contains(text(), 'Mostrar mais')]"]).run()
+#
+# run() returns None if the in-page script can't run; callers then fall back to
+# click_all(), which opens every batch so the whole page_source can be parsed.
+
+# Safety stop for a button that never goes away
+MAX_CLICKS = int(os.environ.get("SCRAPER_MAX_LOAD_MORE", "200"))
+
+# Clicks the first visible element matching one of the XPaths (or its enclosing button),
+# in one round trip; returns whether there was one
+_CLICK_JS = """
+var xpaths = arguments[0];
+for (var i = 0; i < xpaths.length; i++) {
+    var found = document.evaluate(xpaths[i], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    for (var j = 0; j < found.snapshotLength; j++) {
+        var el = found.snapshotItem(j);
+        if (el.offsetParent === null) { continue; }
+        var target = el.closest('button') || el;
+        target.scrollIntoView({block: 'center'});
+        target.click();
+        return true;
+    }
+}
+return false;
+"""
+
+_COUNT_JS = "return document.querySelectorAll(arguments[0]).length;"
+
+
+class LoadMoreHarvester:
+    def __init__(self, driver, spec, button_xpaths, key="url", timeout=15, max_clicks=MAX_CLICKS):
+        self.driver = driver
+        self.spec = spec
+        self.button_xpaths = button_xpaths
+        self.key = key
+        self.timeout = timeout
+        self.max_clicks = max_clicks
+        self.records = []
+        self.clicks = 0
+        self._seen = set()
+
+    def harvest(self):
+        # The new, not yet seen records on the page, or None if the script failed
+        batch = harvest_in_browser(self.driver, self.spec)
+        if batch is None:
+            return None
+        new = []
+        for record in batch:
+            # Cards re-rendered by the page come back as new elements; the key catches them
+            value = record.get(self.key)
+            if value is not None:
+                if value in self._seen:
+                    continue
+                self._seen.add(value)
+            new.append(record)
+        self.records.extend(new)
+        count_page(len(new), self.spec.get("retailer"))
+        return new
+
+    def click(self):
+        try:
+            return bool(self.driver.execute_script(_CLICK_JS, self.button_xpaths))
+        except WebDriverException as e:
+            print(f"Could not click 'Mostrar mais': {e.msg}")
+            return False
+
+    def wait_for_new_cards(self):
+        def condition(driver):
+            return pending_cards(driver, self.spec) or False
+        return wait_until(self.driver, condition, self.timeout, "new cards appended")
+
+    def run(self):
+        # Every unique record in page order, or None if in-page extraction isn't available
+        new = self.harvest()
+        if new is None:
+            return None
+        print(f"{len(new)} products on the first load")
+
+        while self.clicks < self.max_clicks:
+            if not self.click():
+                print("No more 'Mostrar mais' button. All products loaded.")
+                break
+            self.clicks += 1
+
+            result = self.wait_for_new_cards()
+            if not result.satisfied:
+                print(f"No new cards {result.waited:.1f} s after click {self.clicks}. All products loaded.")
+                break
+            # Let the rest of the batch render before reading it
+            wait_for_dom_quiet(self.driver, quiet_ms=200, timeout=5)
+
+            new = self.harvest()
+            if new is None:
+                break
+            print(f"Click {self.clicks}: {len(new)} new products ({len(self.records)} so far, {result.waited:.2f} s)")
+            if not new:
+                print("Only products we already had. All products loaded.")
+                break
+        else:
+            print(f"Stopped after {self.max_clicks} clicks.")
+
+        # Cards that were still rendering when we stopped
+        self.harvest()
+        return self.records
+
+    def click_all(self):
+        # Clicks until the button is gone or a click adds no cards, without reading them
+        item = self.spec["item"]
+        while self.clicks < self.max_clicks:
+            count = self.driver.execute_script(_COUNT_JS, item)
+            if not self.click():
+                print("No more 'Mostrar mais' button. All products loaded.")
+                break
+            self.clicks += 1
+            result = wait_until(self.driver, lambda driver: driver.execute_script(_COUNT_JS, item) > count,
+                                self.timeout, "product count increased")
+            if not result.satisfied:
+                print(f"No new products {result.waited:.1f} s after click {self.clicks}. All products loaded.")
+                break
+        # Let the last batch finish rendering
+        wait_for_dom_quiet(self.driver, timeout=5)
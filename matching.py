@@ -0,0 +1,307 @@
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import os
+import random
+import re
+import sys
+import time
+import zlib
+from contextlib import closing
+
+from classifier import normalize
+from product_store import DB_PATH, connect
+
+# Cross-retailer product matching: the same whisky listed by Angeloni, Zona Sul and
+# Santa Luzia under three different descriptions gets one canonical product ID.
+#
+#   1. Descriptions are normalized (accents, case, punctuation), the pack size is
+#      parsed out ("1L" == "1000 ml") and generic words ("vinho", "tinto", "americano")
+#      are dropped, leaving the tokens that identify the product.
+#   2. Each product gets a MinHash signature of its tokens, and LSH banding puts
+#      products with similar token sets in the same bucket, so only products sharing a
+#      bucket are compared (no n^2 pass over the catalog).
+#   3. Candidates are confirmed on exact token Jaccard and matching pack size, and
+#      joined into clusters (union-find).
+#   4. Clusters get canonical IDs, reusing the ID already stored for any member, so
+#      IDs stay stable from run to run. They are stored in the product store's
+#      `matches` table.
+#
+#   python matching.py                       # match every active product in products.db
+#   python matching.py --show 20             # ... and print the biggest cross-retailer groups
+#   python matching.py output/*.jsonl --no-save
+#
+# Matching works on distinct products, not on price history rows, so it grows with the
+# catalog only. numpy is optional; without it signatures and LSH buckets are computed
+# in plain Python, which is much slower on a large catalog.
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_THRESHOLD = 0.6
+NUM_PERM = 64
+BANDS = 16
+# Buckets bigger than this are generic token sets ("cabernet sauvignon"); comparing
+# everything in them would bring the n^2 back, so they are skipped
+MAX_BUCKET = 200
+# Records per numpy signature batch (memory is records x shingles x NUM_PERM x 8 bytes)
+CHUNK_SIZE = 20_000
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+MASK_64 = (1 << 64) - 1
+
+STOPWORDS = {
+    "vinho", "vinhos", "tinto", "branco", "rose", "espumante", "whisky", "whiskey", "bourbon",
+    "americano", "americana", "americanos", "americanas", "estados", "unidos", "eua", "usa",
+    "importado", "importada", "garrafa", "lata", "caixa", "pacote", "unidade", "un", "und",
+    "de", "da", "do", "das", "dos", "e", "com", "sem", "the", "and", "of", "para",
+}
+
+_SIZE = re.compile(r"\b(\d+(?:[.,]\d+)?) ?(ml|cl|lt|l|litros?|kg|gr|g|oz)\b")
+_SIZE_UNITS = {"ml": 1, "cl": 10, "l": 1000, "lt": 1000, "litro": 1000, "litros": 1000,
+               "g": 1, "gr": 1, "kg": 1000, "oz": 28}
+
+MATCH_SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    retailer TEXT NOT NULL,
+    url TEXT NOT NULL,
+    canonical_id TEXT NOT NULL,
+    matched_at TEXT NOT NULL,
+    PRIMARY KEY (retailer, url)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS matches_canonical ON matches (canonical_id);
+"""
+
+
+def features(description):
+    # -> (identifying tokens, pack size in ml/g or None)
+    text = (description or "").lower().replace("'", "").replace("’", "")
+    # The size is read before normalize() strips the decimal separator out of "1,5 l"
+    size = None
+    match = _SIZE.search(text)
+    if match:
+        size = round(float(match.group(1).replace(",", ".")) * _SIZE_UNITS[match.group(2)])
+        text = text[:match.start()] + " " + text[match.end():]
+    tokens = frozenset(t for t in normalize(text).split() if t not in STOPWORDS and (len(t) > 1 or t.isdigit()))
+    return tokens, size
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+class MinHasher:
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.perms = [(rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME)) for _ in range(num_perm)]
+        if np is not None:
+            self._a = np.array([a for a, _ in self.perms], dtype=np.uint64)
+            self._b = np.array([b for _, b in self.perms], dtype=np.uint64)
+
+    @staticmethod
+    def shingle_hashes(tokens):
+        return [zlib.crc32(token.encode("utf-8")) for token in tokens]
+
+    def signatures(self, token_sets):
+        # One signature per non-empty token set: an (n, num_perm) array with numpy,
+        # else a list of tuples
+        if np is None:
+            return [
+                # Same arithmetic as the numpy path, including the 64-bit wraparound
+                tuple(min((((a * h + b) & MASK_64) % MERSENNE_PRIME) & MAX_HASH for h in self.shingle_hashes(tokens))
+                      for a, b in self.perms)
+                for tokens in token_sets
+            ]
+        signatures = [np.empty((0, self.num_perm), dtype=np.uint64)]
+        for start in range(0, len(token_sets), CHUNK_SIZE):
+            chunk = token_sets[start:start + CHUNK_SIZE]
+            hashes = [self.shingle_hashes(tokens) for tokens in chunk]
+            offsets = np.cumsum([0] + [len(h) for h in hashes[:-1]])
+            flat = np.array([h for row in hashes for h in row], dtype=np.uint64)
+            # uint64 products wrap around, which is fine for hashing
+            permuted = ((flat[:, None] * self._a + self._b) % np.uint64(MERSENNE_PRIME)) & np.uint64(MAX_HASH)
+            signatures.append(np.minimum.reduceat(permuted, offsets, axis=0))
+        return np.concatenate(signatures)
+
+
+def _band_buckets(signatures, band, rows):
+    # Groups (positions into `signatures`) that share this band of their signature
+    columns = slice(band * rows, (band + 1) * rows)
+    if np is None:
+        buckets = {}
+        for position, signature in enumerate(signatures):
+            buckets.setdefault(signature[columns], []).append(position)
+        return [members for members in buckets.values() if len(members) > 1]
+    if not len(signatures):
+        return []
+    # Sort the band's rows and split wherever they change, instead of a dict per band
+    keys = np.ascontiguousarray(signatures[:, columns]).view(f"V{rows * 8}").ravel()
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    starts = np.concatenate(([0], np.flatnonzero(sorted_keys[1:] != sorted_keys[:-1]) + 1, [len(keys)]))
+    shared = np.flatnonzero(np.diff(starts) > 1)
+    order = order.tolist()
+    return [order[starts[g]:starts[g + 1]] for g in shared.tolist()]
+
+
+class _UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i, j):
+        root_i, root_j = self.find(i), self.find(j)
+        if root_i != root_j:
+            self.parent[max(root_i, root_j)] = min(root_i, root_j)
+
+
+def match_products(records, threshold=DEFAULT_THRESHOLD, bands=BANDS, num_perm=NUM_PERM):
+    # records: dicts with retailer, url, description. Returns a list of clusters, each a
+    # list of indexes into `records`; products without identifying tokens stay alone.
+    rows = num_perm // bands
+    feats = [features(record.get("description")) for record in records]
+    indexed = [i for i, (tokens, _) in enumerate(feats) if tokens]
+    signatures = MinHasher(num_perm).signatures([feats[i][0] for i in indexed])
+
+    union_find = _UnionFind(len(records))
+    compared = set()
+    for band in range(bands):
+        for positions in _band_buckets(signatures, band, rows):
+            if len(positions) > MAX_BUCKET:
+                continue
+            members = [indexed[position] for position in positions]
+            for x, i in enumerate(members):
+                for j in members[x + 1:]:
+                    if (i, j) in compared:
+                        continue
+                    compared.add((i, j))
+                    (tokens_i, size_i), (tokens_j, size_j) = feats[i], feats[j]
+                    if size_i and size_j and size_i != size_j:
+                        continue
+                    if jaccard(tokens_i, tokens_j) >= threshold:
+                        union_find.union(i, j)
+
+    clusters = {}
+    for i in range(len(records)):
+        clusters.setdefault(union_find.find(i), []).append(i)
+    return list(clusters.values())
+
+
+def canonical_ids(records, clusters, previous=None):
+    # -> {(retailer, url): canonical_id}. A cluster keeps the ID most of its members
+    # already had; brand new clusters get an ID derived from their first member.
+    # IDs stay unique: when a cluster splits, its ID goes to the part holding most of
+    # its members and the other parts get new ones.
+    previous = previous or {}
+    cluster_keys = [sorted((records[i]["retailer"], records[i]["url"]) for i in cluster) for cluster in clusters]
+    # (members that had the ID, ID, cluster), largest overlap first
+    candidates = []
+    for index, keys in enumerate(cluster_keys):
+        known = [previous[key] for key in keys if key in previous]
+        candidates += [(known.count(canonical_id), canonical_id, index) for canonical_id in set(known)]
+    candidates.sort(key=lambda c: (-c[0], c[1], c[2]))
+
+    ids = {}
+    used = set()
+    for _, canonical_id, index in candidates:
+        if index not in ids and canonical_id not in used:
+            ids[index] = canonical_id
+            used.add(canonical_id)
+    for index, keys in enumerate(cluster_keys):
+        if index not in ids:
+            ids[index] = _new_id(keys, used)
+            used.add(ids[index])
+    return {key: ids[index] for index, keys in enumerate(cluster_keys) for key in keys}
+
+
+def _new_id(keys, used):
+    # Hash of the first member, or of the next one if that ID is taken (a split cluster
+    # keeps the ID its first member minted)
+    for salt in itertools.count():
+        for retailer, url in keys:
+            text = f"{retailer}\n{url}" + (f"\n{salt}" if salt else "")
+            canonical_id = "p" + hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+            if canonical_id not in used:
+                return canonical_id
+
+
+def load_store_products(db_path=None):
+    with closing(connect(db_path)) as connection:
+        rows = connection.execute(
+            "SELECT retailer, url, description, price FROM products WHERE active = 1 ORDER BY retailer, url"
+        ).fetchall()
+    return [{"retailer": r, "url": u, "description": d, "price": p} for r, u, d, p in rows]
+
+
+def load_file_products(path):
+    # CSV or JSONL in the common record schema (see sinks.py)
+    with open(path, newline="", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()] if path.endswith(".jsonl") else list(csv.DictReader(f))
+    return [r for r in records if r.get("url") and r.get("retailer")]
+
+
+def load_matches(db_path=None):
+    with closing(connect(db_path)) as connection:
+        connection.executescript(MATCH_SCHEMA)
+        return {(r, u): c for r, u, c in connection.execute("SELECT retailer, url, canonical_id FROM matches")}
+
+
+def save_matches(assigned, db_path=None):
+    now = time.strftime("%Y-%m-%dT%H:%M:%S")
+    with closing(connect(db_path)) as connection, connection:
+        connection.executescript(MATCH_SCHEMA)
+        connection.executemany(
+            "INSERT INTO matches (retailer, url, canonical_id, matched_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (retailer, url) DO UPDATE SET canonical_id = excluded.canonical_id, matched_at = excluded.matched_at "
+            "WHERE canonical_id != excluded.canonical_id",
+            [(retailer, url, canonical_id, now) for (retailer, url), canonical_id in assigned.items()],
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Match the same product across retailers")
+    parser.add_argument("files", nargs="*", help="CSV/JSONL files in the common schema (default: the product store)")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="token Jaccard needed to match")
+    parser.add_argument("--show", type=int, default=0, help="print the N biggest cross-retailer groups")
+    parser.add_argument("--no-save", action="store_true", help="don't write canonical IDs to the product store")
+    args = parser.parse_args()
+
+    if args.files:
+        records = [record for path in args.files for record in load_file_products(path)]
+    elif args.db and os.path.exists(args.db):
+        records = load_store_products(args.db)
+    else:
+        print(f"No product store at '{args.db}' and no files given.")
+        sys.exit(1)
+
+    start_time = time.time()
+    clusters = match_products(records, args.threshold)
+    previous = load_matches(args.db) if args.db and not args.no_save else {}
+    assigned = canonical_ids(records, clusters, previous)
+    elapsed = time.time() - start_time
+
+    cross = [c for c in clusters if len({records[i]["retailer"] for i in c}) > 1]
+    print(f"{len(records)} products -> {len(clusters)} distinct, {len(cross)} sold by more than one retailer "
+          f"({elapsed:.2f} seconds{'' if np is not None else ', without numpy'})")
+
+    for cluster in sorted(cross, key=len, reverse=True)[:args.show]:
+        print(f"\n{assigned[(records[cluster[0]]['retailer'], records[cluster[0]]['url'])]}")
+        for i in cluster:
+            record = records[i]
+            print(f"  {record['retailer']:<11} {record.get('price') or '':>10}  {record.get('description')}")
+
+    if not args.no_save and args.db:
+        save_matches(assigned, args.db)
+        print(f"Canonical IDs saved to '{args.db}'")
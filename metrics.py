@@ -0,0 +1,307 @@
+import argparse
+import atexit
+import concurrent.futures
+import contextvars
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Per-phase timings and counters for a scraper run. Code wraps each phase in a span,
+# and at exit the run is appended to metrics/runs.jsonl (JSON) or written as
+# metrics/<retailer>.prom (Prometheus text format, for node_exporter's textfile collector):
+#
+#   with span("navigation"):
+#       driver.get(url)
+#
+#   SCRAPER_METRICS=json python santaluzia.py
+#   SCRAPER_METRICS=prometheus python run_all.py    # every job exports its own file
+#   SCRAPER_METRICS=json python daemon.py           # exported as each job finishes
+#   python metrics.py                               # last run vs. the ones before it
+#
+# Phases: driver_startup, navigation, wait, page_source, parse, extraction, classify,
+# write, http, backoff (waiting to retry). Pages (with their product counts) and bytes
+# transferred are counted too.
+# With SCRAPER_METRICS unset, span() hands back one shared no-op context manager and
+# the counters return straight away.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+METRICS_FORMAT = os.environ.get("SCRAPER_METRICS", "")
+METRICS_DIR = os.environ.get("SCRAPER_METRICS_DIR", os.path.join(HERE, "metrics"))
+ENABLED = METRICS_FORMAT in ("json", "prometheus")
+
+# Every scraper runs in its own process and is named after its retailer, so that is
+# the default label; code that knows better passes the retailer explicitly, and the
+# daemon (many retailers in one process) sets it per job with retailer_context()
+DEFAULT_RETAILER = os.environ.get("SCRAPER_RETAILER") or os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0]
+
+_retailer = contextvars.ContextVar("retailer", default=None)
+
+# Phases whose time per call goes up by more than this factor (against the median of
+# earlier runs) are flagged by the CLI
+REGRESSION_FACTOR = 1.5
+
+_NO_SPAN = nullcontext()
+
+
+def current_retailer():
+    return _retailer.get() or DEFAULT_RETAILER
+
+
+@contextmanager
+def retailer_context(retailer):
+    # Unlabelled spans and counters inside the block (and in threads started from it
+    # through ContextThreadPoolExecutor or asyncio) are recorded for `retailer`
+    token = _retailer.set(retailer)
+    try:
+        yield
+    finally:
+        _retailer.reset(token)
+
+
+class ContextThreadPoolExecutor(concurrent.futures.ThreadPoolExecutor):
+    # Runs each task in a copy of the submitting thread's context, like asyncio does, so
+    # a job's worker threads keep its retailer label (and, under the daemon, its log)
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+class _Span:
+    __slots__ = ("metrics", "phase", "retailer", "start")
+
+    def __init__(self, metrics, phase, retailer):
+        self.metrics = metrics
+        self.phase = phase
+        self.retailer = retailer
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.phase, time.perf_counter() - self.start, self.retailer)
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.phases = {}    # (retailer, phase) -> [calls, seconds, max seconds]
+        self.pages = {}     # retailer -> [products on each page]
+        self.bytes = {}     # (retailer, source) -> bytes
+
+    def observe(self, phase, seconds, retailer=None):
+        key = (retailer or current_retailer(), phase)
+        with self._lock:
+            stats = self.phases.setdefault(key, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+
+    def count_page(self, products, retailer=None):
+        with self._lock:
+            self.pages.setdefault(retailer or current_retailer(), []).append(products)
+
+    def add_bytes(self, count, source, retailer=None):
+        key = (retailer or current_retailer(), source)
+        with self._lock:
+            self.bytes[key] = self.bytes.get(key, 0) + count
+
+    def snapshot(self, retailers=None, started_at=None, reset=False):
+        # One dict per retailer seen in this run (or per one of `retailers`). reset drops
+        # what was reported, so the next snapshot only has what came after it.
+        started_at = started_at or self.started_at
+        with self._lock:
+            seen = {retailer for retailer, _ in self.phases} | set(self.pages) | {r for r, _ in self.bytes}
+            runs = []
+            for retailer in sorted(seen if retailers is None else seen & set(retailers)):
+                page_counts = self.pages.get(retailer, [])
+                runs.append({
+                    "retailer": retailer,
+                    "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started_at)),
+                    "duration_seconds": round(time.time() - started_at, 3),
+                    "phases": {
+                        phase: {"calls": calls, "seconds": round(seconds, 4), "max_seconds": round(longest, 4)}
+                        for (r, phase), (calls, seconds, longest) in sorted(self.phases.items()) if r == retailer
+                    },
+                    "pages": len(page_counts),
+                    "products": sum(page_counts),
+                    "products_per_page": page_counts,
+                    "bytes": {source: count for (r, source), count in sorted(self.bytes.items()) if r == retailer},
+                })
+                if reset:
+                    self.pages.pop(retailer, None)
+                    for table in (self.phases, self.bytes):
+                        for key in [key for key in table if key[0] == retailer]:
+                            del table[key]
+            return runs
+
+
+metrics = Metrics()
+
+
+def span(phase, retailer=None):
+    if not ENABLED:
+        return _NO_SPAN
+    return _Span(metrics, phase, retailer)
+
+
+def count_page(products, retailer=None):
+    # products: how many products one result page (or API page) gave us
+    if ENABLED:
+        metrics.count_page(products, retailer)
+
+
+def add_bytes(count, source, retailer=None):
+    # source: "http", "page_source", "browser" (the network, from the performance log)...
+    if ENABLED and count:
+        metrics.add_bytes(count, source, retailer)
+
+
+def page_source(driver, retailer=None):
+    # driver.page_source, timed and counted
+    if not ENABLED:
+        return driver.page_source
+    with span("page_source", retailer):
+        html = driver.page_source
+    add_bytes(len(html.encode("utf-8")), "page_source", retailer)
+    return html
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def to_prometheus(run, started_at=None):
+    retailer = _label(run["retailer"])
+    lines = [
+        "# HELP scraper_phase_seconds_total Time spent in each phase of the run.",
+        "# TYPE scraper_phase_seconds_total counter",
+    ]
+    lines += [f'scraper_phase_seconds_total{{retailer="{retailer}",phase="{_label(phase)}"}} {stats["seconds"]}'
+              for phase, stats in run["phases"].items()]
+    lines += ["# HELP scraper_phase_calls_total Number of spans recorded for each phase.",
+              "# TYPE scraper_phase_calls_total counter"]
+    lines += [f'scraper_phase_calls_total{{retailer="{retailer}",phase="{_label(phase)}"}} {stats["calls"]}'
+              for phase, stats in run["phases"].items()]
+    lines += ["# HELP scraper_phase_max_seconds Longest single span of each phase.",
+              "# TYPE scraper_phase_max_seconds gauge"]
+    lines += [f'scraper_phase_max_seconds{{retailer="{retailer}",phase="{_label(phase)}"}} {stats["max_seconds"]}'
+              for phase, stats in run["phases"].items()]
+    lines += [
+        "# HELP scraper_pages_total Result pages read.",
+        "# TYPE scraper_pages_total counter",
+        f'scraper_pages_total{{retailer="{retailer}"}} {run["pages"]}',
+        "# HELP scraper_products_total Products extracted from those pages.",
+        "# TYPE scraper_products_total counter",
+        f'scraper_products_total{{retailer="{retailer}"}} {run["products"]}',
+        "# HELP scraper_bytes_total Bytes transferred, by source.",
+        "# TYPE scraper_bytes_total counter",
+    ]
+    lines += [f'scraper_bytes_total{{retailer="{retailer}",source="{_label(source)}"}} {count}'
+              for source, count in run["bytes"].items()]
+    lines += [
+        "# HELP scraper_run_duration_seconds Wall-clock time of the run.",
+        "# TYPE scraper_run_duration_seconds gauge",
+        f'scraper_run_duration_seconds{{retailer="{retailer}"}} {run["duration_seconds"]}',
+        "# HELP scraper_run_timestamp_seconds When the run started.",
+        "# TYPE scraper_run_timestamp_seconds gauge",
+        f'scraper_run_timestamp_seconds{{retailer="{retailer}"}} {round(started_at or metrics.started_at, 3)}',
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def print_summary(run):
+    print(f"[{run['retailer']}] {run['duration_seconds']:.2f} s, {run['pages']} pages, {run['products']} products")
+    for phase, stats in sorted(run["phases"].items(), key=lambda item: -item[1]["seconds"]):
+        print(f"  {phase:<16} {stats['seconds']:>9.3f} s  {stats['calls']:>6} calls  max {stats['max_seconds']:.3f} s")
+    for source, count in run["bytes"].items():
+        print(f"  {source:<16} {count / 1024:>9.0f} KiB")
+
+
+def export(fmt=None, metrics_dir=None, retailer=None, started_at=None):
+    # Everything recorded so far; with `retailer`, only that retailer's run (started at
+    # `started_at`), which is then cleared - the daemon exports each job as it finishes
+    fmt = fmt or METRICS_FORMAT
+    metrics_dir = metrics_dir or METRICS_DIR
+    if fmt not in ("json", "prometheus"):
+        return
+    runs = metrics.snapshot([retailer] if retailer else None, started_at, reset=retailer is not None)
+    if not runs:
+        return
+    os.makedirs(metrics_dir, exist_ok=True)
+    for run in runs:
+        print_summary(run)
+        if fmt == "prometheus":
+            # Written whole and renamed, so a collector never reads half a file
+            path = os.path.join(metrics_dir, f"{run['retailer']}.prom")
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                f.write(to_prometheus(run, started_at))
+            os.replace(path + ".tmp", path)
+    if fmt == "json":
+        with open(os.path.join(metrics_dir, "runs.jsonl"), "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(run, ensure_ascii=False) + "\n" for run in runs)
+
+
+if ENABLED:
+    atexit.register(export)
+
+
+def load_runs(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def compare(runs, retailer, history=10):
+    # Each phase of the retailer's last run against the median time per call of the
+    # `history` runs before it (one slow outlier run doesn't move the baseline); returns
+    # rows of (phase, baseline, last, ratio)
+    runs = [run for run in runs if run["retailer"] == retailer]
+    if not runs:
+        return []
+    last, previous = runs[-1], runs[-history - 1:-1]
+    rows = []
+    for phase, stats in last["phases"].items():
+        per_call = stats["seconds"] / stats["calls"] if stats["calls"] else 0.0
+        history_per_call = [run["phases"][phase]["seconds"] / run["phases"][phase]["calls"]
+                            for run in previous if run["phases"].get(phase, {}).get("calls")]
+        baseline = statistics.median(history_per_call) if history_per_call else None
+        ratio = per_call / baseline if baseline else None
+        rows.append((phase, baseline, per_call, ratio))
+    return sorted(rows, key=lambda row: -(row[2]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the latest scraper run against earlier ones")
+    parser.add_argument("retailers", nargs="*", help="retailers to report (default: all in the file)")
+    parser.add_argument("--runs", default=os.path.join(METRICS_DIR, "runs.jsonl"))
+    parser.add_argument("--history", type=int, default=10, help="earlier runs to compare against")
+    parser.add_argument("--factor", type=float, default=REGRESSION_FACTOR,
+                        help="flag phases this many times slower per call than the median")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.runs):
+        print(f"No metrics at '{args.runs}'. Run a scraper with SCRAPER_METRICS=json first.")
+        sys.exit(1)
+
+    all_runs = load_runs(args.runs)
+    regressed = False
+    for retailer in args.retailers or sorted({run["retailer"] for run in all_runs}):
+        rows = compare(all_runs, retailer, args.history)
+        if not rows:
+            print(f"[{retailer}] no runs recorded")
+            continue
+        print(f"[{retailer}] ms per call, last run vs. median of up to {args.history} before it")
+        for phase, baseline, last, ratio in rows:
+            flag = ""
+            if ratio is not None and ratio > args.factor:
+                flag = "  REGRESSION"
+                regressed = True
+            before = "-" if baseline is None else f"{baseline * 1000:.1f}"
+            change = "" if ratio is None else f"  x{ratio:.2f}"
+            print(f"  {phase:<16} {before:>10} -> {last * 1000:>10.1f}{change}{flag}")
+
+    sys.exit(1 if regressed else 0)
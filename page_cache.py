@@ -0,0 +1,242 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.parse
+
+# On-disk cache of what the scrapers fetched: rendered HTML from the browser paths and
+# JSON from the HTTP paths, keyed by retailer + normalized URL. Rerunning after a failed
+# run, or while iterating on selectors, reads pages back from here instead of the network.
+#
+#   SCRAPER_CACHE=1 python santaluzia.py          # read through the cache, fetch misses
+#   SCRAPER_CACHE=offline python santaluzia.py    # also serve expired entries as-is
+#
+# Entries expire after SCRAPER_CACHE_TTL seconds. Expired HTTP entries that came with an
+# ETag or Last-Modified are revalidated with a conditional request instead of refetched.
+# The cache is capped at SCRAPER_CACHE_MAX_MB; the least recently used entries go first.
+#
+# Layout: <dir>/<retailer>/<key>.body + <key>.meta.json, the same shape as fixtures.py.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CACHE_MODE = os.environ.get("SCRAPER_CACHE", "0")
+CACHE_DIR = os.environ.get("SCRAPER_CACHE_DIR", os.path.join(HERE, ".cache", "pages"))
+CACHE_TTL = float(os.environ.get("SCRAPER_CACHE_TTL", str(6 * 3600)))
+CACHE_MAX_BYTES = int(float(os.environ.get("SCRAPER_CACHE_MAX_MB", "500")) * 1024 * 1024)
+
+# Eviction goes a bit below the cap so we don't evict again on the very next write
+EVICT_TO = 0.9
+
+# Query parameters that never change the page content
+IGNORED_PARAMS = {"utm_source", "utm_medium", "utm_campaign", "utm_term", "utm_content", "gclid", "fbclid"}
+
+
+def cache_enabled():
+    return CACHE_MODE in ("1", "offline")
+
+
+def normalize_url(url):
+    # Same page, same key: lowercase scheme/host, no default port or fragment,
+    # tracking parameters dropped and the rest sorted
+    parsed = urllib.parse.urlsplit(url.strip())
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or "").lower()
+    if parsed.port and (scheme, parsed.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{parsed.port}"
+    params = [(k, v) for k, v in urllib.parse.parse_qsl(parsed.query, keep_blank_values=True) if k not in IGNORED_PARAMS]
+    query = urllib.parse.urlencode(sorted(params), doseq=True)
+    return urllib.parse.urlunsplit((scheme, host, parsed.path or "/", query, ""))
+
+
+class CacheEntry:
+    def __init__(self, cache, path, meta):
+        self._cache = cache
+        self.path = path
+        self.meta = meta
+
+    @property
+    def url(self):
+        return self.meta["url"]
+
+    @property
+    def headers(self):
+        return self.meta.get("headers") or {}
+
+    @property
+    def etag(self):
+        return self.meta.get("etag")
+
+    @property
+    def last_modified(self):
+        return self.meta.get("last_modified")
+
+    @property
+    def age(self):
+        return time.time() - self.meta["stored_at"]
+
+    @property
+    def fresh(self):
+        return self._cache.offline or self.age < self._cache.ttl
+
+    @property
+    def revalidatable(self):
+        return bool(self.etag or self.last_modified)
+
+    def conditional_headers(self):
+        # Headers for a conditional GET; a 304 answer means the cached body is still good
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def read(self):
+        with open(self.path, encoding="utf-8") as f:
+            return f.read()
+
+    def json(self):
+        return json.loads(self.read())
+
+
+class PageCache:
+    def __init__(self, cache_dir=CACHE_DIR, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES, offline=CACHE_MODE == "offline"):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self._lock = threading.Lock()
+        self._total = None
+
+    def _paths(self, retailer, url):
+        key = hashlib.sha1(f"{retailer}\n{normalize_url(url)}".encode("utf-8")).hexdigest()[:20]
+        directory = os.path.join(self.cache_dir, retailer or "_")
+        return os.path.join(directory, f"{key}.body"), os.path.join(directory, f"{key}.meta.json")
+
+    def get(self, retailer, url):
+        # Returns the entry whether fresh or not (check entry.fresh), or None on a miss
+        body_path, meta_path = self._paths(retailer, url)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            # The body's mtime is the last use, which is what eviction sorts on
+            os.utime(body_path)
+        except (OSError, ValueError):
+            return None
+        return CacheEntry(self, body_path, meta)
+
+    def put(self, retailer, url, body, kind="html", headers=None):
+        headers = headers or {}
+        body_path, meta_path = self._paths(retailer, url)
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+        data = body.encode("utf-8")
+        meta = {
+            "retailer": retailer,
+            "url": url,
+            "kind": kind,
+            "stored_at": time.time(),
+            "etag": _header(headers, "ETag"),
+            "last_modified": _header(headers, "Last-Modified"),
+            "headers": dict(headers),
+        }
+
+        with self._lock:
+            previous = os.path.getsize(body_path) if os.path.exists(body_path) else 0
+            _write_atomic(body_path, data)
+            _write_atomic(meta_path, json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+            if self._total is not None:
+                self._total += len(data) - previous
+            self._evict_locked()
+        return CacheEntry(self, body_path, meta)
+
+    def refresh(self, entry):
+        # A 304 answer: keep the body, restart the TTL
+        entry.meta["stored_at"] = time.time()
+        meta_path = entry.path[:-len(".body")] + ".meta.json"
+        with self._lock:
+            _write_atomic(meta_path, json.dumps(entry.meta, ensure_ascii=False).encode("utf-8"))
+        return entry
+
+    def _bodies(self):
+        if not os.path.isdir(self.cache_dir):
+            return
+        for retailer in os.listdir(self.cache_dir):
+            directory = os.path.join(self.cache_dir, retailer)
+            if not os.path.isdir(directory):
+                continue
+            for filename in os.listdir(directory):
+                if filename.endswith(".body"):
+                    path = os.path.join(directory, filename)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, stat.st_size, stat.st_mtime
+
+    def _evict_locked(self):
+        if self._total is None:
+            self._total = sum(size for _, size, _ in self._bodies())
+        if self._total <= self.max_bytes:
+            return
+        target = self.max_bytes * EVICT_TO
+        for path, size, _ in sorted(self._bodies(), key=lambda item: item[2]):
+            if self._total <= target:
+                break
+            for stale in (path, path[:-len(".body")] + ".meta.json"):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+            self._total -= size
+
+    def size(self):
+        with self._lock:
+            self._total = sum(size for _, size, _ in self._bodies())
+            return self._total
+
+
+def _header(headers, name):
+    # Response headers come back as a plain dict, so match case-insensitively
+    for key, value in headers.items():
+        if key.lower() == name.lower():
+            return value
+    return None
+
+
+def _write_atomic(path, data):
+    # Several threads (and the scrapers run in parallel) may write the same entry
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    # Process-wide cache; None when SCRAPER_CACHE is off
+    global _cache
+    if not cache_enabled():
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = PageCache()
+        return _cache
+
+
+def cached_html(retailer, url):
+    # Rendered HTML for a browser page if we have a usable copy, else None
+    cache = get_cache()
+    entry = cache.get(retailer, url) if cache else None
+    if entry is None or not entry.fresh:
+        return None
+    return entry.read()
+
+
+def store_html(retailer, url, html, headers=None):
+    # headers: the HTTP response's, so the entry can be revalidated once it expires
+    cache = get_cache()
+    if cache:
+        cache.put(retailer, url, html, "html", headers)
@@ -0,0 +1,213 @@
+import argparse
+import http.client
+import json
+import math
+import os
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fixtures import load_fixtures, read_fixture, record_json, recording_enabled
+from governor import CircuitOpenError, get_governor
+from metrics import ContextThreadPoolExecutor, add_bytes, count_page, span
+from page_cache import get_cache
+from vtex_api import USER_AGENT, format_brl
+
+# Pão de Açúcar search over its backing JSON API instead of the rendered page. The
+# storefront's search grid is filled from Linx Impulse ("engage" search), which pages
+# through the whole result set with prices, so we read every page of that directly and
+# concurrently instead of scraping the first batch of cards.
+#
+#   records = fetch_products("estados unidos")
+#
+# The endpoint, API key and sales channel (the store whose prices we get) are
+# configurable, so the client can be pointed at a local stub that replays responses
+# recorded with SCRAPER_RECORD_FIXTURES=1:
+#
+#   python pao_api.py --stub                  # serves fixtures/pao on 127.0.0.1:8766
+#   SCRAPER_PAO_SEARCH_URL=http://127.0.0.1:8766/engage/search/v3/search python pao.py
+
+SEARCH_URL = os.environ.get("SCRAPER_PAO_SEARCH_URL", "https://api.linximpulse.com/engage/search/v3/search")
+API_KEY = os.environ.get("SCRAPER_PAO_API_KEY", "paodeacucar")
+SALES_CHANNEL = os.environ.get("SCRAPER_PAO_SALES_CHANNEL", "")
+ORIGIN = "https://www.paodeacucar.com"
+STUB_PORT = 8766
+
+PAGE_SIZE = int(os.environ.get("SCRAPER_PAO_PAGE_SIZE", "48"))
+# Hard stop so a misbehaving API can't keep us paging forever
+MAX_PAGES = 50
+MAX_WORKERS = 4
+
+
+class PaoApiError(Exception):
+    # Raised when the search API can't be used (HTTP error, unexpected payload...);
+    # retailers.fetch_api catches this and pao.py falls back to the browser
+    pass
+
+
+def product_price(product):
+    # Price of the product itself, else of its first SKU that has one
+    price = product.get("price")
+    if price is None:
+        for sku in product.get("skus") or []:
+            price = (sku.get("properties") or {}).get("price")
+            if price is not None:
+                break
+    return format_brl(price) if isinstance(price, (int, float)) else None
+
+
+def product_record(product):
+    # Map one search API product to the {description, price, url} record the scrapers write
+    url = product.get("url") or ""
+    return {
+        "description": (product.get("name") or "").strip() or None,
+        "price": product_price(product),
+        # The API returns protocol-relative links ("//www.paodeacucar.com/produto/...")
+        "url": urllib.parse.urljoin(ORIGIN + "/", url) if url else None,
+    }
+
+
+class PaoClient:
+    def __init__(self, search_url=SEARCH_URL, api_key=API_KEY, sales_channel=SALES_CHANNEL,
+                 page_size=PAGE_SIZE, timeout=15, opener=None):
+        self.search_url = search_url
+        self.api_key = api_key
+        self.sales_channel = sales_channel
+        self.page_size = page_size
+        self.timeout = timeout
+        self.opener = opener or urllib.request.build_opener()
+
+    def page_url(self, terms, page):
+        params = {
+            "apiKey": self.api_key,
+            "origin": ORIGIN,
+            "terms": terms,
+            "page": page,
+            "resultsPerPage": self.page_size,
+            "sortBy": "relevance",
+        }
+        if self.sales_channel:
+            params["salesChannel"] = self.sales_channel
+        return f"{self.search_url}?{urllib.parse.urlencode(params)}"
+
+    def _get_json(self, url):
+        request_headers = {
+            "Accept": "application/json",
+            "User-Agent": USER_AGENT,
+            "Origin": ORIGIN,
+            "Referer": ORIGIN + "/",
+        }
+        # Fresh cached pages never hit the network; stale ones are revalidated if we can
+        cache = get_cache()
+        entry = cache.get("pao", url) if cache else None
+        if entry is not None:
+            if entry.fresh:
+                return entry.json()
+            request_headers.update(entry.conditional_headers())
+
+        request = urllib.request.Request(url, headers=request_headers)
+
+        def get():
+            with span("http", "pao"), self.opener.open(request, timeout=self.timeout) as response:
+                return response.read(), dict(response.headers)
+
+        try:
+            body, headers = get_governor(self.search_url).call(get, retailer="pao")
+        except CircuitOpenError as e:
+            raise PaoApiError(str(e)) from e
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and entry is not None:
+                cache.refresh(entry)
+                return entry.json()
+            raise PaoApiError(f"{url} returned HTTP {e.code}") from e
+        except (http.client.HTTPException, OSError) as e:
+            # Connection refused or dropped, timeouts, truncated bodies...
+            raise PaoApiError(f"{url} failed: {type(e).__name__}: {e}") from e
+        add_bytes(len(body), "http", "pao")
+
+        try:
+            data = json.loads(body)
+        except ValueError as e:
+            raise PaoApiError(f"{url} did not return JSON") from e
+        if not isinstance(data, dict) or not isinstance(data.get("products"), list):
+            raise PaoApiError(f"unexpected search payload from {url}")
+        if cache:
+            cache.put("pao", url, body.decode("utf-8"), "json", headers)
+        return data
+
+    def fetch_page(self, terms, page):
+        url = self.page_url(terms, page)
+        data = self._get_json(url)
+        records = [product_record(product) for product in data["products"]]
+        count_page(len(records), "pao")
+        if recording_enabled():
+            record_json("pao", url, data, "linx", records)
+        return data, records
+
+    def search(self, terms):
+        # Page 1 tells us how many results there are; the other pages are fetched in
+        # parallel and returned in page order
+        data, records = self.fetch_page(terms, 1)
+        total = data.get("size") or 0
+        pages = min(math.ceil(total / self.page_size), MAX_PAGES) if total else 1
+        print(f"Search API: {total} results for '{terms}' over {pages} page(s)")
+
+        with ContextThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            for _, page_records in executor.map(lambda page: self.fetch_page(terms, page), range(2, pages + 1)):
+                records.extend(page_records)
+        return records
+
+
+def fetch_products(terms, client=None):
+    # Every product the search API has for terms, or raises PaoApiError
+    return (client or PaoClient()).search(terms)
+
+
+def serve_stub(port=STUB_PORT, fixtures_dir=None):
+    # Replays the recorded search responses: a request gets the recording for the same
+    # terms and page number, or an empty result
+    recordings = {}
+    for fixture in load_fixtures("pao", fixtures_dir):
+        if fixture.kind == "linx":
+            params = urllib.parse.parse_qs(urllib.parse.urlsplit(fixture.url).query)
+            key = (params.get("terms", [""])[0], params.get("page", ["1"])[0])
+            recordings[key] = read_fixture(fixture)
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            params = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+            page = params.get("page", ["1"])[0]
+            terms = params.get("terms", [""])[0]
+            payload = recordings.get((terms, page), {"size": 0, "products": []})
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    print(f"Replaying {len(recordings)} recorded page(s) at http://127.0.0.1:{server.server_port}/engage/search/v3/search")
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pão de Açúcar search API client")
+    parser.add_argument("terms", nargs="?", default="estados unidos")
+    parser.add_argument("--stub", action="store_true", help="serve the recorded responses instead of searching")
+    parser.add_argument("--port", type=int, default=STUB_PORT)
+    parser.add_argument("--fixtures", help="fixture directory for --stub (default: fixtures/)")
+    args = parser.parse_args()
+
+    if args.stub:
+        try:
+            serve_stub(args.port, args.fixtures).serve_forever()
+        except KeyboardInterrupt:
+            pass
+    else:
+        for record in fetch_products(args.terms):
+            print(f"{record['description']} | {record['price']} | {record['url']}")
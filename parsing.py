@@ -0,0 +1,215 @@
+import os
+import re
+from urllib.parse import urljoin
+
+from fixtures import record_html, recording_enabled
+from metrics import count_page, span
+
+# Python-side counterpart of browser_extract.py: takes the same product_spec a scraper
+# declares for in-browser extraction and applies it to saved / rendered HTML.
+#
+#   parser = SpecParser(product_spec)          # selectors compiled once
+#   records = parser.extract(html, base_url)   # [{description, price, url}, ...]
+#
+# Backends (SCRAPER_PARSER or the backend argument):
+#   "selectolax"  - lexbor C parser, fastest
+#   "lxml"        - BeautifulSoup on top of lxml
+#   "html.parser" - BeautifulSoup with the stdlib parser (what the scripts used originally)
+# The default is the fastest one that is installed.
+#
+# An optional "strainer" in the spec, (tag or None, class regex), makes the BeautifulSoup
+# backends build only the product grid subtree instead of the whole document.
+
+PARSER_BACKEND = os.environ.get("SCRAPER_PARSER")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def available_backends():
+    backends = []
+    try:
+        import selectolax.lexbor  # noqa: F401
+        backends.append("selectolax")
+    except ImportError:
+        pass
+    try:
+        import lxml  # noqa: F401
+        backends.append("lxml")
+    except ImportError:
+        pass
+    backends.append("html.parser")
+    return backends
+
+
+def default_backend():
+    if PARSER_BACKEND:
+        return PARSER_BACKEND
+    return available_backends()[0]
+
+
+def clean_text(text):
+    return _WHITESPACE.sub(" ", text).strip() if text is not None else None
+
+
+class _SoupBackend:
+    def __init__(self, parser_name, strainer):
+        import soupsieve
+        from bs4 import BeautifulSoup, SoupStrainer
+        self._soupsieve = soupsieve
+        self._beautiful_soup = BeautifulSoup
+        self.parser_name = parser_name
+        self.strainer = None
+        if strainer:
+            name, class_pattern = strainer
+            self.strainer = SoupStrainer(name, class_=re.compile(class_pattern))
+        self._compiled = {}
+
+    def compile(self, css):
+        if css not in self._compiled:
+            self._compiled[css] = self._soupsieve.compile(css)
+        return self._compiled[css]
+
+    def parse(self, html, strain=True):
+        return self._beautiful_soup(html, self.parser_name, parse_only=self.strainer if strain else None)
+
+    def select(self, node, css):
+        return self.compile(css).select(node)
+
+    def select_one(self, node, css):
+        return self.compile(css).select_one(node)
+
+    def closest(self, node, css):
+        return self.compile(css).closest(node)
+
+    def text(self, node):
+        return clean_text(node.get_text(" "))
+
+    def attr(self, node, name):
+        value = node.get(name)
+        return " ".join(value) if isinstance(value, list) else value
+
+
+class _SelectolaxBackend:
+    # selectolax compiles selectors internally, so there is nothing to cache here
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+        self._html_parser = LexborHTMLParser
+
+    def compile(self, css):
+        return css
+
+    def parse(self, html, strain=True):
+        return self._html_parser(html)
+
+    # lexbor matches the node itself as well; drop it so selectors only look at
+    # descendants, like querySelector and soupsieve do
+    def select(self, node, css):
+        own_id = getattr(node, "mem_id", None)
+        return [n for n in node.css(css) if n.mem_id != own_id]
+
+    def select_one(self, node, css):
+        for match in self.select(node, css):
+            return match
+        return None
+
+    def closest(self, node, css):
+        parent = node.parent
+        while parent is not None and parent.tag not in ("html", "-undef"):
+            if parent.css_matches(css):
+                return parent
+            parent = parent.parent
+        return None
+
+    def text(self, node):
+        return clean_text(node.text(separator=" "))
+
+    def attr(self, node, name):
+        return node.attributes.get(name)
+
+
+def make_backend(backend=None, strainer=None):
+    backend = backend or default_backend()
+    if backend == "selectolax":
+        return _SelectolaxBackend()
+    if backend in ("lxml", "html.parser"):
+        return _SoupBackend(backend, strainer)
+    raise ValueError(f"unknown parser backend: {backend}")
+
+
+class SpecParser:
+    def __init__(self, spec, backend=None):
+        self.spec = spec
+        self.backend = make_backend(backend, spec.get("strainer"))
+        # Compile every selector up front so parsing a page never re-parses a selector
+        for css in [spec["item"], spec.get("url"), spec.get("url_closest"), spec.get("url_fallback")] \
+                + list(spec.get("description") or []) + list(spec.get("price") or []):
+            if css:
+                self.backend.compile(css)
+
+    def parse(self, html, strain=True):
+        # strain=False keeps the whole document, for page-level lookups outside the grid
+        with span("parse", self.spec.get("retailer")):
+            return self.backend.parse(html, strain)
+
+    def text(self, document, css):
+        # Text of the first element matching css anywhere in the document, or None
+        node = self.backend.select_one(document, css)
+        return self.backend.text(node) if node is not None else None
+
+    def _first(self, item, selectors):
+        for css in selectors:
+            node = item if css == "" else self.backend.select_one(item, css)
+            if node is not None:
+                return node
+        return None
+
+    def _record(self, item, base_url):
+        backend = self.backend
+        spec = self.spec
+
+        description = None
+        if spec.get("description_attr"):
+            description = backend.attr(item, spec["description_attr"])
+        elif spec.get("description"):
+            node = self._first(item, spec["description"])
+            description = backend.text(node) if node is not None else None
+
+        price = None
+        if spec.get("price"):
+            parts = [backend.select_one(item, css) for css in spec["price"]]
+            if all(part is not None for part in parts):
+                price = "".join(backend.text(part) for part in parts)
+                for token in spec.get("price_strip") or []:
+                    price = price.replace(token, "")
+                price = price.replace("\xa0", "").strip()
+
+        if spec.get("url_closest"):
+            link = backend.closest(item, spec["url_closest"])
+        elif spec.get("url") == "":
+            link = item
+        elif spec.get("url"):
+            link = backend.select_one(item, spec["url"])
+        else:
+            link = None
+        href = backend.attr(link, spec.get("url_attr") or "href") if link is not None else None
+        if not href and spec.get("url_fallback"):
+            fallback = backend.select_one(item, spec["url_fallback"])
+            href = backend.attr(fallback, "href") if fallback is not None else None
+
+        return {
+            "description": description,
+            "price": price,
+            "url": urljoin(base_url, href) if href else None,
+        }
+
+    def records(self, document, base_url):
+        with span("extraction", self.spec.get("retailer")):
+            records = [self._record(item, base_url) for item in self.backend.select(document, self.spec["item"])]
+        count_page(len(records), self.spec.get("retailer"))
+        return records
+
+    def extract(self, html, base_url):
+        records = self.records(self.parse(html), base_url)
+        if recording_enabled() and self.spec.get("retailer"):
+            record_html(self.spec["retailer"], base_url, html, records)
+        return records
@@ -0,0 +1,156 @@
+import argparse
+import os
+import sys
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+from matching import MATCH_SCHEMA
+from product_store import DB_PATH, connect
+
+# Typed prices and the cross-retailer price comparison. Scraped prices are strings in
+# whatever shape the site rendered them ("1.234,90", "R$\xa089,90", "N/A", "");
+# parse_prices() turns a whole column into floats at once with pandas string ops, with
+# a status column saying why a price is missing instead of an "N/A" placeholder.
+#
+#   python prices.py                         # comparison table from products.db
+#   python prices.py --out comparacao.csv --min-retailers 2
+#   python prices.py --history precos.csv    # every recorded price change, typed
+#
+# The comparison groups products by the canonical IDs written by matching.py, so run
+# that first.
+
+PRICE_OK = "ok"
+PRICE_MISSING = "missing"
+PRICE_UNPARSEABLE = "unparseable"
+
+MISSING_MARKERS = ["", "n/a", "na", "none", "null", "-", "indisponivel", "indisponível", "esgotado"]
+
+
+def parse_prices(prices):
+    # Series of price strings -> DataFrame with "price" (nullable Float64) and "price_status".
+    # History tables repeat the same few thousand price strings over and over, so only
+    # the distinct strings are parsed and the results are spread back out by code.
+    raw = pd.Series(prices, dtype="string")
+    codes, uniques = pd.factorize(raw)
+    values, status = _parse_unique(pd.Series(uniques, dtype="string"))
+    # factorize() gives missing values code -1; point them at an extra "missing" slot
+    values = np.append(values, np.nan)[codes]
+    status = np.append(status, PRICE_MISSING)[codes]
+    return pd.DataFrame({"price": pd.array(values, dtype="Float64"), "price_status": status}, index=raw.index)
+
+
+def _parse_unique(raw):
+    text = (raw.str.replace("\xa0", " ", regex=False)
+               .str.replace(r"R\$|\s", "", regex=True)
+               .str.strip())
+    missing = text.isna() | text.str.lower().isin(MISSING_MARKERS)
+
+    # Brazilian format: "." groups thousands and "," is the decimal separator. Without a
+    # comma, a dot followed by exactly three digits is still a thousands separator
+    # ("1.234"); any other dot is a decimal point (values that came from the APIs).
+    has_comma = text.str.contains(",", regex=False).fillna(False)
+    thousands_only = text.str.fullmatch(r"\d{1,3}(\.\d{3})+").fillna(False)
+    normalized = text.where(~(has_comma | thousands_only), text.str.replace(".", "", regex=False))
+    normalized = normalized.str.replace(",", ".", regex=False)
+
+    values = pd.to_numeric(normalized.where(~missing), errors="coerce").astype("float64").to_numpy()
+    status = np.where(missing, PRICE_MISSING, np.where(np.isnan(values), PRICE_UNPARSEABLE, PRICE_OK))
+    return values, status
+
+
+def load_products(db_path=None):
+    # Active products with their canonical ID (products never matched are their own group)
+    with closing(connect(db_path)) as connection:
+        connection.executescript(MATCH_SCHEMA)
+        frame = pd.read_sql_query(
+            "SELECT p.retailer, p.url, p.description, p.price AS price_text, m.canonical_id "
+            "FROM products p LEFT JOIN matches m ON m.retailer = p.retailer AND m.url = p.url "
+            "WHERE p.active = 1",
+            connection,
+        )
+    frame["canonical_id"] = frame["canonical_id"].fillna(frame["retailer"] + ":" + frame["url"])
+    return frame.join(parse_prices(frame["price_text"]))
+
+
+def load_price_history(db_path=None):
+    # Every price the store has recorded: the first price of each product plus every change
+    with closing(connect(db_path)) as connection:
+        frame = pd.read_sql_query(
+            "SELECT at, retailer, url, description, kind, old_price, new_price FROM changes "
+            "WHERE kind IN ('new', 'changed', 'back') ORDER BY at",
+            connection,
+        )
+    frame["at"] = pd.to_datetime(frame["at"])
+    old = parse_prices(frame["old_price"])
+    new = parse_prices(frame["new_price"])
+    frame["old_price"] = old["price"]
+    frame["new_price"] = new["price"]
+    frame["price_status"] = new["price_status"]
+    frame["change"] = frame["new_price"] - frame["old_price"]
+    return frame
+
+
+def comparison_table(products, min_retailers=1):
+    # One row per canonical product: min / median / max price, where it is cheapest,
+    # and the price at each retailer as its own column
+    priced = products[products["price_status"] == PRICE_OK]
+    if priced.empty:
+        return pd.DataFrame()
+    # A retailer listing the same product twice counts once, at its lower price
+    per_retailer = priced.groupby(["canonical_id", "retailer"], sort=False)["price"].min()
+
+    grouped = per_retailer.groupby(level="canonical_id")
+    table = pd.DataFrame({
+        "retailers": grouped.size(),
+        "min": grouped.min(),
+        "median": grouped.median(),
+        "max": grouped.max(),
+        "cheapest": grouped.idxmin().str[1],
+    })
+    table["spread_pct"] = ((table["max"] - table["min"]) / table["min"] * 100).round(1)
+
+    # The most common description in the group names the product
+    descriptions = priced.groupby("canonical_id")["description"].agg(lambda d: d.mode().iat[0] if d.notna().any() else "")
+    table.insert(0, "description", descriptions)
+    table = table.join(per_retailer.unstack("retailer"))
+
+    table = table[table["retailers"] >= min_retailers]
+    return table.sort_values(["retailers", "spread_pct"], ascending=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cross-retailer price comparison")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--min-retailers", type=int, default=1, help="only products sold by at least N retailers")
+    parser.add_argument("--out", help="write the comparison table to this CSV file")
+    parser.add_argument("--history", help="write the typed price history to this CSV file")
+    parser.add_argument("--top", type=int, default=20, help="rows to print")
+    args = parser.parse_args()
+
+    if not args.db or not os.path.exists(args.db):
+        print(f"No product store at '{args.db}'. Run a scraper first.")
+        sys.exit(1)
+
+    products = load_products(args.db)
+    counts = products["price_status"].value_counts()
+    print(f"{len(products)} active products: " + ", ".join(f"{count} {status}" for status, count in counts.items()))
+    missing_by_retailer = products[products["price_status"] != PRICE_OK].groupby("retailer").size()
+    for retailer, missing in missing_by_retailer.items():
+        print(f"  {retailer}: {missing} without a usable price")
+
+    table = comparison_table(products, args.min_retailers)
+    if table.empty:
+        print("No priced products to compare.")
+    else:
+        with pd.option_context("display.width", 200, "display.max_columns", 20, "display.max_colwidth", 50):
+            print(table.head(args.top).to_string(float_format=lambda v: f"{v:,.2f}"))
+        if args.out:
+            table.to_csv(args.out, encoding="utf-8")
+            print(f"Comparison saved to '{args.out}'")
+
+    if args.history:
+        history = load_price_history(args.db)
+        history.to_csv(args.history, index=False, encoding="utf-8")
+        print(f"{len(history)} price records saved to '{args.history}'")
@@ -0,0 +1,262 @@
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+import time
+from contextlib import closing
+
+# Persistent product history, so runs can be diffed without comparing CSV snapshots by
+# hand. Each product is keyed by (retailer, url) and keeps its first/last seen time and
+# current description and price. Every run is diffed against the store in SQL and only
+# the differences are written to the change log:
+#
+#   new      - url not seen before for this retailer
+#   changed  - description or price differs from what we had
+#   gone     - was active, missing from this run
+#   back     - was gone, seen again
+#
+# The scrapers call sync_products() after they've written their CSV. To read the deltas:
+#
+#   python product_store.py --since 2024-06-01
+#   python product_store.py --retailer aurora --kind new --csv novos.csv
+#
+# SCRAPER_DB sets the database file; SCRAPER_DB="" turns the store off.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.environ.get("SCRAPER_DB", os.path.join(HERE, "products.db"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    retailer TEXT NOT NULL,
+    url TEXT NOT NULL,
+    description TEXT,
+    price TEXT,
+    price_value REAL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    last_changed TEXT NOT NULL,
+    active INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (retailer, url)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS products_active ON products (retailer, active);
+
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    retailer TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    seen INTEGER NOT NULL,
+    new INTEGER NOT NULL,
+    changed INTEGER NOT NULL,
+    gone INTEGER NOT NULL,
+    back INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_retailer ON runs (retailer, started_at);
+
+CREATE TABLE IF NOT EXISTS changes (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    retailer TEXT NOT NULL,
+    url TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    at TEXT NOT NULL,
+    description TEXT,
+    old_price TEXT,
+    new_price TEXT
+);
+CREATE INDEX IF NOT EXISTS changes_at ON changes (at, retailer);
+CREATE INDEX IF NOT EXISTS changes_product ON changes (retailer, url);
+CREATE INDEX IF NOT EXISTS changes_run ON changes (run_id);
+"""
+
+CHANGE_KINDS = ("new", "changed", "gone", "back")
+
+
+def store_enabled():
+    return bool(DB_PATH)
+
+
+def connect(db_path=None):
+    # WAL + a busy timeout, since run_all.py runs the scrapers as parallel processes
+    connection = sqlite3.connect(db_path or DB_PATH, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def parse_price(price):
+    # "1.234,90" / "R$ 12,50" -> 1234.9 / 12.5; None when there is no price
+    if not price:
+        return None
+    digits = "".join(c for c in str(price) if c.isdigit() or c in ",.")
+    if not digits:
+        return None
+    try:
+        return float(digits.replace(".", "").replace(",", "."))
+    except ValueError:
+        return None
+
+
+def _now():
+    return time.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def _row(record):
+    url = record.get("url")
+    if not url or url == "N/A":
+        return None
+    price = record.get("price")
+    price = None if price in ("", "N/A") else price
+    return url, record.get("description") or None, price, parse_price(price)
+
+
+class StoreRun:
+    # One scraper run being synced. Records can be added in batches as they are
+    # scraped (they are staged in a temp table); finish() diffs the whole run.
+    def __init__(self, retailer, db_path=None):
+        self.retailer = retailer
+        self.connection = connect(db_path)
+        self.connection.execute("CREATE TEMP TABLE incoming (url TEXT PRIMARY KEY, description TEXT, price TEXT, price_value REAL)")
+
+    def add(self, records):
+        rows = [row for row in map(_row, records) if row]
+        with self.connection:
+            # Last one wins if a product is listed twice on the same run
+            self.connection.executemany("INSERT OR REPLACE INTO incoming VALUES (?, ?, ?, ?)", rows)
+        return self
+
+    def abort(self):
+        # Drop the staged records without touching the store
+        self.connection.close()
+
+    def finish(self):
+        # Returns {"seen", "new", "changed", "gone", "back"}
+        retailer = self.retailer
+        now = _now()
+        with closing(self.connection) as connection, connection:
+            seen = connection.execute("SELECT COUNT(*) FROM incoming").fetchone()[0]
+            run_id = connection.execute(
+                "INSERT INTO runs (retailer, started_at, seen, new, changed, gone, back) VALUES (?, ?, ?, 0, 0, 0, 0)",
+                (retailer, now, seen),
+            ).lastrowid
+
+            # Log the differences first, while the store still holds the previous values
+            connection.execute("""
+                INSERT INTO changes (run_id, retailer, url, kind, at, description, old_price, new_price)
+                SELECT ?, ?, i.url,
+                       CASE WHEN p.url IS NULL THEN 'new' WHEN p.active = 0 THEN 'back' ELSE 'changed' END,
+                       ?, i.description, p.price, i.price
+                FROM incoming i
+                LEFT JOIN products p ON p.retailer = ? AND p.url = i.url
+                WHERE p.url IS NULL OR p.active = 0
+                   OR p.price IS NOT i.price OR p.description IS NOT i.description
+            """, (run_id, retailer, now, retailer))
+
+            # An empty run is far more likely a broken scrape than a store with no products,
+            # so it never marks anything as gone
+            if seen:
+                connection.execute("""
+                    INSERT INTO changes (run_id, retailer, url, kind, at, description, old_price, new_price)
+                    SELECT ?, retailer, url, 'gone', ?, description, price, NULL
+                    FROM products
+                    WHERE retailer = ? AND active = 1 AND url NOT IN (SELECT url FROM incoming)
+                """, (run_id, now, retailer))
+                connection.execute("""
+                    UPDATE products SET active = 0, last_changed = ?
+                    WHERE retailer = ? AND active = 1 AND url NOT IN (SELECT url FROM incoming)
+                """, (now, retailer))
+
+            # Apply the new/changed/back rows, then bump last_seen for everything we saw
+            connection.execute("""
+                INSERT INTO products (retailer, url, description, price, price_value, first_seen, last_seen, last_changed, active)
+                SELECT ?, c.url, i.description, i.price, i.price_value, ?, ?, ?, 1
+                FROM changes c JOIN incoming i ON i.url = c.url
+                WHERE c.run_id = ? AND c.kind != 'gone'
+                ON CONFLICT (retailer, url) DO UPDATE SET
+                    description = excluded.description,
+                    price = excluded.price,
+                    price_value = excluded.price_value,
+                    last_changed = excluded.last_changed,
+                    active = 1
+            """, (retailer, now, now, now, run_id))
+            connection.execute(
+                "UPDATE products SET last_seen = ? WHERE retailer = ? AND url IN (SELECT url FROM incoming)",
+                (now, retailer),
+            )
+
+            counts = dict.fromkeys(CHANGE_KINDS, 0)
+            counts.update(connection.execute(
+                "SELECT kind, COUNT(*) FROM changes WHERE run_id = ? GROUP BY kind", (run_id,)
+            ).fetchall())
+            connection.execute(
+                "UPDATE runs SET new = ?, changed = ?, gone = ?, back = ? WHERE id = ?",
+                (counts["new"], counts["changed"], counts["gone"], counts["back"], run_id),
+            )
+
+        summary = {"seen": seen, **counts}
+        print(f"[{retailer}] product store: {summary['seen']} seen, {summary['new']} new, "
+              f"{summary['changed']} changed, {summary['gone']} gone, {summary['back']} back")
+        return summary
+
+
+def sync_products(retailer, records, db_path=None):
+    # records: dicts with "description", "price" and "url" (the shape every scraper
+    # already produces). Returns {"seen", "new", "changed", "gone", "back"}.
+    if not store_enabled() and db_path is None:
+        return None
+    return StoreRun(retailer, db_path).add(records).finish()
+
+
+def changes_since(since=None, retailer=None, kinds=None, db_path=None):
+    # Change log rows, oldest first; `since` is an ISO date/time prefix ("2024-06-01")
+    query = "SELECT at, retailer, kind, url, description, old_price, new_price FROM changes WHERE 1 = 1"
+    params = []
+    if since:
+        query += " AND at >= ?"
+        params.append(since)
+    if retailer:
+        query += " AND retailer = ?"
+        params.append(retailer)
+    if kinds:
+        query += f" AND kind IN ({', '.join('?' for _ in kinds)})"
+        params.extend(kinds)
+    query += " ORDER BY at, retailer, url"
+    with closing(connect(db_path)) as connection:
+        return connection.execute(query, params).fetchall()
+
+
+def active_products(retailer, db_path=None):
+    with closing(connect(db_path)) as connection:
+        return connection.execute(
+            "SELECT url, description, price, first_seen, last_seen FROM products "
+            "WHERE retailer = ? AND active = 1 ORDER BY url",
+            (retailer,),
+        ).fetchall()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show product changes recorded by the scrapers")
+    parser.add_argument("--since", help="only changes at or after this date/time (e.g. 2024-06-01)")
+    parser.add_argument("--retailer")
+    parser.add_argument("--kind", action="append", choices=CHANGE_KINDS, help="change kind(s) to show (default: all)")
+    parser.add_argument("--csv", help="write the changes to this CSV file instead of printing them")
+    parser.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args()
+
+    if not args.db or not os.path.exists(args.db):
+        print(f"No product store at '{args.db}'. Run a scraper first.")
+        sys.exit(1)
+
+    changes = changes_since(args.since, args.retailer, args.kind, args.db)
+    header = ["at", "retailer", "kind", "url", "description", "old_price", "new_price"]
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(changes)
+        print(f"{len(changes)} changes saved to '{args.csv}'")
+    else:
+        for at, retailer, kind, url, description, old_price, new_price in changes:
+            price = f"{old_price or '-'} -> {new_price or '-'}" if kind == "changed" else (new_price or old_price or "")
+            print(f"{at}  {retailer:<11} {kind:<8} {description or ''}  {price}  {url}")
+        print(f"{len(changes)} changes")
@@ -0,0 +1,76 @@
+# Product card selectors for every retailer, in the format read by browser_extract.py
+# (in the page) and parsing.py (saved or rendered HTML). Kept free of selenium/bs4
+# imports so the benchmark and other offline tools can load them without a browser.
+
+_PAO_PRODUCT_LINK = "div[class*='TitleContainer-sc-20azeh-9'] a[href*='/produto/']"
+
+
+def vtex_price(prefix):
+    # VTEX price components render "R$ 1.234,90" as integer + decimal separator +
+    # fraction spans; the parsers join the three texts ("1.234" "," "90")
+    return [f"span.{prefix}-currency{part}" for part in ("Integer", "Decimal", "Fraction")]
+
+
+SPECS = {
+    "angeloni": {
+        "retailer": "angeloni",
+        "base_url": "https://www.angeloni.com.br",
+        "item": "span[class*='vtex-product-summary-2-x-brandName']",
+        "description": [""],
+        "strainer": ("span", "vtex-product-summary-2-x-brandName"),
+    },
+    "aurora": {
+        "retailer": "aurora",
+        "base_url": "https://www.aurora.com.br",
+        "item": "span.vtex-product-summary-2-x-productBrand.vtex-product-summary-2-x-brandName.t-body",
+        "description": [""],
+        "url_closest": "a[class*='vtex-store-link-0-x-link']",
+        "strainer": ("a", "vtex-store-link-0-x-link"),
+    },
+    "karamell": {
+        "retailer": "karamell",
+        "base_url": "https://www.karamellstore.com.br",
+        "item": "div.product-card",
+        "description_attr": "data-product-name",
+        "url": "",
+        "url_attr": "data-product-url",
+        "url_fallback": "a.product-link",
+        "strainer": ("div", r"^product-card$"),
+    },
+    "mistral": {
+        "retailer": "mistral",
+        "base_url": "https://www.mistral.com.br",
+        "item": "[class*='produto' i], [class*='product' i], [class*='showcase' i]",
+        "description": ["h2.title-card-showcase"],
+        "price": ["p.value-wine-card"],
+        "price_strip": ["R$"],
+        "url": "a[href]",
+        "strainer": (None, r"(?i)produto|product|showcase"),
+    },
+    "pao": {
+        "retailer": "pao",
+        "base_url": "https://www.paodeacucar.com",
+        "item": "div[class*='Card-sc-yvvqkp-0'], div[class*='CardStyled-sc-20azeh-0']",
+        "description": [_PAO_PRODUCT_LINK],
+        "url": _PAO_PRODUCT_LINK,
+        "strainer": ("div", r"Card-sc-yvvqkp-0|CardStyled-sc-20azeh-0"),
+    },
+    "santaluzia": {
+        "retailer": "santaluzia",
+        "base_url": "https://www.santaluzia.com.br",
+        "item": "div.vtex-search-result-3-x-galleryItem",
+        "description": ["span.vtex-product-summary-2-x-productBrand"],
+        "price": vtex_price("vtex-product-price-1-x"),
+        "url": "a[href]",
+        "strainer": ("div", r"vtex-search-result-3-x-(galleryItem|totalProducts|searchNotFound)"),
+    },
+    "zonasul": {
+        "retailer": "zonasul",
+        "base_url": "https://www.zonasul.com.br",
+        "item": "a.vtex-product-summary-2-x-clearLink",
+        "description": ["span.vtex-product-summary-2-x-productBrand", "span.vtex-product-summary-2-x-brandName"],
+        "price": vtex_price("zonasul-zonasul-store-1-x"),
+        "url": "",
+        "strainer": ("a", "vtex-product-summary-2-x-clearLink"),
+    },
+}
@@ -0,0 +1,448 @@
+import argparse
+import os
+import re
+import sys
+import time
+import urllib.parse
+from collections import namedtuple
+
+from retailer_specs import SPECS
+
+# Registry of the stores we scrape, as configuration instead of one script each. A
+# retailer declares where its listings are and how to read them; the generic runner
+# below does the rest (API first, then plain HTTP / the browser pool, then the sinks):
+#
+#   register(Retailer(
+#       "zonasul", "https://www.zonasul.com.br",
+#       searches=[Search("https://www.zonasul.com.br/americanos/americanos?_q=americanos&map=ft")],
+#       source="vtex", pagination="load_more",
+#       output="zonasul-americanos-products.csv",
+#       columns=[("Description", "description"), ("Price", "price"), ("URL", "url")],
+#   ))
+#
+#   python retailers.py                          # what is registered
+#   python retailers.py run zonasul              # scrape it (what zonasul.py does)
+#   python retailers.py parse zonasul saved.html # records from saved pages, no browser
+#
+# Card selectors and the price assembly live in retailer_specs.SPECS under the same
+# name. Nothing here imports Selenium: the browser modules are imported the first
+# time a listing actually needs Chrome, so API runs, cached / offline runs and parsing
+# saved HTML start in milliseconds.
+#
+# source:     "vtex" (the storefront's search API), "linx" (Pão de Açúcar's search API),
+#             a function (retailer, search) -> records, or None if the store refuses
+#             us, for a store with an API step of its own; or None. If there is no API
+#             or it refuses us, the listing is read with `pagination`
+# pagination: "single"    - one page, plain HTTP or a browser (fetcher.py)
+#             "pages"     - ?page=N pages from `template`, as many as `page_count` says
+#             "load_more" - one browser session clicking "Mostrar mais" (load_more.py)
+# page_count: function (page 1's HTML, products on page 1) -> number of pages, or None
+#             to read pages until an empty one; linked_pages (the default) reads the
+#             pagination links, counted_pages(selector) a "23 produtos" result count
+# settle:     once the first card has rendered, what else a browser waits for:
+#             "dom_quiet" (no more DOM changes) or "network_idle" (no more requests)
+# not_found:  the "no products found" box; a rendered page showing neither it nor a
+#             card is slow or throttled, so it is retried instead of taken as empty
+# workers:    searches read at once, and the browsers the pool starts for them
+#             (SCRAPER_POOL_SIZE wins)
+
+Search = namedtuple("Search", ["url", "category", "terms"], defaults=[None, None])
+
+MAX_PAGES = 50
+LOAD_MORE_XPATHS = ["//div[contains(text(), 'Mostrar mais')]"]
+
+# "?page=3" / "&page=3" / "&amp;page=3" in a link, and a "1.234 produtos" result count
+_PAGE_LINK = re.compile(r"(?:[?&]|&amp;)page=(\d+)")
+_RESULT_COUNT = re.compile(r"(\d[\d.]*)\s*(?:produtos?|resultados?|itens)\b", re.IGNORECASE)
+_NUMBER = re.compile(r"(\d[\d.]*)")
+
+
+class Retailer:
+    def __init__(self, name, base_url, searches, source=None, pagination="single", template=None,
+                 load_more=None, api_base_url=None, output=None, columns=None, missing="N/A",
+                 required=(), url_pattern=None, classify=False, settle="dom_quiet", page_count=None,
+                 not_found=None, workers=1, script=None):
+        self.name = name
+        self.base_url = base_url
+        self.searches = searches
+        self.source = source
+        self.pagination = pagination
+        # {page} (and {category}) are filled in; page 1 is the search URL itself
+        self.template = template
+        self.load_more = load_more or LOAD_MORE_XPATHS
+        self.api_base_url = api_base_url or base_url
+        # CSV written by the runner, with the headers the store's file has always had
+        self.output = output
+        self.columns = columns or [("Description", "description"), ("Price", "price"), ("URL", "url")]
+        self.missing = missing
+        # Only products with these fields (and a URL matching url_pattern, if given) are
+        # written; by default anything with a description or a URL is
+        self.required = tuple(required) + (("url",) if url_pattern and "url" not in required else ())
+        self.url_pattern = re.compile(url_pattern) if url_pattern else None
+        # Drop what the retailer's US-product rules in classifier.py reject
+        self.classify = classify
+        self.settle = settle
+        self.page_count = page_count or linked_pages
+        self.not_found = not_found
+        self.workers = workers
+        # Scripts with steps of their own beyond the declaration; None: run by this module
+        self.script = script
+
+    @property
+    def spec(self):
+        return SPECS[self.name]
+
+    @property
+    def domain(self):
+        return urllib.parse.urlsplit(self.base_url).hostname
+
+    def page_url(self, search, page):
+        if page == 1:
+            return search.url
+        return self.template.format(page=page, category=search.category or "")
+
+    def __repr__(self):
+        return f"Retailer({self.name!r})"
+
+
+REGISTRY = {}
+
+
+def register(retailer):
+    if retailer.name not in SPECS:
+        raise ValueError(f"no card selectors for '{retailer.name}' in retailer_specs.SPECS")
+    REGISTRY[retailer.name] = retailer
+    return retailer
+
+
+def get_retailer(name):
+    try:
+        return REGISTRY[name]
+    except KeyError:
+        raise KeyError(f"unknown retailer '{name}' (registered: {', '.join(REGISTRY)})") from None
+
+
+# --- page counts
+
+def _pages(total, page_size):
+    return -(-total // page_size) if page_size else None
+
+
+def counted_pages(selector=None):
+    # page_count for listings that say how many products they have: the first number in
+    # the element matching selector ("23 produtos"), or without one a "23 produtos"
+    # anywhere on the page
+    def page_count(html, page_size):
+        from parsing import make_backend
+
+        backend = make_backend()
+        document = backend.parse(html or "", strain=False)
+        node = backend.select_one(document, selector) if selector else document
+        text = backend.text(node) if node is not None else None
+        match = (_NUMBER if selector else _RESULT_COUNT).search(text or "")
+        return _pages(int(match.group(1).replace(".", "")), page_size) if match else None
+    return page_count
+
+
+def linked_pages(html, page_size):
+    # The default page_count: the highest ?page=N page 1 links to, else its result count
+    pages = [int(n) for n in _PAGE_LINK.findall(html or "")]
+    return max(pages) if pages else counted_pages()(html, page_size)
+
+
+# --- the stores
+
+register(Retailer(
+    "angeloni", "https://www.angeloni.com.br",
+    searches=[Search("https://www.angeloni.com.br/super/americano?_q=americano&map=ft")],
+    # The API hangs off the /super store; the rendered page only has product names, so
+    # only API runs reach the product store (it is keyed on URLs)
+    source="vtex", api_base_url="https://www.angeloni.com.br/super",
+    output="angeloni U.S. products.csv",
+    # American wines and whiskies only (see RULES["angeloni"] in classifier.py)
+    classify=True,
+    script="angeloni.py",
+))
+
+register(Retailer(
+    "aurora", "https://www.aurora.com.br",
+    searches=[Search("https://www.aurora.com.br/estados%20unidos?_q=estados%20unidos&map=ft")],
+    source="vtex", pagination="load_more",
+    load_more=[
+        "//button[.//div[contains(text(), 'Mostrar mais')]]",
+        "//div[contains(text(), 'Mostrar mais')]",
+        "//button[contains(@class, 'vtex-button') and .//div[contains(text(), 'Mostrar mais')]]",
+    ],
+    output="produtos_aurora.csv", columns=[("Descrição", "description"), ("Link", "url")], missing="",
+    # Cards without a parent link aren't products
+    required=["url"],
+    script="aurora.py",
+))
+
+register(Retailer(
+    "karamell", "https://www.karamellstore.com.br",
+    searches=[Search("https://www.karamellstore.com.br/produtos?q=estados+unidos&page=1")],
+    pagination="pages", template="https://www.karamellstore.com.br/produtos?q=estados+unidos&page={page}",
+    output="us products karamell.csv", columns=[("Product Name", "description"), ("URL", "url")], missing="",
+    required=["description", "url"],
+    workers=4,
+    script="karamell.py",
+))
+
+register(Retailer(
+    "mistral", "https://www.mistral.com.br",
+    # Two pages of one listing (no page links to count from)
+    searches=[
+        Search("https://www.mistral.com.br/pais/estados-unidos"),
+        Search("https://www.mistral.com.br/pais/estados-unidos?live_sync%5Bquery%5D=estados%20unidos&live_sync%5Bpage%5D=2"),
+    ],
+    output="wine_data.csv", columns=[("description", "description"), ("price", "price"), ("url", "url")], missing="",
+    required=["description", "url"],
+    # The page is already filtered on the US; this drops wines that name another origin
+    classify=True,
+    settle="network_idle",
+    script="mistral.py",
+))
+
+register(Retailer(
+    "pao", "https://www.paodeacucar.com",
+    searches=[Search("https://www.paodeacucar.com/busca?terms=estados%20unidos", terms="estados unidos")],
+    source="linx",
+    output="produtos_estados_unidos.csv", columns=[("Descrição", "description"), ("Link", "url")], missing="",
+    url_pattern=r"/produto/",
+    # The cards of the first batch render before their product requests finish
+    settle="network_idle",
+    script="pao.py",
+))
+
+register(Retailer(
+    "santaluzia", "https://www.santaluzia.com.br",
+    searches=[
+        Search(f"https://www.santaluzia.com.br/{category}/estados-unidos?initialMap=c&initialQuery={category}&map=category-1,origem",
+               category)
+        for category in ["adega", "bebidas", "chocolates", "frutas-secas", "matinais"]
+    ],
+    source="vtex", pagination="pages",
+    template="https://www.santaluzia.com.br/{category}/estados-unidos?map=category-1,origem&initialMap=c&initialQuery={category}&page={page}",
+    # No page links; the result header says how many products there are
+    page_count=counted_pages("div[class*='vtex-search-result-3-x-totalProducts']"),
+    not_found="div.vtex-search-result-3-x-searchNotFound",
+    workers=4,
+    output="santaluzia U.S. products.csv",
+    columns=[("Category", "category"), ("Description", "description"), ("Price", "price"), ("URL", "url")],
+    script="santaluzia.py",
+))
+
+register(Retailer(
+    "zonasul", "https://www.zonasul.com.br",
+    searches=[Search("https://www.zonasul.com.br/americanos/americanos?_q=americanos&fuzzy=0&initialMap=ft&initialQuery=americanos&map=ft,pais-de-origem&operator=and")],
+    source="vtex", pagination="load_more",
+    output="zonasul-americanos-products.csv",
+    script="zonasul.py",
+))
+
+
+# --- generic runner
+
+_fetchers = {}
+
+
+def get_fetcher(retailer):
+    # One tiered fetcher per retailer and process; fetcher.py only pulls in Selenium
+    # once a page has to be rendered
+    from fetcher import TieredFetcher, default_render
+
+    if retailer.name not in _fetchers:
+        render = default_render(retailer.spec, retailer.settle, retailer.not_found)
+        _fetchers[retailer.name] = TieredFetcher(retailer.spec, render=render)
+    return _fetchers[retailer.name]
+
+
+def vtex_source(retailer, search):
+    from vtex_api import VtexApiError, fetch_products
+    try:
+        return fetch_products(search.url, retailer.api_base_url)
+    except VtexApiError as e:
+        print(f"[{retailer.name}] VTEX API unavailable ({e}), reading the pages instead.")
+        return None
+
+
+def linx_source(retailer, search):
+    from pao_api import PaoApiError, fetch_products
+    try:
+        return fetch_products(search.terms)
+    except PaoApiError as e:
+        print(f"[{retailer.name}] search API unavailable ({e}), reading the pages instead.")
+        return None
+
+
+SOURCES = {"vtex": vtex_source, "linx": linx_source}
+
+
+def source_name(retailer):
+    return getattr(retailer.source, "__name__", retailer.source)
+
+
+def fetch_api(retailer, search):
+    # The listing from the store's search API, or None if it refuses us
+    if not retailer.source:
+        return None
+    source = SOURCES[retailer.source] if isinstance(retailer.source, str) else retailer.source
+    return source(retailer, search)
+
+
+def fetch_pages(retailer, search):
+    # Page 1, then as many more as its page count says, concurrently; without a page
+    # count, one page at a time until an empty one
+    fetcher = get_fetcher(retailer)
+    first = fetcher.fetch(search.url, need_html=True)
+    records = list(first.records)
+    if not records:
+        return records
+    pages = retailer.page_count(first.html, len(records))
+    if pages:
+        for page in fetcher.fetch_all(retailer.page_url(search, n) for n in range(2, min(pages, MAX_PAGES) + 1)):
+            records.extend(page.records)
+        return records
+    for n in range(2, MAX_PAGES + 1):
+        page = fetcher.fetch(retailer.page_url(search, n))
+        if not page.records:
+            break
+        records.extend(page.records)
+    return records
+
+
+def fetch_load_more(retailer, search):
+    # One browser session on the listing, reading each "Mostrar mais" batch as it appears
+    from browser_extract import use_browser_extraction
+    from driver_pool import get_pool
+    from load_more import LoadMoreHarvester
+    from metrics import page_source, span
+    from parsing import SpecParser
+    from waits import wait_for_any_element
+
+    spec = retailer.spec
+    with get_pool().driver(retailer.name, retailer.base_url) as driver:
+        with span("navigation", retailer.name):
+            driver.get(search.url)
+        wait_for_any_element(driver, [spec["item"]], timeout=15)
+
+        harvester = LoadMoreHarvester(driver, spec, retailer.load_more)
+        records = harvester.run() if use_browser_extraction() else None
+        if records is None:
+            harvester.click_all()
+            html = page_source(driver, retailer.name)
+    if records is None:
+        records = SpecParser(spec).extract(html, retailer.base_url)
+    return records
+
+
+def fetch_search(retailer, search):
+    # Records ({description, price, url}) of one search listing
+    records = fetch_api(retailer, search) if retailer.source else None
+    if records is not None:
+        return records
+    if retailer.pagination == "load_more":
+        return fetch_load_more(retailer, search)
+    if retailer.pagination == "pages":
+        return fetch_pages(retailer, search)
+    return get_fetcher(retailer).fetch(search.url).records
+
+
+def keep(retailer, record):
+    url = record.get("url")
+    if retailer.required:
+        return all(record.get(field) for field in retailer.required) and \
+            (retailer.url_pattern is None or bool(retailer.url_pattern.search(url)))
+    return bool(record.get("description") or url)
+
+
+def kept(retailer, records):
+    # The records that go into the retailer's output, in order
+    records = (record for record in records if keep(retailer, record))
+    if retailer.classify:
+        from classifier import get_classifier
+        records = get_classifier(retailer.name).filter(records)
+    return records
+
+
+def run(name):
+    # Scrapes every search of the retailer and writes its output; returns how many
+    # products were written. Each finished search is checkpointed, so a failed run
+    # picks up where it stopped.
+    from checkpoint import Checkpoint
+    from metrics import ContextThreadPoolExecutor
+    from sinks import make_record, open_sinks
+
+    retailer = get_retailer(name)
+    # Sized for the retailer's workers, if its listings turn out to need browsers
+    os.environ.setdefault("SCRAPER_POOL_SIZE", str(retailer.workers))
+    start_time = time.time()
+    checkpoint = Checkpoint(retailer.name)
+    seen_by_category = {}
+
+    def fetch(search):
+        return checkpoint.run(search.category or search.url, lambda: fetch_search(retailer, search))
+
+    # Searches are read `workers` at a time and written in order as they finish, so a
+    # crash only loses the ones still in flight
+    with checkpoint, open_sinks(retailer.name, retailer.output, retailer.columns, csv_missing=retailer.missing) as sink, \
+            ContextThreadPoolExecutor(max_workers=retailer.workers) as executor:
+        for search, records in zip(retailer.searches, executor.map(fetch, retailer.searches)):
+            written = 0
+            # The same product can show up on two pages of a listing (but is kept once
+            # per category)
+            seen = seen_by_category.setdefault(search.category, set())
+            for record in kept(retailer, records):
+                if record["url"] and record["url"] in seen:
+                    continue
+                seen.add(record["url"])
+                sink.write(make_record(retailer.name, record["description"], url=record["url"],
+                                       price=record.get("price"), category=search.category))
+                written += 1
+            print(f"[{retailer.name}] {written} products from {search.category or search.url}")
+    print(f"[{retailer.name}] {sink.count} products in {time.time() - start_time:.2f} seconds"
+          + (f", saved to '{retailer.output}'" if retailer.output else ""))
+    return sink.count
+
+
+def parse_files(name, paths):
+    # Records from saved pages (the page cache, fixtures, "Save as..."), without a browser
+    from parsing import SpecParser
+
+    retailer = get_retailer(name)
+    parser = SpecParser(retailer.spec)
+    for path in paths:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            yield from kept(retailer, parser.extract(f.read(), retailer.base_url))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Registered retailers and the generic scraper")
+    commands = parser.add_subparsers(dest="command")
+    run_parser = commands.add_parser("run", help="scrape retailers and write their output")
+    run_parser.add_argument("retailers", nargs="+")
+    parse_parser = commands.add_parser("parse", help="print the records in saved HTML pages")
+    parse_parser.add_argument("retailer")
+    parse_parser.add_argument("paths", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        unknown = [name for name in args.retailers if name not in REGISTRY]
+        if unknown:
+            parser.error(f"unknown retailer(s): {', '.join(unknown)}")
+        for name in args.retailers:
+            run(name)
+    elif args.command == "parse":
+        if args.retailer not in REGISTRY:
+            parser.error(f"unknown retailer '{args.retailer}'")
+        count = 0
+        for record in parse_files(args.retailer, args.paths):
+            print(f"{record['description']} | {record['price']} | {record['url']}")
+            count += 1
+        print(f"{count} records", file=sys.stderr)
+    else:
+        for retailer in REGISTRY.values():
+            print(f"{retailer.name:<11} {retailer.domain:<26} source={source_name(retailer) or '-':<5} "
+                  f"pagination={retailer.pagination:<9} {len(retailer.searches)} search(es)"
+                  f"  -> {retailer.output or '(no file)'}  [{retailer.script or 'retailers.py run ' + retailer.name}]")
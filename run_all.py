@@ -0,0 +1,140 @@
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from retailers import REGISTRY
+
+# Single entry point for the nightly run. Each retailer script runs as its own job
+# (a subprocess, since the scripts do their work at import time) on a thread pool,
+# with a global worker cap plus a per-domain concurrency limit, and the results are
+# collected into one run summary.
+#
+#   python run_all.py                      # all retailers
+#   python run_all.py aurora zonasul -w 2  # a subset, two at a time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# name -> (script, domain, output file written by the script), from the registry;
+# retailers declared without a script of their own run as `retailers.py run <name>`
+RETAILERS = {
+    retailer.name: (retailer.script, retailer.domain, retailer.output) for retailer in REGISTRY.values()
+}
+
+# One worker per retailer, so the run takes about as long as the slowest store
+DEFAULT_MAX_WORKERS = len(RETAILERS)
+DEFAULT_PER_DOMAIN = 1
+DEFAULT_TIMEOUT = 30 * 60
+
+
+def count_rows(path):
+    # Data rows in a scraper's CSV output (header excluded)
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, newline="", encoding="utf-8") as f:
+        return max(sum(1 for _ in csv.reader(f)) - 1, 0)
+
+
+class DomainLimiter:
+    # One semaphore per domain so we never hit the same store with more than N jobs at once
+    def __init__(self, per_domain):
+        self.per_domain = per_domain
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def get(self, domain):
+        with self._lock:
+            if domain not in self._semaphores:
+                self._semaphores[domain] = threading.Semaphore(self.per_domain)
+            return self._semaphores[domain]
+
+
+def run_job(name, limiter, timeout, log_dir):
+    script, domain, output_file = RETAILERS[name]
+    log_path = os.path.join(log_dir, f"{name}.log")
+
+    with limiter.get(domain):
+        start_time = time.time()
+        with open(log_path, "w", encoding="utf-8") as log:
+            try:
+                command = [os.path.join(HERE, script)] if script else [os.path.join(HERE, "retailers.py"), "run", name]
+                result = subprocess.run(
+                    [sys.executable] + command,
+                    cwd=HERE, stdout=log, stderr=subprocess.STDOUT, timeout=timeout,
+                )
+                status = "ok" if result.returncode == 0 else f"failed (exit {result.returncode})"
+            except subprocess.TimeoutExpired:
+                status = "timeout"
+        elapsed = time.time() - start_time
+
+    return {
+        "retailer": name,
+        "domain": domain,
+        "status": status,
+        "elapsed_seconds": round(elapsed, 2),
+        "output_file": output_file,
+        "products": count_rows(os.path.join(HERE, output_file)) if output_file and status == "ok" else None,
+        "log": log_path,
+    }
+
+
+def run_all(names, max_workers=DEFAULT_MAX_WORKERS, per_domain=DEFAULT_PER_DOMAIN,
+            timeout=DEFAULT_TIMEOUT, log_dir=None):
+    log_dir = log_dir or os.path.join(HERE, "logs")
+    os.makedirs(log_dir, exist_ok=True)
+    limiter = DomainLimiter(per_domain)
+
+    start_time = time.time()
+    results = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(run_job, name, limiter, timeout, log_dir): name for name in names}
+        for future in as_completed(futures):
+            result = future.result()
+            print(f"[{result['retailer']}] {result['status']} in {result['elapsed_seconds']:.2f} seconds")
+            results.append(result)
+
+    results.sort(key=lambda r: names.index(r["retailer"]))
+    return {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(start_time)),
+        "wall_clock_seconds": round(time.time() - start_time, 2),
+        "sum_of_job_seconds": round(sum(r["elapsed_seconds"] for r in results), 2),
+        "jobs": results,
+    }
+
+
+def print_summary(summary):
+    print("\nRun summary")
+    print(f"{'retailer':<12} {'status':<18} {'seconds':>8} {'products':>9}")
+    for job in summary["jobs"]:
+        products = "-" if job["products"] is None else job["products"]
+        print(f"{job['retailer']:<12} {job['status']:<18} {job['elapsed_seconds']:>8.2f} {products:>9}")
+    print(f"Total elapsed time: {summary['wall_clock_seconds']:.2f} seconds "
+          f"(sequential would be ~{summary['sum_of_job_seconds']:.2f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the retailer scrapers in parallel")
+    parser.add_argument("retailers", nargs="*", help=f"retailers to run (default: all of {', '.join(RETAILERS)})")
+    parser.add_argument("-w", "--max-workers", type=int, default=DEFAULT_MAX_WORKERS)
+    parser.add_argument("--per-domain", type=int, default=DEFAULT_PER_DOMAIN)
+    parser.add_argument("--timeout", type=int, default=DEFAULT_TIMEOUT, help="per-job timeout in seconds")
+    parser.add_argument("--summary", default="run_summary.json", help="where to write the JSON summary")
+    args = parser.parse_args()
+
+    names = args.retailers or list(RETAILERS)
+    unknown = [name for name in names if name not in RETAILERS]
+    if unknown:
+        parser.error(f"unknown retailer(s): {', '.join(unknown)}")
+    summary = run_all(names, args.max_workers, args.per_domain, args.timeout)
+    print_summary(summary)
+
+    with open(args.summary, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    print(f"Summary saved to '{args.summary}'")
+
+    sys.exit(0 if all(job["status"] == "ok" for job in summary["jobs"]) else 1)
@@ -0,0 +1,295 @@
+import csv
+import json
+import os
+import threading
+import time
+
+from classifier import get_classifier
+from metrics import span
+from product_store import StoreRun, store_enabled
+
+# Output sinks the scrapers push records into as they are extracted, instead of
+# collecting everything and writing one file at the end. Records are buffered and
+# flushed every `buffer_size` records, so a crash loses at most one buffer.
+#
+# Every sink speaks the same record schema (FIELDS). CSV sinks can map it onto the
+# column headers our existing files use; JSONL and Parquet always use FIELDS as-is:
+#
+#   columns = [("Description", "description"), ("Price", "price"), ("URL", "url")]
+#   with open_sinks("zonasul", "zonasul-americanos-products.csv", columns) as sink:
+#       sink.write(make_record("zonasul", description, url=url, price=price))
+#
+# SCRAPER_OUTPUTS=jsonl,parquet additionally writes output/<retailer>.jsonl / .parquet.
+# Parquet needs pyarrow. SCRAPER_CLASSIFY=1 drops records the US-product classifier
+# (classifier.py) rejects before they reach any sink.
+
+FIELDS = ["retailer", "category", "description", "price", "url", "scraped_at"]
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_DIR = os.environ.get("SCRAPER_OUTPUT_DIR", os.path.join(HERE, "output"))
+EXTRA_FORMATS = [f.strip() for f in os.environ.get("SCRAPER_OUTPUTS", "").split(",") if f.strip()]
+CLASSIFY = os.environ.get("SCRAPER_CLASSIFY") == "1"
+
+DEFAULT_BUFFER_SIZE = 50
+
+
+def make_record(retailer, description, url=None, price=None, category=None):
+    # Missing values are None here; the CSV sinks write them the way each file always has
+    return {
+        "retailer": retailer,
+        "category": category or None,
+        "description": description or None,
+        "price": None if price in ("", "N/A") else price,
+        "url": None if url in ("", "N/A") else url,
+        "scraped_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+class Sink:
+    # Label for the "write" timing span (metrics.py); None means the script's retailer
+    retailer = None
+
+    def __init__(self, buffer_size=DEFAULT_BUFFER_SIZE):
+        self.buffer_size = buffer_size
+        self.count = 0
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def write(self, record):
+        with self._lock:
+            self._buffer.append(record)
+            self.count += 1
+            if len(self._buffer) >= self.buffer_size:
+                self._flush_locked()
+
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self._buffer:
+            with span("write", self.retailer):
+                self._write_rows(self._buffer)
+            self._buffer = []
+
+    def _write_rows(self, records):
+        raise NotImplementedError
+
+    def _finish(self, complete):
+        pass
+
+    def close(self, complete=True):
+        # complete=False means the scrape failed: files keep what was flushed, but
+        # sinks that need the whole run (the product store) don't act on it
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._flush_locked()
+            self._finish(complete)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Flush what we have even if the scrape failed halfway
+        self.close(complete=exc_type is None)
+
+
+class CsvSink(Sink):
+    # columns: [(header, field), ...] to keep a file's existing headers; defaults to FIELDS
+    def __init__(self, path, columns=None, missing="N/A", buffer_size=DEFAULT_BUFFER_SIZE):
+        super().__init__(buffer_size)
+        self.path = path
+        self.columns = columns or [(field, field) for field in FIELDS]
+        self.missing = missing
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow([header for header, _ in self.columns])
+        self._file.flush()
+
+    def _write_rows(self, records):
+        self._writer.writerows(
+            [self.missing if record.get(field) is None else record[field] for _, field in self.columns]
+            for record in records
+        )
+        self._file.flush()
+
+    def _finish(self, complete):
+        self._file.close()
+
+
+class JsonlSink(Sink):
+    def __init__(self, path, buffer_size=DEFAULT_BUFFER_SIZE):
+        super().__init__(buffer_size)
+        self.path = path
+        self._file = open(path, "w", encoding="utf-8")
+
+    def _write_rows(self, records):
+        self._file.writelines(
+            json.dumps({field: record.get(field) for field in FIELDS}, ensure_ascii=False) + "\n"
+            for record in records
+        )
+        self._file.flush()
+
+    def _finish(self, complete):
+        self._file.close()
+
+
+class ParquetSink(Sink):
+    # Each flush becomes a row group, so keep the buffer larger than for the text formats
+    def __init__(self, path, buffer_size=1000):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ImportError("Parquet output needs pyarrow (pip install pyarrow)") from e
+        super().__init__(buffer_size)
+        self.path = path
+        self._pa = pyarrow
+        self._schema = pyarrow.schema([(field, pyarrow.string()) for field in FIELDS])
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+
+    def _write_rows(self, records):
+        columns = {field: [record.get(field) for record in records] for field in FIELDS}
+        self._writer.write_table(self._pa.Table.from_pydict(columns, schema=self._schema))
+
+    def _finish(self, complete):
+        self._writer.close()
+
+
+class StoreSink(Sink):
+    # Feeds the product store (product_store.py); the run is diffed on close, and
+    # dropped if the scrape failed so a partial run doesn't mark products as gone
+    def __init__(self, retailer, db_path=None, buffer_size=DEFAULT_BUFFER_SIZE):
+        super().__init__(buffer_size)
+        self.retailer = retailer
+        self._run = StoreRun(retailer, db_path)
+
+    def _write_rows(self, records):
+        self._run.add(records)
+
+    def _finish(self, complete):
+        if complete:
+            self._run.finish()
+        else:
+            self._run.abort()
+
+
+class UniqueSink(Sink):
+    # Drops records whose key (url by default) has already been written; only the keys
+    # are kept in memory. write() returns False for a dropped duplicate.
+    def __init__(self, sink, key="url"):
+        super().__init__(buffer_size=1)
+        self.sink = sink
+        self.key = key
+        self._seen = set()
+
+    def write(self, record):
+        value = record.get(self.key)
+        with self._lock:
+            if value is not None and value in self._seen:
+                return False
+            self._seen.add(value)
+            self.count += 1
+        self.sink.write(record)
+        return True
+
+    def flush(self):
+        self.sink.flush()
+
+    def close(self, complete=True):
+        self.sink.close(complete)
+
+
+class ClassifierSink(Sink):
+    # Passes on only the records the retailer's classifier keeps, a batch at a time.
+    # count is what was passed on (what the output holds), dropped what wasn't; both
+    # are final once the sink is closed
+    def __init__(self, sink, retailer, buffer_size=DEFAULT_BUFFER_SIZE):
+        super().__init__(buffer_size)
+        self.sink = sink
+        self.retailer = retailer
+        self.classifier = get_classifier(retailer)
+        self.dropped = 0
+
+    def write(self, record):
+        with self._lock:
+            self._buffer.append(record)
+            if len(self._buffer) >= self.buffer_size:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        # Only the classifier's own time is reported; the sinks below time their writes
+        if self._buffer:
+            with span("classify", self.retailer):
+                kept = list(self.classifier.filter(self._buffer))
+            self.dropped += len(self._buffer) - len(kept)
+            self.count += len(kept)
+            self._buffer = []
+            self.sink.write_many(kept)
+
+    def flush(self):
+        super().flush()
+        self.sink.flush()
+
+    def _finish(self, complete):
+        self.sink.close(complete)
+        print(f"[{self.retailer}] classifier dropped {self.dropped} of {self.count + self.dropped} records")
+
+
+class MultiSink(Sink):
+    # Fans every record out to several sinks
+    def __init__(self, sinks):
+        super().__init__(buffer_size=1)
+        self.sinks = sinks
+
+    def write(self, record):
+        with self._lock:
+            self.count += 1
+        for sink in self.sinks:
+            sink.write(record)
+
+    def flush(self):
+        for sink in self.sinks:
+            sink.flush()
+
+    def close(self, complete=True):
+        for sink in self.sinks:
+            sink.close(complete)
+
+
+def open_sink(fmt, path):
+    if fmt == "csv":
+        return CsvSink(path)
+    if fmt == "jsonl":
+        return JsonlSink(path)
+    if fmt == "parquet":
+        return ParquetSink(path)
+    raise ValueError(f"unknown output format '{fmt}' (expected csv, jsonl or parquet)")
+
+
+def open_sinks(retailer, csv_path=None, csv_columns=None, csv_missing="N/A", formats=None, store=True,
+               classify=None):
+    # The sinks a scraper writes to: its own CSV (with its usual headers), the extra
+    # formats from SCRAPER_OUTPUTS, and the product store
+    sinks = []
+    if csv_path:
+        sinks.append(CsvSink(csv_path, csv_columns, csv_missing))
+    formats = EXTRA_FORMATS if formats is None else formats
+    if formats:
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        sinks.extend(open_sink(fmt, os.path.join(OUTPUT_DIR, f"{retailer}.{fmt}")) for fmt in formats)
+    if store and store_enabled():
+        sinks.append(StoreSink(retailer))
+    for sink in sinks:
+        sink.retailer = retailer
+    sink = MultiSink(sinks)
+    if CLASSIFY if classify is None else classify:
+        sink = ClassifierSink(sink, retailer)
+    return sink
@@ -0,0 +1,47 @@
+import os
+import sys
+import tempfile
+import threading
+
+import pytest
+
+# The modules are scripts at the repo root, not a package
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Every module reads its paths from the environment at import, so point them all at a
+# scratch directory before any test imports one: nothing a test does lands in the checkout
+SCRATCH = tempfile.mkdtemp(prefix="scraper-tests-")
+for name, value in {
+    "SCRAPER_DB": os.path.join(SCRATCH, "products.db"),
+    "SCRAPER_CHECKPOINTS": os.path.join(SCRATCH, "checkpoints.db"),
+    "SCRAPER_QUEUE": "sqlite:///" + os.path.join(SCRATCH, "queue.db"),
+    "SCRAPER_FIXTURES_DIR": os.path.join(SCRATCH, "fixtures"),
+    "SCRAPER_CACHE": "0",
+    "SCRAPER_CACHE_DIR": os.path.join(SCRATCH, "pages"),
+    "SCRAPER_METRICS": "",
+    "SCRAPER_METRICS_DIR": os.path.join(SCRATCH, "metrics"),
+    "SCRAPER_OUTPUT_DIR": os.path.join(SCRATCH, "output"),
+    "SCRAPER_TIERS_FILE": os.path.join(SCRATCH, "fetch_tiers.json"),
+}.items():
+    os.environ[name] = value
+os.environ.pop("SCRAPER_RECORD_FIXTURES", None)
+os.environ.pop("SCRAPER_RULES", None)
+os.environ.pop("SCRAPER_VTEX_API_URL", None)
+os.environ.pop("SCRAPER_PAO_SEARCH_URL", None)
+
+
+@pytest.fixture
+def serve():
+    # serve(server) runs an HTTP server (a --stub replay server) for the rest of the
+    # test and returns its base URL
+    servers = []
+
+    def start(server):
+        servers.append(server)
+        threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        return f"http://127.0.0.1:{server.server_port}"
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,89 @@
+import pytest
+
+from checkpoint import Checkpoint
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "checkpoints.db")
+
+
+def fetcher(result):
+    calls = []
+
+    def fetch():
+        calls.append(None)
+        return result
+    fetch.calls = calls
+    return fetch
+
+
+def test_run_fetches_and_saves(path):
+    checkpoint = Checkpoint("santaluzia", path)
+    fetch = fetcher([{"description": "Bourbon"}])
+    assert checkpoint.run("adega/page=1", fetch) == [{"description": "Bourbon"}]
+    assert checkpoint.result("adega/page=1") == [{"description": "Bourbon"}]
+    assert checkpoint.resumed == 0
+    checkpoint.close()
+
+
+def test_failed_run_resumes_finished_units(path):
+    with pytest.raises(RuntimeError):
+        with Checkpoint("santaluzia", path) as checkpoint:
+            checkpoint.run("adega", fetcher(["a", "b"]))
+            raise RuntimeError("chrome crashed")
+
+    with Checkpoint("santaluzia", path) as checkpoint:
+        done = fetcher(["fresh"])
+        left = fetcher(["c"])
+        assert checkpoint.run("adega", done) == ["a", "b"]
+        assert checkpoint.run("bebidas", left) == ["c"]
+        assert not done.calls and left.calls
+        assert checkpoint.resumed == 1
+
+
+def test_finished_run_clears_the_checkpoint(path):
+    with Checkpoint("santaluzia", path) as checkpoint:
+        checkpoint.run("adega", fetcher(["a"]))
+
+    checkpoint = Checkpoint("santaluzia", path)
+    fetch = fetcher(["b"])
+    assert checkpoint.run("adega", fetch) == ["b"]
+    assert fetch.calls
+    checkpoint.close()
+
+
+def test_retailers_do_not_share_units(path):
+    with pytest.raises(RuntimeError):
+        with Checkpoint("santaluzia", path) as checkpoint:
+            checkpoint.run("adega", fetcher(["a"]))
+            raise RuntimeError
+
+    checkpoint = Checkpoint("angeloni", path)
+    assert checkpoint.result("adega") is None
+    checkpoint.close()
+
+
+@pytest.mark.parametrize("options", [{"resume": False}, {"max_age": -1}])
+def test_stale_or_unwanted_checkpoint_is_discarded(path, options):
+    with pytest.raises(RuntimeError):
+        with Checkpoint("santaluzia", path) as checkpoint:
+            checkpoint.run("adega", fetcher(["a"]))
+            raise RuntimeError
+
+    checkpoint = Checkpoint("santaluzia", path, **options)
+    assert checkpoint.result("adega") is None
+    checkpoint.close()
+
+
+def test_empty_results_count_as_done(path):
+    # An empty page is a finished unit too, not something to fetch again
+    with pytest.raises(RuntimeError):
+        with Checkpoint("santaluzia", path) as checkpoint:
+            checkpoint.run("adega/page=9", fetcher([]))
+            raise RuntimeError
+
+    with Checkpoint("santaluzia", path) as checkpoint:
+        fetch = fetcher(["late"])
+        assert checkpoint.run("adega/page=9", fetch) == []
+        assert not fetch.calls
@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+from classifier import Classifier, load_rules, normalize, rules_for
+
+
+def classifier(retailer, rules=None):
+    return Classifier(rules_for(retailer, rules))
+
+
+def test_normalize_strips_accents_case_and_punctuation():
+    assert normalize("Vinho Tinto Americano — Napa Valley") == "vinho tinto americano napa valley"
+    assert normalize("Whisky Escocês 12 Anos") == "whisky escoces 12 anos"
+    assert normalize(None) == ""
+
+
+@pytest.mark.parametrize("text, reason", [
+    ("Vinho Tinto Americano Cabernet 750ml", "origin"),
+    ("Manteiga de Amendoim Estados Unidos", "origin"),
+    ("Whiskey Jack Daniel's Old No. 7 1L", "brand"),
+    ("Chocolate HERSHEY'S ao leite", "brand"),
+])
+def test_default_keeps_us_products(text, reason):
+    result = classifier("aurora").classify(text)
+    assert result.keep and result.reason == reason
+
+
+@pytest.mark.parametrize("text", [
+    "Copo Americano 190ml",
+    "Café Americano Torrado",
+    "Queijo tipo Americano Fatiado",
+    "Arroz Branco Tipo 1",
+])
+def test_default_drops_everything_else(text):
+    assert not classifier("aurora").classify(text).keep
+
+
+@pytest.mark.parametrize("text", [
+    "Vinho Argentino Malbec",
+    "Vinho Chileno estilo californiano",
+    "Mix Sul Americano de Castanhas",
+])
+def test_another_origin_vetoes(text):
+    result = classifier("aurora").classify(text)
+    assert (result.keep, result.reason) == (False, "excluded")
+
+
+def test_longest_phrase_wins_over_the_term_inside_it():
+    # "copo americano" hides "americano", but a real origin term elsewhere still counts
+    result = classifier("aurora").classify("Copo Americano com Bourbon")
+    assert result.keep and result.terms == ["bourbon"]
+
+
+def test_angeloni_requires_wine_or_whisky():
+    angeloni = classifier("angeloni")
+    assert angeloni.classify("Vinho Tinto Americano Zinfandel").keep
+    assert angeloni.classify("Whisky Bourbon Wild Turkey").keep
+    result = angeloni.classify("Pasta de Amendoim Americana")
+    assert (result.keep, result.reason) == (False, "missing required term")
+
+
+def test_trusted_pages_only_drop_vetoed_records():
+    mistral = classifier("mistral")
+    result = mistral.classify("Zinfandel Old Vines 2019")
+    assert (result.keep, result.reason) == (True, "trusted")
+    assert not mistral.classify("Malbec Reserva Argentina").keep
+
+
+def test_classify_many_matches_classify():
+    aurora = classifier("aurora")
+    texts = ["Vinho Americano", "", "Copo Americano", "Bourbon Four Roses", "Vinho Francês", None, "eua"]
+    assert aurora.classify_many(texts) == [aurora.classify(text) for text in texts]
+
+
+def test_filter_keeps_record_order_across_batches():
+    records = [{"description": f"Bourbon {n}" if n % 3 else f"Vinho Chileno {n}"} for n in range(10)]
+    kept = list(classifier("aurora").filter(records, batch_size=4))
+    assert kept == [record for n, record in enumerate(records) if n % 3]
+
+
+def test_rule_file_extends_and_overrides(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"default": {"brands": ["Tillamook"]}, "aurora": {"mode": "exclude"}}))
+    rules = load_rules(str(path))
+    assert classifier("zonasul", rules).classify("Queijo Tillamook Cheddar").reason == "brand"
+    assert classifier("aurora", rules).classify("Arroz Branco").reason == "trusted"
+    # The built-in rules are untouched
+    assert "tillamook" not in load_rules()["default"]["brands"]
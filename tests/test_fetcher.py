@@ -0,0 +1,128 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import json
+import time
+
+import pytest
+
+import page_cache
+from fetcher import TIER_BROWSER, TIER_HTTP, Page, TierDecisions, TieredFetcher, url_pattern
+from page_cache import PageCache
+from retailer_specs import SPECS
+
+LISTING = """<html><body>
+<div class="product-card" data-product-name="Bourbon 1" data-product-url="/produtos/bourbon-1"></div>
+<div class="product-card" data-product-name="Bourbon 2" data-product-url="/produtos/bourbon-2"></div>
+</body></html>"""
+
+
+class ListingHandler(BaseHTTPRequestHandler):
+    # The listing with an ETag, and a 304 for a request that already has it
+    statuses = []
+
+    def do_GET(self):
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.statuses.append(304)
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.statuses.append(200)
+        body = LISTING.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", '"v1"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    # Every entry is stale as soon as it is written
+    cache = PageCache(str(tmp_path / "pages"), ttl=0)
+    monkeypatch.setattr(page_cache, "CACHE_MODE", "1")
+    monkeypatch.setattr(page_cache, "_cache", cache)
+    return cache
+
+
+def test_stale_page_is_revalidated(cache, tmp_path, serve):
+    ListingHandler.statuses = []
+    url = serve(ThreadingHTTPServer(("127.0.0.1", 0), ListingHandler)) + "/produtos?q=bourbon&page=1"
+    fetcher = TieredFetcher(SPECS["karamell"], decisions=TierDecisions(str(tmp_path / "tiers.json")))
+
+    first = fetcher.fetch(url)
+    assert first.tier == TIER_HTTP and len(first.records) == 2
+    assert cache.get("karamell", url).revalidatable
+
+    second = fetcher.fetch(url)
+    assert ListingHandler.statuses == [200, 304]
+    assert second.tier == TIER_HTTP
+    assert [r["description"] for r in second.records] == ["Bourbon 1", "Bourbon 2"]
+
+
+def test_url_pattern():
+    assert url_pattern("https://www.karamellstore.com.br/produtos/12?q=eua&page=3") == \
+        "www.karamellstore.com.br/produtos/*?page&q"
+
+
+def test_decisions_persist_and_expire(tmp_path):
+    path = str(tmp_path / "tiers.json")
+    TierDecisions(path).set("karamell", "store/produtos?page", TIER_HTTP)
+    assert TierDecisions(path).get("karamell", "store/produtos?page") == TIER_HTTP
+    assert TierDecisions(path).get("aurora", "store/produtos?page") is None
+
+    with open(path, encoding="utf-8") as f:
+        decisions = json.load(f)
+    decisions["karamell"]["store/produtos?page"]["decided_at"] = time.time() - 120
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(decisions, f)
+    assert TierDecisions(path, ttl=60).get("karamell", "store/produtos?page") is None
+    assert TierDecisions(path, ttl=600).get("karamell", "store/produtos?page") == TIER_HTTP
+
+
+class PagesHandler(BaseHTTPRequestHandler):
+    # page=1 has the product cards, any other page none
+    def do_GET(self):
+        body = (LISTING if self.path.endswith("page=1") else "<html><body>Nenhum produto</body></html>").encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def store(serve, tmp_path, monkeypatch):
+    # (base URL, fetcher, rendered URLs); the browser tier is a fake that "finds" one product
+    base = serve(ThreadingHTTPServer(("127.0.0.1", 0), PagesHandler))
+    fetcher = TieredFetcher(SPECS["karamell"], decisions=TierDecisions(str(tmp_path / "tiers.json")))
+    rendered = []
+
+    async def fetch_browser(url, need_html):
+        rendered.append(url)
+        return Page(url, None, TIER_BROWSER, [{"description": "Rendered", "price": None, "url": url}])
+    monkeypatch.setattr(fetcher, "_fetch_browser", fetch_browser)
+    return base, fetcher, rendered
+
+
+def test_empty_page_of_a_server_rendered_listing_skips_the_browser(store):
+    base, fetcher, rendered = store
+    first = fetcher.fetch(f"{base}/produtos?page=1")
+    assert first.tier == TIER_HTTP and len(first.records) == 2
+
+    page = fetcher.fetch(f"{base}/produtos?page=10")
+    assert page.tier == TIER_HTTP and page.records == []
+    assert rendered == []
+
+
+def test_empty_page_of_an_unknown_listing_goes_to_the_browser(store):
+    base, fetcher, rendered = store
+    page = fetcher.fetch(f"{base}/produtos?page=2")
+    assert rendered == [f"{base}/produtos?page=2"]
+    assert page.tier == TIER_BROWSER
+    assert fetcher.decisions.get("karamell", url_pattern(page.url)) == TIER_BROWSER
@@ -0,0 +1,171 @@
+import urllib.error
+
+import pytest
+
+import governor
+from governor import CLOSED, HALF_OPEN, OPEN, CircuitOpenError, Governor
+
+
+def http_error(code, retry_after=None):
+    headers = {"Retry-After": retry_after} if retry_after is not None else {}
+    return urllib.error.HTTPError("https://store.example/api", code, "error", headers, None)
+
+
+class Clock:
+    # time.monotonic() and time.sleep() that only move when the test says so
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(governor.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(governor.time, "sleep", clock.sleep)
+    return clock
+
+
+def failing(*errors, result="ok"):
+    # fn() that raises the given errors in turn, then returns result
+    calls = []
+
+    def fn():
+        calls.append(None)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+    fn.calls = calls
+    return fn
+
+
+def make_governor(**options):
+    options = {"rate": 1000, "burst": 100, "retries": 3, "failure_threshold": 5, "cooldown": 60, **options}
+    return Governor("store.example", **options)
+
+
+def test_backoff_stays_within_exponential_bound(monkeypatch):
+    monkeypatch.setattr(governor, "BACKOFF_BASE", 1.0)
+    monkeypatch.setattr(governor, "BACKOFF_MAX", 60.0)
+    g = make_governor()
+    for attempt in range(10):
+        bound = min(60.0, 2 ** attempt)
+        assert all(0 <= g.backoff(attempt) <= bound for _ in range(50))
+
+
+def test_backoff_waits_at_least_retry_after(monkeypatch):
+    monkeypatch.setattr(governor, "BACKOFF_BASE", 0.01)
+    assert make_governor().backoff(0, retry_after=7) >= 7
+
+
+def test_retries_server_errors_then_succeeds(clock):
+    g = make_governor()
+    fn = failing(http_error(503), http_error(502))
+    assert g.call(fn) == "ok"
+    assert len(fn.calls) == 3
+    assert g.retried == 2
+    assert g.status()["circuit"] == CLOSED
+    assert g.status()["failures_in_a_row"] == 0
+
+
+def test_honours_retry_after(clock):
+    g = make_governor()
+    assert g.call(failing(http_error(429, retry_after="5"))) == "ok"
+    assert g.throttled == 1
+    assert any(seconds >= 5 for seconds in clock.sleeps)
+
+
+def test_gives_up_after_retries(clock):
+    g = make_governor(retries=2)
+    fn = failing(*[http_error(500)] * 5)
+    with pytest.raises(urllib.error.HTTPError):
+        g.call(fn)
+    assert len(fn.calls) == 3
+
+
+def test_client_errors_are_not_retried(clock):
+    g = make_governor()
+    fn = failing(http_error(404))
+    with pytest.raises(urllib.error.HTTPError):
+        g.call(fn)
+    assert len(fn.calls) == 1
+    assert g.status()["failures_in_a_row"] == 0
+
+
+def test_retry_on_makes_other_errors_retryable(clock):
+    g = make_governor()
+    assert g.call(failing(KeyError("x")), retry_on=(KeyError,)) == "ok"
+    with pytest.raises(KeyError):
+        g.call(failing(KeyError("x")))
+
+
+def test_breaker_opens_after_threshold(clock):
+    g = make_governor(retries=0, failure_threshold=3)
+    for _ in range(3):
+        with pytest.raises(urllib.error.HTTPError):
+            g.call(failing(http_error(503)))
+    assert g.status()["circuit"] == OPEN
+
+    fn = failing()
+    with pytest.raises(CircuitOpenError) as raised:
+        g.call(fn)
+    assert not fn.calls
+    assert 0 < raised.value.retry_in <= 60
+
+
+def test_failure_that_opens_the_breaker_is_not_retried(clock):
+    g = make_governor(retries=3, failure_threshold=2)
+    fn = failing(*[http_error(503)] * 5)
+    with pytest.raises(urllib.error.HTTPError):
+        g.call(fn)
+    assert len(fn.calls) == 2
+    assert g.status()["circuit"] == OPEN
+
+
+def test_half_open_trial_success_closes_the_breaker(clock):
+    g = make_governor(retries=0, failure_threshold=1, cooldown=30)
+    with pytest.raises(urllib.error.HTTPError):
+        g.call(failing(http_error(503)))
+    clock.now += 31
+
+    assert g.call(failing()) == "ok"
+    assert g.status()["circuit"] == CLOSED
+
+
+def test_half_open_allows_a_single_trial(clock):
+    g = make_governor(retries=0, failure_threshold=1, cooldown=30)
+    with pytest.raises(urllib.error.HTTPError):
+        g.call(failing(http_error(503)))
+    clock.now += 31
+
+    def trial():
+        # A second request while the trial is in flight is refused
+        assert g.status()["circuit"] == HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            g.call(failing())
+        return "ok"
+    assert g.call(trial) == "ok"
+
+
+def test_failed_trial_reopens_for_longer(clock):
+    g = make_governor(retries=0, failure_threshold=1, cooldown=30)
+    with pytest.raises(urllib.error.HTTPError):
+        g.call(failing(http_error(503)))
+    clock.now += 31
+    with pytest.raises(urllib.error.HTTPError):
+        g.call(failing(http_error(503)))
+    assert g.status()["circuit"] == OPEN
+
+    # Twice the cooldown now: still open after 31 s, a trial again after 61 s
+    clock.now += 31
+    with pytest.raises(CircuitOpenError):
+        g.call(failing())
+    clock.now += 30
+    assert g.call(failing()) == "ok"
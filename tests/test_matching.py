@@ -0,0 +1,80 @@
+from matching import canonical_ids, match_products
+
+
+def records(*keys):
+    return [{"retailer": retailer, "url": url, "description": url} for retailer, url in keys]
+
+
+def groups(assigned):
+    # canonical_id -> set of members
+    by_id = {}
+    for key, canonical_id in assigned.items():
+        by_id.setdefault(canonical_id, set()).add(key)
+    return by_id
+
+
+A, B, C, D = ("aurora", "a"), ("zonasul", "b"), ("angeloni", "c"), ("karamell", "d")
+
+
+def test_new_clusters_get_stable_ids():
+    items = records(A, B, C)
+    first = canonical_ids(items, [[0, 1], [2]])
+    assert first == canonical_ids(items, [[0, 1], [2]])
+    assert first[A] == first[B] != first[C]
+
+
+def test_cluster_keeps_its_id_when_it_grows():
+    items = records(A, B, C)
+    previous = canonical_ids(items[:2], [[0, 1]])
+    assigned = canonical_ids(items, [[0, 1, 2]], previous)
+    assert set(assigned.values()) == {previous[A]}
+
+
+def test_split_cluster_ids_stay_unique():
+    items = records(A, B, C, D)
+    previous = canonical_ids(items, [[0, 1, 2, 3]])
+    old_id = previous[A]
+
+    assigned = canonical_ids(items, [[0, 1, 2], [3]], previous)
+    by_id = groups(assigned)
+    assert len(by_id) == 2
+    # The larger part keeps the old ID, the other part gets a new one
+    assert by_id[old_id] == {A, B, C}
+    assert assigned[D] != old_id
+
+
+def test_even_split_gives_every_part_its_own_id():
+    items = records(A, B, C, D)
+    previous = canonical_ids(items, [[0, 1, 2, 3]])
+    assigned = canonical_ids(items, [[0, 1], [2, 3]], previous)
+    by_id = groups(assigned)
+    assert sorted(map(sorted, by_id.values())) == sorted([sorted([A, B]), sorted([C, D])])
+    assert previous[A] in by_id
+
+
+def test_split_part_does_not_collide_with_a_minted_id():
+    # The old ID was minted from C (the first member in sort order); C splitting off on
+    # its own must not mint it again while A and B keep it
+    items = records(A, B, C)
+    previous = canonical_ids(items, [[0, 1, 2]])
+    assigned = canonical_ids(items, [[2], [0, 1]], previous)
+    assert assigned[A] == assigned[B] == previous[C]
+    assert assigned[C] != previous[C]
+
+
+def test_merged_clusters_take_the_larger_id():
+    items = records(A, B, C)
+    previous = {**canonical_ids(items[:2], [[0, 1]]), **canonical_ids(items[2:], [[0]])}
+    assigned = canonical_ids(items, [[0, 1, 2]], previous)
+    assert set(assigned.values()) == {previous[A]}
+
+
+def test_match_products_groups_the_same_product():
+    items = [
+        {"retailer": "aurora", "url": "1", "description": "Whiskey Jack Daniel's Old No. 7 1L"},
+        {"retailer": "zonasul", "url": "2", "description": "Whisky Jack Daniels Old No 7 1 Litro"},
+        {"retailer": "angeloni", "url": "3", "description": "Whiskey Jack Daniel's Old No. 7 375ml"},
+        {"retailer": "karamell", "url": "4", "description": "Manteiga de Amendoim Skippy 462g"},
+    ]
+    clusters = sorted(sorted(cluster) for cluster in match_products(items))
+    assert clusters == [[0, 1], [2], [3]]
@@ -0,0 +1,56 @@
+import re
+
+from metrics import Metrics, to_prometheus
+
+# name{label="value",...} number
+SAMPLE = re.compile(r'^([a-z_]+)\{((?:[a-z_]+="(?:[^"\\]|\\.)*",?)+)\} (-?\d+(?:\.\d+)?)$')
+
+
+def run_snapshot():
+    metrics = Metrics()
+    metrics.observe("http", 0.25, "santa\"luzia")
+    metrics.observe("http", 0.75, "santa\"luzia")
+    metrics.observe("parse", 0.5, "santa\"luzia")
+    metrics.count_page(20, "santa\"luzia")
+    metrics.count_page(3, "santa\"luzia")
+    metrics.add_bytes(2048, "http", "santa\"luzia")
+    metrics.observe("http", 9.0, "aurora")
+    return metrics.snapshot(["santa\"luzia"], started_at=1_700_000_000.0)
+
+
+def test_snapshot_counts_per_retailer():
+    [run] = run_snapshot()
+    assert run["phases"]["http"] == {"calls": 2, "seconds": 1.0, "max_seconds": 0.75}
+    assert run["pages"] == 2 and run["products"] == 23 and run["products_per_page"] == [20, 3]
+    assert run["bytes"] == {"http": 2048}
+
+
+def test_prometheus_text_format():
+    [run] = run_snapshot()
+    text = to_prometheus(run, started_at=1_700_000_000.0)
+    assert text.endswith("\n")
+
+    declared = {}
+    samples = {}
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            declared.setdefault(line.split()[2], []).append("HELP")
+        elif line.startswith("# TYPE "):
+            _, _, name, kind = line.split()
+            assert kind in ("counter", "gauge")
+            declared.setdefault(name, []).append("TYPE")
+        else:
+            match = SAMPLE.match(line)
+            assert match, line
+            name, labels, value = match.groups()
+            # Every sample comes after its family's HELP and TYPE
+            assert declared.get(name) == ["HELP", "TYPE"], line
+            samples[(name, labels)] = float(value)
+
+    assert samples[("scraper_phase_seconds_total", 'retailer="santa\\"luzia",phase="http"')] == 1.0
+    assert samples[("scraper_phase_calls_total", 'retailer="santa\\"luzia",phase="parse"')] == 1
+    assert samples[("scraper_pages_total", 'retailer="santa\\"luzia"')] == 2
+    assert samples[("scraper_products_total", 'retailer="santa\\"luzia"')] == 23
+    assert samples[("scraper_bytes_total", 'retailer="santa\\"luzia",source="http"')] == 2048
+    assert samples[("scraper_run_timestamp_seconds", 'retailer="santa\\"luzia"')] == 1_700_000_000.0
+    assert not any("aurora" in labels for _, labels in samples)
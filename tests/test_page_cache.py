@@ -0,0 +1,87 @@
+import json
+import os
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from page_cache import PageCache, normalize_url
+
+
+def test_entries_expire_after_the_ttl(tmp_path):
+    cache = PageCache(str(tmp_path), ttl=60)
+    cache.put("aurora", "https://www.aurora.com.br/eua", "<html>1</html>")
+    entry = cache.get("aurora", "https://www.aurora.com.br/eua")
+    assert entry.fresh and entry.read() == "<html>1</html>"
+
+    entry.meta["stored_at"] = time.time() - 61
+    assert not entry.fresh
+    assert PageCache(str(tmp_path), ttl=60, offline=True).get("aurora", entry.url) is not None
+    assert cache.get("aurora", "https://www.aurora.com.br/other") is None
+
+
+def test_same_page_same_entry(tmp_path):
+    cache = PageCache(str(tmp_path))
+    cache.put("pao", "https://WWW.paodeacucar.com:443/busca?terms=eua&page=1&utm_source=x", "{}", "json")
+    assert cache.get("pao", "https://www.paodeacucar.com/busca?page=1&terms=eua").json() == {}
+    assert normalize_url("http://Example.com:8080/a?b=1#top") == "http://example.com:8080/a?b=1"
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = PageCache(str(tmp_path), max_bytes=350)
+    for n, age in ((1, 30), (2, 20), (3, 10)):
+        entry = cache.put("zonasul", f"https://www.zonasul.com.br/{n}", "x" * 100)
+        os.utime(entry.path, (time.time() - age, time.time() - age))
+    # Reading 1 makes it the most recently used, so 2 goes when 4 doesn't fit
+    cache.get("zonasul", "https://www.zonasul.com.br/1")
+    cache.put("zonasul", "https://www.zonasul.com.br/4", "x" * 100)
+
+    kept = [n for n in (1, 2, 3, 4) if cache.get("zonasul", f"https://www.zonasul.com.br/{n}")]
+    assert kept == [1, 3, 4]
+    assert cache.size() == 300
+
+
+class RevalidatingHandler(BaseHTTPRequestHandler):
+    # A JSON page with an ETag; a request that already has it gets a 304
+    statuses = []
+
+    def do_GET(self):
+        if self.headers.get("If-None-Match") == '"abc"':
+            self.statuses.append(304)
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.statuses.append(200)
+        body = json.dumps({"products": [1, 2]}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", '"abc"')
+        self.send_header("Last-Modified", "Sat, 17 Oct 2026 10:00:00 GMT")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_stale_entry_is_revalidated_with_a_conditional_request(tmp_path, serve):
+    RevalidatingHandler.statuses = []
+    url = serve(ThreadingHTTPServer(("127.0.0.1", 0), RevalidatingHandler)) + "/api/search?page=1"
+    cache = PageCache(str(tmp_path), ttl=0)
+
+    with urllib.request.urlopen(url) as response:
+        cache.put("santaluzia", url, response.read().decode("utf-8"), "json", dict(response.headers))
+    entry = cache.get("santaluzia", url)
+    assert not entry.fresh and entry.revalidatable
+    assert entry.conditional_headers() == {"If-None-Match": '"abc"', "If-Modified-Since": "Sat, 17 Oct 2026 10:00:00 GMT"}
+
+    stored_at = entry.meta["stored_at"]
+    try:
+        urllib.request.urlopen(urllib.request.Request(url, headers=entry.conditional_headers()))
+    except urllib.error.HTTPError as e:
+        assert e.code == 304
+        cache.refresh(entry)
+    assert RevalidatingHandler.statuses == [200, 304]
+    refreshed = cache.get("santaluzia", url)
+    assert refreshed.meta["stored_at"] >= stored_at
+    assert refreshed.json() == {"products": [1, 2]}
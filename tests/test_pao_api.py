@@ -0,0 +1,126 @@
+import http.client
+import io
+import urllib.error
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import fixtures
+import governor
+import page_cache
+import pao_api
+from pao_api import PaoApiError, PaoClient, product_record, serve_stub
+
+SEARCH_PATH = "/engage/search/v3/search"
+
+
+def api_product(n, price=None, sku_price=None):
+    product = {"name": f"Pasta de Amendoim {n} ", "url": f"//www.paodeacucar.com/produto/{n}"}
+    if price is not None:
+        product["price"] = price
+    if sku_price is not None:
+        product["skus"] = [{"properties": {}}, {"properties": {"price": sku_price}}]
+    return product
+
+
+@pytest.fixture
+def search_url(tmp_path, monkeypatch, serve):
+    # Three products over two pages of two, recorded under the terms "estados unidos"
+    monkeypatch.setattr(fixtures, "FIXTURES_DIR", str(tmp_path))
+    pages = {1: [api_product(1, price=19.9), api_product(2, sku_price=7)], 2: [api_product(3, price=1500)]}
+    for page, products in pages.items():
+        url = PaoClient("https://api.linximpulse.com" + SEARCH_PATH, page_size=2).page_url("estados unidos", page)
+        fixtures.record_json("pao", url, {"size": 3, "products": products}, "linx")
+    return serve(serve_stub(port=0, fixtures_dir=str(tmp_path))) + SEARCH_PATH
+
+
+EXPECTED = [
+    {"description": "Pasta de Amendoim 1", "price": "19,90", "url": "https://www.paodeacucar.com/produto/1"},
+    {"description": "Pasta de Amendoim 2", "price": "7,00", "url": "https://www.paodeacucar.com/produto/2"},
+    {"description": "Pasta de Amendoim 3", "price": "1.500,00", "url": "https://www.paodeacucar.com/produto/3"},
+]
+
+
+def test_search_reads_every_page_in_order(search_url):
+    assert PaoClient(search_url, page_size=2).search("estados unidos") == EXPECTED
+
+
+def test_stub_has_nothing_for_unrecorded_terms(search_url):
+    assert PaoClient(search_url, page_size=2).search("bourbon") == []
+
+
+def test_page_count_is_capped(search_url, monkeypatch):
+    monkeypatch.setattr(pao_api, "MAX_PAGES", 1)
+    assert PaoClient(search_url, page_size=2).search("estados unidos") == EXPECTED[:2]
+
+
+def test_empty_result(serve, tmp_path):
+    search_url = serve(serve_stub(port=0, fixtures_dir=str(tmp_path))) + SEARCH_PATH
+    assert PaoClient(search_url).search("nada") == []
+
+
+def test_page_url_carries_the_sales_channel():
+    url = PaoClient("https://api.example/search", api_key="key", sales_channel="501", page_size=10).page_url("eua", 3)
+    assert url.startswith("https://api.example/search?apiKey=key&")
+    assert "terms=eua" in url and "page=3" in url and "resultsPerPage=10" in url and "salesChannel=501" in url
+
+
+class FakeOpener:
+    # opener.open() that raises error, or answers with body
+    def __init__(self, error=None, body=b""):
+        self.error = error
+        self.body = body
+
+    def open(self, request, timeout=None):
+        if self.error:
+            raise self.error
+        response = io.BytesIO(self.body)
+        response.headers = {}
+        return response
+
+
+@pytest.mark.parametrize("opener", [
+    FakeOpener(http.client.IncompleteRead(b"{\"size\": 3")),
+    FakeOpener(http.client.RemoteDisconnected("closed")),
+    FakeOpener(urllib.error.HTTPError("https://x", 403, "Forbidden", {}, None)),
+    FakeOpener(body=b"<html>blocked</html>"),
+    FakeOpener(body=b"{\"size\": 3}"),
+])
+def test_failures_become_api_errors(opener, monkeypatch):
+    # Dropped connections are retried first; don't wait for the backoff
+    monkeypatch.setattr(governor, "BACKOFF_BASE", 0.0)
+    with pytest.raises(PaoApiError):
+        PaoClient("http://pao-errors.invalid/search", opener=opener).search("estados unidos")
+
+
+def test_product_record_without_price_or_url():
+    assert product_record({"name": "  "}) == {"description": None, "price": None, "url": None}
+
+
+def test_stale_cached_page_is_revalidated(tmp_path, monkeypatch, serve):
+    statuses = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.headers.get("If-None-Match") == '"p1"':
+                statuses.append(304)
+                self.send_response(304)
+                self.end_headers()
+                return
+            statuses.append(200)
+            body = b'{"size": 1, "products": [{"name": "Pasta de Amendoim 1", "price": 19.9}]}'
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", '"p1"')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    # Every entry is stale as soon as it is written
+    monkeypatch.setattr(page_cache, "CACHE_MODE", "1")
+    monkeypatch.setattr(page_cache, "_cache", page_cache.PageCache(str(tmp_path), ttl=0))
+    client = PaoClient(serve(ThreadingHTTPServer(("127.0.0.1", 0), Handler)) + SEARCH_PATH)
+    assert client.search("estados unidos") == client.search("estados unidos")
+    assert statuses == [200, 304]
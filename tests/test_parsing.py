@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from bench_parse import base_url_for, check_records
+from conftest import ROOT
+from fixtures import load_fixtures, read_fixture
+from parsing import SpecParser, available_backends
+from retailer_specs import SPECS
+from retailers import REGISTRY, keep
+
+# The recorded pages committed under fixtures/: one listing per retailer, trimmed to a
+# few product cards
+FIXTURES = os.path.join(ROOT, "fixtures")
+PAGES = [fixture for fixture in load_fixtures(fixtures_dir=FIXTURES) if fixture.kind == "html"]
+
+
+def test_every_retailer_has_a_recorded_page():
+    assert {fixture.retailer for fixture in PAGES} == set(SPECS)
+
+
+@pytest.mark.parametrize("backend", available_backends())
+@pytest.mark.parametrize("fixture", PAGES, ids=lambda fixture: fixture.retailer)
+def test_recorded_pages_parse(fixture, backend):
+    spec = SPECS[fixture.retailer]
+    parser = SpecParser(spec, backend)
+    records = parser.records(parser.parse(read_fixture(fixture)), base_url_for(fixture))
+    assert check_records(fixture, records) == []
+
+    # What the retailer keeps has every field its spec extracts
+    products = [record for record in records if keep(REGISTRY[fixture.retailer], record)]
+    assert products
+    for record in products:
+        assert record["description"]
+        if spec.get("price"):
+            assert record["price"]
+        if "url" in spec or "url_closest" in spec:
+            assert record["url"].startswith("https://")
+
+
+def test_baseline_without_fixtures_fails(tmp_path):
+    bench = [sys.executable, os.path.join(ROOT, "bench_parse.py"), "--fixtures", str(tmp_path / "none")]
+    assert subprocess.run(bench, capture_output=True).returncode == 0
+    baseline = bench + ["--baseline", str(tmp_path / "baseline.json")]
+    assert subprocess.run(baseline, capture_output=True).returncode == 1
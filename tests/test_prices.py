@@ -0,0 +1,45 @@
+import math
+
+import pandas as pd
+
+from prices import PRICE_MISSING, PRICE_OK, PRICE_UNPARSEABLE, comparison_table, parse_prices
+
+
+def parsed(prices):
+    frame = parse_prices(prices)
+    return [(None if pd.isna(price) else price, status) for price, status in zip(frame["price"], frame["price_status"])]
+
+
+def test_brazilian_and_api_formats():
+    assert parsed(["1.234,50", "R$ 10", "R$\xa089,90", "1.234", "19.9", "1.234.567,80"]) == [
+        (1234.5, PRICE_OK), (10.0, PRICE_OK), (89.9, PRICE_OK), (1234.0, PRICE_OK), (19.9, PRICE_OK),
+        (1234567.8, PRICE_OK),
+    ]
+
+
+def test_missing_and_unparseable_prices():
+    assert parsed(["N/A", None, "", "Esgotado", "sob consulta"]) == [
+        (None, PRICE_MISSING), (None, PRICE_MISSING), (None, PRICE_MISSING), (None, PRICE_MISSING),
+        (None, PRICE_UNPARSEABLE),
+    ]
+
+
+def test_repeated_strings_keep_their_positions():
+    frame = parse_prices(pd.Series(["10,00", None, "10,00", "N/A"], index=[7, 8, 9, 10]))
+    assert list(frame.index) == [7, 8, 9, 10]
+    assert list(frame["price_status"]) == [PRICE_OK, PRICE_MISSING, PRICE_OK, PRICE_MISSING]
+
+
+def test_comparison_table_uses_each_retailers_lowest_price():
+    products = pd.DataFrame({
+        "canonical_id": ["jif", "jif", "jif", "jif", "only"],
+        "retailer": ["pao", "pao", "zonasul", "karamell", "pao"],
+        "url": ["a", "b", "c", "d", "e"],
+        "description": ["Jif"] * 4 + ["Only"],
+        "price_text": ["20,00", "18,00", "25,00", "N/A", "5,00"],
+    })
+    table = comparison_table(products.join(parse_prices(products["price_text"])), min_retailers=2)
+    row = table.reset_index().iloc[0]
+    assert len(table) == 1
+    assert row["retailers"] == 2 and row["cheapest"] == "pao"
+    assert math.isclose(row["min"], 18.0) and math.isclose(row["max"], 25.0)
@@ -0,0 +1,104 @@
+import sqlite3
+
+import pytest
+
+from product_store import StoreRun, active_products, changes_since, parse_price, sync_products
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "products.db")
+
+
+def product(n, price="10,00", description=None):
+    return {"description": description or f"Product {n}", "price": price, "url": f"https://store.example/p{n}"}
+
+
+def kinds(db, retailer="aurora"):
+    return sorted((row[2], row[3].rsplit("/", 1)[1]) for row in changes_since(retailer=retailer, db_path=db))
+
+
+def test_first_run_is_all_new(db):
+    assert sync_products("aurora", [product(1), product(2)], db) == \
+        {"seen": 2, "new": 2, "changed": 0, "gone": 0, "back": 0}
+    assert [row[0] for row in active_products("aurora", db)] == ["https://store.example/p1", "https://store.example/p2"]
+
+
+def test_unchanged_run_logs_nothing(db):
+    sync_products("aurora", [product(1)], db)
+    assert sync_products("aurora", [product(1)], db) == {"seen": 1, "new": 0, "changed": 0, "gone": 0, "back": 0}
+    assert kinds(db) == [("new", "p1")]
+
+
+def test_price_and_description_changes(db):
+    sync_products("aurora", [product(1), product(2)], db)
+    summary = sync_products("aurora", [product(1, price="12,50"), product(2, description="Renamed")], db)
+    assert summary["changed"] == 2
+
+    price_change = [row for row in changes_since(retailer="aurora", kinds=["changed"], db_path=db)
+                    if row[3].endswith("/p1")][0]
+    assert price_change[5:] == ("10,00", "12,50")
+
+
+def test_missing_products_go_and_come_back(db):
+    sync_products("aurora", [product(1), product(2)], db)
+    assert sync_products("aurora", [product(1)], db)["gone"] == 1
+    assert [row[0] for row in active_products("aurora", db)] == ["https://store.example/p1"]
+
+    assert sync_products("aurora", [product(1), product(2)], db)["back"] == 1
+    assert len(active_products("aurora", db)) == 2
+    assert kinds(db) == [("back", "p2"), ("gone", "p2"), ("new", "p1"), ("new", "p2")]
+
+
+def test_empty_run_marks_nothing_gone(db):
+    sync_products("aurora", [product(1)], db)
+    assert sync_products("aurora", [], db) == {"seen": 0, "new": 0, "changed": 0, "gone": 0, "back": 0}
+    assert len(active_products("aurora", db)) == 1
+
+
+def test_retailers_are_separate(db):
+    sync_products("aurora", [product(1)], db)
+    assert sync_products("zonasul", [product(1)], db)["new"] == 1
+    assert sync_products("zonasul", [product(2)], db)["gone"] == 1
+    assert len(active_products("aurora", db)) == 1
+
+
+def test_records_without_url_are_skipped_and_duplicates_collapse(db):
+    records = [product(1), {"description": "No link", "price": "1,00", "url": "N/A"}, product(1, price="11,00")]
+    summary = StoreRun("aurora", db).add(records[:2]).add(records[2:]).finish()
+    assert summary["seen"] == 1
+    assert active_products("aurora", db)[0][2] == "11,00"
+
+
+def test_aborted_run_leaves_the_store_alone(db):
+    sync_products("aurora", [product(1)], db)
+    StoreRun("aurora", db).add([product(2)]).abort()
+    assert len(active_products("aurora", db)) == 1
+    assert kinds(db) == [("new", "p1")]
+
+
+def test_runs_table_and_change_log_agree(db):
+    sync_products("aurora", [product(1), product(2)], db)
+    sync_products("aurora", [product(1, price="9,90"), product(3)], db)
+    with sqlite3.connect(db) as connection:
+        runs = connection.execute("SELECT id, seen, new, changed, gone, back FROM runs ORDER BY id").fetchall()
+        logged = connection.execute("SELECT run_id, kind, COUNT(*) FROM changes GROUP BY 1, 2").fetchall()
+    assert [run[1:] for run in runs] == [(2, 2, 0, 0, 0), (2, 1, 1, 1, 0)]
+    assert sorted(logged) == sorted([(runs[0][0], "new", 2), (runs[1][0], "new", 1),
+                                     (runs[1][0], "changed", 1), (runs[1][0], "gone", 1)])
+
+
+def test_changes_since_filters(db):
+    sync_products("aurora", [product(1)], db)
+    sync_products("zonasul", [product(2)], db)
+    assert len(changes_since(db_path=db)) == 2
+    assert len(changes_since(retailer="zonasul", db_path=db)) == 1
+    assert changes_since(since="9999", db_path=db) == []
+    assert changes_since(kinds=["gone"], db_path=db) == []
+
+
+@pytest.mark.parametrize("text, value", [
+    ("1.234,90", 1234.9), ("R$ 12,50", 12.5), ("7", 7.0), ("", None), (None, None), ("N/A", None),
+])
+def test_parse_price(text, value):
+    assert parse_price(text) == value
@@ -0,0 +1,96 @@
+import pytest
+
+import retailers
+from fetcher import Page
+from retailers import Retailer, Search, counted_pages, fetch_api, fetch_pages, kept, linked_pages
+
+
+def test_linked_pages_reads_pagination_links():
+    html = '<a href="/produtos?q=eua&amp;page=2">2</a><a href="/produtos?page=7">7</a><a href="?page=3">3</a>'
+    assert linked_pages(html, 20) == 7
+
+
+def test_linked_pages_falls_back_to_the_result_count():
+    assert linked_pages("<p>Mostrando <b>1.023</b> produtos</p>", 20) == 52
+    assert linked_pages("<p>Nada por aqui</p>", 20) is None
+
+
+def test_counted_pages_reads_the_given_element():
+    page_count = counted_pages("div[class*='totalProducts']")
+    html = '<p>3 produtos em destaque</p><div class="x-totalProducts--layout"><span>45</span> produtos</div>'
+    assert page_count(html, 20) == 3
+    assert page_count("<div>no count</div>", 20) is None
+
+
+class FakeFetcher:
+    # fetch() / fetch_all() over a {url: records} table, recording what was asked for
+    def __init__(self, pages, html=""):
+        self.pages = pages
+        self.html = html
+        self.urls = []
+
+    def fetch(self, url, need_html=False):
+        self.urls.append(url)
+        return Page(url, self.html, "http", self.pages.get(url, []))
+
+    def fetch_all(self, urls, need_html=False):
+        return [self.fetch(url) for url in urls]
+
+
+def records(page, count=2):
+    return [{"description": f"P{page}-{n}", "price": None, "url": f"https://store.example/{page}-{n}"}
+            for n in range(count)]
+
+
+@pytest.fixture
+def listing(monkeypatch):
+    def make(pages, html="", page_count=None):
+        retailer = Retailer("karamell", "https://store.example", [Search("https://store.example/s?page=1")],
+                            pagination="pages", template="https://store.example/s?page={page}",
+                            page_count=page_count)
+        fetcher = FakeFetcher({retailer.page_url(retailer.searches[0], n): records(n) for n in pages}, html)
+        monkeypatch.setattr(retailers, "get_fetcher", lambda _: fetcher)
+        return retailer, fetcher
+    return make
+
+
+def test_fetch_pages_reads_as_many_pages_as_counted(listing):
+    retailer, fetcher = listing([1, 2, 3, 4], page_count=lambda html, page_size: 3)
+    assert [r["description"] for r in fetch_pages(retailer, retailer.searches[0])] == \
+        ["P1-0", "P1-1", "P2-0", "P2-1", "P3-0", "P3-1"]
+    assert len(fetcher.urls) == 3
+
+
+def test_fetch_pages_without_a_count_stops_at_an_empty_page(listing):
+    retailer, fetcher = listing([1, 2, 3], page_count=lambda html, page_size: None)
+    assert len(fetch_pages(retailer, retailer.searches[0])) == 6
+    assert fetcher.urls[-1].endswith("page=4")
+
+
+def test_fetch_pages_stops_after_an_empty_first_page(listing):
+    retailer, fetcher = listing([], page_count=lambda html, page_size: 5)
+    assert fetch_pages(retailer, retailer.searches[0]) == []
+    assert len(fetcher.urls) == 1
+
+
+def test_source_can_be_a_function():
+    calls = []
+
+    def source(retailer, search):
+        calls.append(search)
+        return records(1)
+    retailer = Retailer("angeloni", "https://store.example", [Search("https://store.example/s")], source=source)
+    assert fetch_api(retailer, retailer.searches[0]) == records(1)
+    assert calls == retailer.searches
+    assert fetch_api(Retailer("angeloni", "https://store.example", []), None) is None
+
+
+def test_kept_applies_required_fields_and_url_pattern():
+    retailer = Retailer("pao", "https://store.example", [], required=["description"], url_pattern=r"/produto/")
+    items = [
+        {"description": "A", "url": "https://store.example/produto/1"},
+        {"description": "", "url": "https://store.example/produto/2"},
+        {"description": "C", "url": "https://store.example/busca"},
+        {"description": "D", "url": None},
+    ]
+    assert [r["description"] for r in kept(retailer, items)] == ["A"]
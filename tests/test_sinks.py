@@ -0,0 +1,83 @@
+import csv
+import json
+
+import sinks
+from sinks import ClassifierSink, CsvSink, JsonlSink, UniqueSink, make_record, open_sinks
+
+COLUMNS = [("Description", "description"), ("Price", "price"), ("URL", "url")]
+
+
+def records():
+    return [
+        make_record("aurora", "Vinho Americano Napa Valley", url="https://www.aurora.com.br/napa/p", price="189,90"),
+        make_record("aurora", "Vinho Chileno Reservado", url="https://www.aurora.com.br/chileno/p", price="N/A"),
+        make_record("aurora", "Bourbon Jim Beam", url="https://www.aurora.com.br/jim-beam/p"),
+    ]
+
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def test_csv_keeps_the_file_headers_and_missing_marker(tmp_path):
+    path = str(tmp_path / "out.csv")
+    with CsvSink(path, COLUMNS, missing="", buffer_size=2) as sink:
+        sink.write_many(records())
+        # Two records make a full buffer; the third waits for close
+        assert len(read_csv(path)) == 3
+    assert read_csv(path) == [
+        ["Description", "Price", "URL"],
+        ["Vinho Americano Napa Valley", "189,90", "https://www.aurora.com.br/napa/p"],
+        ["Vinho Chileno Reservado", "", "https://www.aurora.com.br/chileno/p"],
+        ["Bourbon Jim Beam", "", "https://www.aurora.com.br/jim-beam/p"],
+    ]
+    assert sink.count == 3
+
+
+def test_jsonl_writes_every_field(tmp_path):
+    path = str(tmp_path / "out.jsonl")
+    with JsonlSink(path) as sink:
+        sink.write_many(records())
+    with open(path, encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    assert [list(line) for line in lines] == [sinks.FIELDS] * 3
+    assert lines[1]["price"] is None and lines[2]["description"] == "Bourbon Jim Beam"
+
+
+def test_a_failed_scrape_still_flushes(tmp_path):
+    path = str(tmp_path / "out.csv")
+    try:
+        with CsvSink(path, COLUMNS) as sink:
+            sink.write(records()[0])
+            raise RuntimeError("browser crashed")
+    except RuntimeError:
+        pass
+    assert len(read_csv(path)) == 2
+
+
+def test_unique_sink_drops_repeated_urls(tmp_path):
+    inner = JsonlSink(str(tmp_path / "out.jsonl"))
+    with UniqueSink(inner) as sink:
+        assert sink.write(records()[0]) is True
+        assert sink.write(records()[0]) is False
+    assert sink.count == 1 and inner.count == 1
+
+
+def test_classifier_sink_counts_what_it_passes_on(tmp_path):
+    inner = JsonlSink(str(tmp_path / "out.jsonl"))
+    with ClassifierSink(inner, "aurora", buffer_size=2) as sink:
+        sink.write_many(records())
+    # The Chilean wine is dropped; count is what the output holds
+    assert (sink.count, sink.dropped, inner.count) == (2, 1, 2)
+
+
+def test_open_sinks_fans_out_and_classifies(tmp_path, monkeypatch):
+    monkeypatch.setattr(sinks, "OUTPUT_DIR", str(tmp_path / "output"))
+    csv_path = str(tmp_path / "aurora.csv")
+    with open_sinks("aurora", csv_path, COLUMNS, formats=["jsonl"], store=False, classify=True) as sink:
+        sink.write_many(records())
+    assert sink.count == 2
+    assert len(read_csv(csv_path)) == 3
+    with open(tmp_path / "output" / "aurora.jsonl", encoding="utf-8") as f:
+        assert len(f.readlines()) == 2
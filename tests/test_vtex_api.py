@@ -0,0 +1,170 @@
+import http.client
+import io
+import json
+import urllib.error
+
+import pytest
+
+import fixtures
+import governor
+import vtex_api
+from vtex_api import (CATALOG_SEARCH_PATH, INTELLIGENT_SEARCH_PATH, VtexApiError, VtexClient, facets_from_url,
+                      format_brl, product_record, serve_stub)
+
+STORE = "https://www.santaluzia.com.br"
+
+
+def api_product(n, price):
+    return {
+        "productName": f" Bourbon {n} ",
+        "link": f"https://www.santaluzia.com.br/bourbon-{n}/p?skuId=1",
+        "items": [{"sellers": [{"commertialOffer": {"Price": price, "AvailableQuantity": 3}}]}],
+    }
+
+
+@pytest.fixture
+def recordings(tmp_path, monkeypatch):
+    # Three products over two intelligent-search pages and two catalog pages, recorded
+    # the way SCRAPER_RECORD_FIXTURES=1 records them
+    monkeypatch.setattr(fixtures, "FIXTURES_DIR", str(tmp_path))
+    products = [api_product(1, 99.9), api_product(2, 1234.5), api_product(3, 10)]
+    search = f"{STORE}{INTELLIGENT_SEARCH_PATH}category-1/adega/origem/estados-unidos"
+    for page, page_products in ((1, products[:2]), (2, products[2:])):
+        fixtures.record_json("santaluzia", f"{search}?query=&page={page}&count=2",
+                             {"products": page_products, "recordsFiltered": 3}, "vtex")
+    for start, page_products in ((0, products[:2]), (2, products[2:])):
+        fixtures.record_json("santaluzia", f"{STORE}{CATALOG_SEARCH_PATH}?_from={start}&_to={start + 1}",
+                             page_products, "vtex-catalog")
+    return str(tmp_path)
+
+
+@pytest.fixture
+def client(recordings, serve):
+    api_url = serve(serve_stub("santaluzia", port=0, fixtures_dir=recordings))
+    return VtexClient(STORE, page_size=2, api_url=api_url)
+
+
+EXPECTED = [
+    {"description": "Bourbon 1", "price": "99,90", "url": f"{STORE}/bourbon-1/p"},
+    {"description": "Bourbon 2", "price": "1.234,50", "url": f"{STORE}/bourbon-2/p"},
+    {"description": "Bourbon 3", "price": "10,00", "url": f"{STORE}/bourbon-3/p"},
+]
+
+
+def test_intelligent_search_pages_through_the_stub(client):
+    assert list(client.intelligent_search(facets="category-1/adega/origem/estados-unidos")) == EXPECTED
+
+
+def test_search_url_reads_the_storefront_url(client):
+    url = f"{STORE}/adega/estados-unidos?initialMap=c&initialQuery=adega&map=category-1,origem"
+    assert client.search_url(url) == EXPECTED
+
+
+def test_catalog_search_uses_the_resources_header(client):
+    assert list(client.catalog_search()) == EXPECTED
+
+
+def test_unrecorded_search_is_empty(serve, tmp_path):
+    api_url = serve(serve_stub("santaluzia", port=0, fixtures_dir=str(tmp_path)))
+    assert VtexClient(STORE, api_url=api_url).search(facets="category-1/adega") == []
+
+
+class FakeOpener:
+    # opener.open() that raises error, or answers with body
+    def __init__(self, error=None, body=b""):
+        self.error = error
+        self.body = body
+
+    def open(self, request, timeout=None):
+        if self.error:
+            raise self.error
+        response = io.BytesIO(self.body)
+        response.headers = {}
+        return response
+
+
+@pytest.mark.parametrize("error", [
+    http.client.IncompleteRead(b"{\"products\": ["),
+    http.client.RemoteDisconnected("closed"),
+    urllib.error.HTTPError("https://x", 403, "Forbidden", {}, None),
+])
+def test_transport_errors_become_api_errors(error, monkeypatch):
+    # Dropped connections are retried first; don't wait for the backoff
+    monkeypatch.setattr(governor, "BACKOFF_BASE", 0.0)
+    client = VtexClient(STORE, api_url="http://vtex-errors.invalid", opener=FakeOpener(error))
+    with pytest.raises(VtexApiError):
+        list(client.intelligent_search())
+
+
+def test_html_instead_of_json_is_an_api_error():
+    client = VtexClient(STORE, api_url="http://vtex-captcha.invalid", opener=FakeOpener(body=b"<html>captcha</html>"))
+    with pytest.raises(VtexApiError):
+        list(client.intelligent_search())
+
+
+def test_search_falls_back_to_the_catalog():
+    class Opener:
+        def open(self, request, timeout=None):
+            if INTELLIGENT_SEARCH_PATH in request.full_url:
+                raise urllib.error.HTTPError(request.full_url, 404, "Not Found", {}, None)
+            response = io.BytesIO(b"[]")
+            response.headers = {"resources": "0-0/0"}
+            return response
+    assert VtexClient(STORE, api_url="http://vtex-fallback.invalid", opener=Opener()).search() == []
+
+
+class PagedOpener:
+    # Answers every request with the next of pages (JSON-serialisable), without a total
+    def __init__(self, pages):
+        self.pages = list(pages)
+        self.urls = []
+
+    def open(self, request, timeout=None):
+        self.urls.append(request.full_url)
+        response = io.BytesIO(json.dumps(self.pages.pop(0) if self.pages else []).encode("utf-8"))
+        response.headers = {}
+        return response
+
+
+def test_intelligent_search_without_a_total_reads_until_a_short_page():
+    products = [api_product(n, 10) for n in range(5)]
+    opener = PagedOpener({"products": products[start:start + 2]} for start in (0, 2, 4))
+    client = VtexClient(STORE, page_size=2, api_url="http://vtex-no-total.invalid", opener=opener)
+    assert len(list(client.intelligent_search())) == 5
+    assert len(opener.urls) == 3
+
+
+def test_catalog_search_is_capped_in_pages_of_the_client_size(monkeypatch):
+    monkeypatch.setattr(vtex_api, "MAX_PAGES", 2)
+    opener = PagedOpener([[api_product(1, 10), api_product(2, 10)]] * 5)
+    client = VtexClient(STORE, page_size=2, api_url="http://vtex-catalog-cap.invalid", opener=opener)
+    assert len(list(client.catalog_search())) == 4
+    assert len(opener.urls) == 2
+
+
+def test_product_record_with_a_null_quantity_uses_the_offer():
+    product = {"productName": "Jif Creamy", "link": f"{STORE}/jif/p",
+               "items": [{"sellers": [{"commertialOffer": {"Price": 20, "AvailableQuantity": None}}]}]}
+    assert product_record(product, STORE)["price"] == "20,00"
+
+
+def test_product_record_falls_back_to_price_range_and_link_text():
+    product = {
+        "productName": "Jif Creamy",
+        "linkText": "jif-creamy",
+        "items": [{"sellers": [{"commertialOffer": {"Price": 20, "AvailableQuantity": 0}}]}],
+        "priceRange": {"sellingPrice": {"lowPrice": 18.5}},
+    }
+    assert product_record(product, STORE + "/") == {"description": "Jif Creamy", "price": "18,50",
+                                                    "url": f"{STORE}/jif-creamy/p"}
+
+
+def test_facets_from_url():
+    assert facets_from_url(f"{STORE}/adega/estados-unidos?map=category-1,origem") == \
+        ("category-1/adega/origem/estados-unidos", "")
+    assert facets_from_url(f"{STORE}/bourbon?map=ft") == ("", "bourbon")
+
+
+def test_format_brl():
+    assert format_brl(1234567.8) == "1.234.567,80"
+    assert format_brl(None) == "N/A"
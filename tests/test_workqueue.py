@@ -0,0 +1,108 @@
+import pytest
+
+from workqueue import DONE, FAILED, LEASE_EXPIRED, LEASED, MAX_ATTEMPTS, QUEUED, Unit, open_queue
+
+JOB = "test-job"
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def queue(request, tmp_path):
+    url = "memory://" if request.param == "memory" else "sqlite:///" + str(tmp_path / "queue.db")
+    return open_queue(url)
+
+
+def unit(n):
+    return Unit("aurora", f"bebidas/page={n}", "page", {"url": f"https://store.example/bebidas?page={n}", "page": n}, seq=1)
+
+
+def test_put_skips_units_already_queued(queue):
+    assert queue.put(JOB, [unit(1), unit(2)]) == 2
+    assert queue.put(JOB, [unit(2), unit(3)]) == 1
+    assert queue.counts(JOB) == {QUEUED: 3}
+
+
+def test_claim_leases_each_unit_once(queue):
+    queue.put(JOB, [unit(1), unit(2)])
+    first = queue.claim(JOB, "w1")
+    second = queue.claim(JOB, "w2")
+    assert {first.id, second.id} == {unit(1).id, unit(2).id}
+    assert first.attempts == second.attempts == 1
+    assert first.payload["page"] in (1, 2) and first.order == (1, first.payload["page"])
+    assert queue.claim(JOB, "w3") is None
+    assert queue.counts(JOB) == {LEASED: 2}
+
+
+def test_complete_stores_the_result(queue):
+    queue.put(JOB, [unit(1)])
+    claimed = queue.claim(JOB, "w1")
+    queue.complete(JOB, claimed, [{"description": "Bourbon"}])
+    assert queue.counts(JOB) == {DONE: 1}
+    [(done, result)] = queue.results(JOB)
+    assert done.id == claimed.id and result == [{"description": "Bourbon"}]
+    assert queue.claim(JOB, "w1") is None
+
+
+def test_renew_only_for_the_lease_owner(queue):
+    queue.put(JOB, [unit(1)])
+    claimed = queue.claim(JOB, "w1")
+    assert queue.renew(JOB, claimed, "w1")
+    assert not queue.renew(JOB, claimed, "w2")
+
+
+def test_fail_requeues_until_attempts_run_out(queue):
+    queue.put(JOB, [unit(1)])
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        claimed = queue.claim(JOB, "w1")
+        assert claimed.attempts == attempt
+        expected = FAILED if attempt == MAX_ATTEMPTS else QUEUED
+        assert queue.fail(JOB, claimed, "w1", f"boom {attempt}") == expected
+    assert queue.claim(JOB, "w1") is None
+    assert queue.counts(JOB) == {FAILED: 1}
+    [(failed, error)] = queue.failures(JOB)
+    assert failed.id == unit(1).id and error == f"boom {MAX_ATTEMPTS}"
+
+
+def test_fail_from_another_worker_is_ignored(queue):
+    queue.put(JOB, [unit(1)])
+    claimed = queue.claim(JOB, "w1")
+    assert queue.fail(JOB, claimed, "w2", "not mine") is None
+    assert queue.counts(JOB) == {LEASED: 1}
+    assert queue.renew(JOB, claimed, "w1")
+
+
+def test_expired_lease_goes_to_another_worker(queue):
+    queue.put(JOB, [unit(1)])
+    stale = queue.claim(JOB, "w1", lease=-1)
+    assert queue.counts(JOB) == {QUEUED: 1}
+
+    claimed = queue.claim(JOB, "w2")
+    assert claimed.id == stale.id and claimed.attempts == 2
+    # The first worker comes back too late: its failure doesn't touch w2's lease
+    assert queue.fail(JOB, stale, "w1", "slow") is None
+    assert not queue.renew(JOB, stale, "w1")
+    assert queue.counts(JOB) == {LEASED: 1}
+    assert queue.fail(JOB, claimed, "w2", "also slow") == QUEUED
+
+
+def test_exhausted_expired_lease_fails(queue):
+    queue.put(JOB, [unit(1), unit(2)])
+    # unit 1's worker keeps dying; unit 2 just waits its turn
+    for _ in range(MAX_ATTEMPTS):
+        claimed = queue.claim(JOB, "w1", lease=-1)
+        while claimed.id != unit(1).id:
+            queue.complete(JOB, claimed, [])
+            claimed = queue.claim(JOB, "w1", lease=-1)
+    assert queue.counts(JOB) == {FAILED: 1, DONE: 1}
+
+    assert queue.claim(JOB, "w2") is None
+    [(failed, error)] = queue.failures(JOB)
+    assert failed.id == unit(1).id and error == LEASE_EXPIRED
+
+
+def test_clear(queue):
+    queue.put(JOB, [unit(1)])
+    queue.put("other-job", [unit(1)])
+    queue.clear(JOB)
+    assert queue.counts(JOB) == {}
+    assert queue.counts("other-job") == {QUEUED: 1}
+    assert queue.put(JOB, [unit(1)]) == 1
@@ -0,0 +1,321 @@
+import argparse
+import http.client
+import json
+import os
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fixtures import load_fixtures, read_fixture, record_json, recording_enabled
+from governor import CircuitOpenError, get_governor
+from metrics import add_bytes, count_page, span
+from page_cache import get_cache
+
+# Shared client for the VTEX storefronts (Angeloni, Aurora, Zona Sul, Santa Luzia).
+# The product shelves rendered by the vtex-product-summary components are filled
+# from the intelligent-search JSON API, so we can read the same data over plain
+# HTTP instead of starting Chrome and scraping the spans.
+#
+# SCRAPER_VTEX_API_URL sends the API requests somewhere else (product links still
+# point at the store), e.g. at a local stub that replays the responses recorded with
+# SCRAPER_RECORD_FIXTURES=1:
+#
+#   python vtex_api.py --stub santaluzia      # serves fixtures/santaluzia on 127.0.0.1:8767
+#   SCRAPER_VTEX_API_URL=http://127.0.0.1:8767 python santaluzia.py
+
+INTELLIGENT_SEARCH_PATH = "/api/io/_v/api/intelligent-search/product_search/"
+CATALOG_SEARCH_PATH = "/api/catalog_system/pub/products/search/"
+
+# VTEX caps a single page of the catalog API at 50 products
+PAGE_SIZE = 50
+# Hard stop so a misbehaving store can't keep us paging forever
+MAX_PAGES = 50
+
+API_URL = os.environ.get("SCRAPER_VTEX_API_URL", "")
+STUB_PORT = 8767
+
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+
+
+class VtexApiError(Exception):
+    # Raised when the store refuses the API request (403, captcha page, bad JSON...)
+    # Callers catch this and fall back to the Selenium scraper.
+    pass
+
+
+def format_brl(value):
+    # Same shape as the currencyInteger + currencyDecimal + currencyFraction spans: "1.234,90"
+    if value is None:
+        return "N/A"
+    formatted = f"{value:,.2f}"
+    return formatted.replace(",", "_").replace(".", ",").replace("_", ".")
+
+
+def product_record(product, base_url):
+    # Map one API product to the {description, price, url} record the scrapers write
+    price = None
+    for item in product.get("items") or []:
+        for seller in item.get("sellers") or []:
+            offer = seller.get("commertialOffer") or {}
+            # A missing (or null) quantity doesn't mean out of stock
+            quantity = offer.get("AvailableQuantity")
+            if (quantity is None or quantity > 0) and offer.get("Price"):
+                price = offer["Price"]
+                break
+        if price is not None:
+            break
+    if price is None:
+        price = ((product.get("priceRange") or {}).get("sellingPrice") or {}).get("lowPrice")
+
+    link = product.get("link") or ""
+    if not link and product.get("linkText"):
+        link = f"/{product['linkText']}/p"
+    return {
+        "description": (product.get("productName") or "").strip(),
+        "price": format_brl(price),
+        "url": urllib.parse.urljoin(base_url.rstrip("/") + "/", urllib.parse.urlparse(link).path or link),
+    }
+
+
+def retailer_from_url(url):
+    # "https://www.santaluzia.com.br/..." -> "santaluzia"
+    host = urllib.parse.urlparse(url).netloc.split(":")[0]
+    parts = [p for p in host.split(".") if p not in ("www", "com", "br")]
+    return parts[0] if parts else host
+
+
+def facets_from_url(url):
+    # Turn a storefront search URL into the facet path + full-text query the API expects.
+    # e.g. /adega/estados-unidos?map=category-1,origem -> "category-1/adega/origem/estados-unidos"
+    parsed = urllib.parse.urlparse(url)
+    params = urllib.parse.parse_qs(parsed.query)
+    segments = [urllib.parse.unquote(s) for s in parsed.path.strip("/").split("/") if s]
+    keys = params.get("map", [""])[0].split(",") if params.get("map") else []
+    query = params.get("_q", params.get("query", [""]))[0]
+
+    facets = []
+    for key, value in zip(keys, segments):
+        if key == "ft":
+            # Full-text segments become the query, not a facet
+            query = query or value
+            continue
+        facets.extend([key, value])
+    return "/".join(facets), query
+
+
+class VtexClient:
+    def __init__(self, base_url, timeout=15, page_size=PAGE_SIZE, opener=None, retailer=None, api_url=None):
+        self.base_url = base_url.rstrip("/")
+        # Where the API requests go; the store itself unless SCRAPER_VTEX_API_URL says otherwise
+        self.api_url = (api_url or API_URL or base_url).rstrip("/")
+        self.retailer = retailer or retailer_from_url(base_url)
+        self.timeout = timeout
+        self.page_size = page_size
+        self.opener = opener or urllib.request.build_opener()
+
+    def _url(self, path, params):
+        return f"{self.api_url}{path}?{urllib.parse.urlencode(params, doseq=True)}"
+
+    def _get_json(self, path, params):
+        url = self._url(path, params)
+        request_headers = {
+            "Accept": "application/json",
+            "User-Agent": USER_AGENT,
+        }
+        # Fresh cached pages never hit the network; stale ones are revalidated if we can
+        cache = get_cache()
+        entry = cache.get(self.retailer, url) if cache else None
+        if entry is not None:
+            if entry.fresh:
+                return entry.json(), entry.headers
+            request_headers.update(entry.conditional_headers())
+
+        request = urllib.request.Request(url, headers=request_headers)
+
+        def get():
+            with span("http", self.retailer), self.opener.open(request, timeout=self.timeout) as response:
+                return response.read(), dict(response.headers)
+
+        # Paced, and retried on 429 / 5xx / timeouts, by the store's governor
+        try:
+            body, headers = get_governor(self.api_url).call(get, retailer=self.retailer)
+        except CircuitOpenError as e:
+            raise VtexApiError(str(e)) from e
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and entry is not None:
+                cache.refresh(entry)
+                return entry.json(), entry.headers
+            raise VtexApiError(f"{url} returned HTTP {e.code}") from e
+        except (http.client.HTTPException, OSError) as e:
+            # Connection refused or dropped, timeouts, truncated bodies...
+            raise VtexApiError(f"{url} failed: {type(e).__name__}: {e}") from e
+        add_bytes(len(body), "http", self.retailer)
+
+        try:
+            data = json.loads(body)
+        except ValueError as e:
+            # Bot protection answers with an HTML page instead of JSON
+            raise VtexApiError(f"{url} did not return JSON") from e
+        if cache:
+            cache.put(self.retailer, url, body.decode("utf-8"), "json", headers)
+        return data, headers
+
+    def intelligent_search(self, query="", facets=""):
+        # Page through intelligent-search until we've seen recordsFiltered products, or
+        # without a recordsFiltered until a page comes back empty or short
+        path = INTELLIGENT_SEARCH_PATH + facets.strip("/")
+        page = 1
+        seen = 0
+        while page <= MAX_PAGES:
+            params = {
+                "query": query,
+                "page": page,
+                "count": self.page_size,
+                "locale": "pt-BR",
+                "hideUnavailableItems": "false",
+            }
+            data, _ = self._get_json(path, params)
+            if not isinstance(data, dict) or "products" not in data:
+                raise VtexApiError(f"unexpected intelligent-search payload for {path}")
+
+            products = data["products"]
+            records = [product_record(product, self.base_url) for product in products]
+            count_page(len(records), self.retailer)
+            if recording_enabled():
+                record_json(self.retailer, self._url(path, params), data, "vtex", records)
+            yield from records
+            seen += len(products)
+
+            total = data.get("recordsFiltered")
+            if len(products) < self.page_size or (total is not None and seen >= total):
+                break
+            page += 1
+
+    def catalog_search(self, query="", facets=""):
+        # Older catalog_system endpoint; used when intelligent-search isn't installed on the store
+        path = CATALOG_SEARCH_PATH
+        params = {}
+        if query:
+            params["ft"] = query
+        if facets:
+            # catalog_system wants fq=key:value pairs instead of a facet path
+            parts = facets.strip("/").split("/")
+            params["fq"] = [f"{k}:{v}" for k, v in zip(parts[0::2], parts[1::2])]
+
+        start = 0
+        while start < self.page_size * MAX_PAGES:
+            page_params = dict(params, _from=start, _to=start + self.page_size - 1)
+            data, headers = self._get_json(path, page_params)
+            if not isinstance(data, list):
+                raise VtexApiError(f"unexpected catalog payload for {path}")
+
+            records = [product_record(product, self.base_url) for product in data]
+            count_page(len(records), self.retailer)
+            if recording_enabled():
+                record_json(self.retailer, self._url(path, page_params), data, "vtex-catalog", records)
+            yield from records
+
+            # "resources: 0-49/123" tells us the total; without it, a short page is the last
+            resources = headers.get("resources") or headers.get("Resources") or ""
+            total = int(resources.rsplit("/", 1)[1]) if "/" in resources else None
+            start += self.page_size
+            if len(data) < self.page_size or (total is not None and start >= total):
+                break
+
+    def search(self, query="", facets=""):
+        # Try intelligent-search first, then the catalog endpoint
+        try:
+            return list(self.intelligent_search(query, facets))
+        except VtexApiError as first_error:
+            try:
+                return list(self.catalog_search(query, facets))
+            except VtexApiError:
+                raise first_error
+
+    def search_url(self, storefront_url):
+        # Convenience for the scripts: pass the same URL they open in Chrome
+        facets, query = facets_from_url(storefront_url)
+        return self.search(query, facets)
+
+
+def fetch_products(storefront_url, base_url=None):
+    # Returns the product records for a storefront search URL, or raises VtexApiError
+    if base_url is None:
+        parsed = urllib.parse.urlparse(storefront_url)
+        base_url = f"{parsed.scheme}://{parsed.netloc}"
+    start_time = time.time()
+    products = VtexClient(base_url).search_url(storefront_url)
+    print(f"VTEX API returned {len(products)} products in {time.time() - start_time:.2f} seconds")
+    return products
+
+
+def serve_stub(retailer, port=STUB_PORT, fixtures_dir=None):
+    # Replays a retailer's recorded API responses: a request gets the recording for the
+    # same page (and the same facets and query, if one was recorded), or an empty result
+    searches = {}
+    catalog = {}
+    for fixture in load_fixtures(retailer, fixtures_dir):
+        parsed = urllib.parse.urlsplit(fixture.url)
+        params = urllib.parse.parse_qs(parsed.query)
+        if fixture.kind == "vtex":
+            facets = parsed.path.partition(INTELLIGENT_SEARCH_PATH)[2]
+            searches[(facets, params.get("query", [""])[0], params.get("page", ["1"])[0])] = read_fixture(fixture)
+        elif fixture.kind == "vtex-catalog":
+            catalog[params.get("_from", ["0"])[0]] = read_fixture(fixture)
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parsed = urllib.parse.urlsplit(self.path)
+            params = urllib.parse.parse_qs(parsed.query)
+            headers = {}
+            if INTELLIGENT_SEARCH_PATH in parsed.path:
+                page = params.get("page", ["1"])[0]
+                key = (parsed.path.partition(INTELLIGENT_SEARCH_PATH)[2], params.get("query", [""])[0], page)
+                payload = searches.get(key) or next(
+                    (data for (_, _, recorded_page), data in searches.items() if recorded_page == page),
+                    {"products": [], "recordsFiltered": 0},
+                )
+            elif CATALOG_SEARCH_PATH in parsed.path:
+                start = params.get("_from", ["0"])[0]
+                payload = catalog.get(start, [])
+                total = sum(len(products) for products in catalog.values())
+                headers["resources"] = f"{start}-{int(start) + len(payload) - 1}/{total}"
+            else:
+                self.send_error(404)
+                return
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    print(f"Replaying {len(searches) + len(catalog)} recorded page(s) of {retailer} at http://127.0.0.1:{server.server_port}")
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="VTEX storefront search API client")
+    parser.add_argument("target", help="storefront search URL, or the retailer to replay with --stub")
+    parser.add_argument("--base-url", help="store root, when it isn't the URL's host (Angeloni's /super)")
+    parser.add_argument("--stub", action="store_true", help="serve the retailer's recorded responses instead of searching")
+    parser.add_argument("--port", type=int, default=STUB_PORT)
+    parser.add_argument("--fixtures", help="fixture directory for --stub (default: fixtures/)")
+    args = parser.parse_args()
+
+    if args.stub:
+        try:
+            serve_stub(args.target, args.port, args.fixtures).serve_forever()
+        except KeyboardInterrupt:
+            pass
+    else:
+        for record in fetch_products(args.target, args.base_url):
+            print(f"{record['description']} | {record['price']} | {record['url']}")
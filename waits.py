@@ -0,0 +1,99 @@
+import time
+from collections import namedtuple
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+from metrics import span
+
+# Event-driven replacements for the fixed time.sleep() calls in the scrapers.
+# Every wait polls a condition with a short interval, gives up after `timeout`
+# seconds, and reports how long it actually waited:
+#
+#   result = wait_for_product_count_increase(driver, ".vtex-product-summary-2-x-brandName", 24)
+#   print(result)  # WaitResult(condition='product count increased', satisfied=True, waited=0.41, value=48)
+
+POLL_INTERVAL = 0.05
+DEFAULT_TIMEOUT = 10
+
+WaitResult = namedtuple("WaitResult", ["condition", "satisfied", "waited", "value"])
+
+
+def wait_until(driver, condition, timeout=DEFAULT_TIMEOUT, name="condition"):
+    # condition(driver) returns a truthy value once satisfied; that value ends up in the result
+    start_time = time.monotonic()
+    with span("wait"):
+        try:
+            value = WebDriverWait(driver, timeout, poll_frequency=POLL_INTERVAL,
+                                  ignored_exceptions=(WebDriverException,)).until(condition)
+            satisfied = True
+        except TimeoutException:
+            value = None
+            satisfied = False
+    return WaitResult(name, satisfied, round(time.monotonic() - start_time, 3), value)
+
+
+def wait_for_any_element(driver, css_selectors, timeout=DEFAULT_TIMEOUT):
+    # Page is ready as soon as any of the selectors matches (e.g. products OR the "not found" box)
+    def condition(d):
+        for selector in css_selectors:
+            if d.find_elements(By.CSS_SELECTOR, selector):
+                return selector
+        return False
+    return wait_until(driver, condition, timeout, "element present")
+
+
+def wait_for_product_count_increase(driver, css_selector, previous_count, timeout=DEFAULT_TIMEOUT):
+    def condition(d):
+        count = len(d.find_elements(By.CSS_SELECTOR, css_selector))
+        return count if count > previous_count else False
+    return wait_until(driver, condition, timeout, "product count increased")
+
+
+def wait_for_element_gone(driver, xpath, timeout=DEFAULT_TIMEOUT):
+    # For the "Mostrar mais" button: gone (or hidden) means everything is loaded
+    def condition(d):
+        elements = d.find_elements(By.XPATH, xpath)
+        return not any(e.is_displayed() for e in elements)
+    return wait_until(driver, condition, timeout, "button disappeared")
+
+
+# Stamps window.__lastMutation every time the DOM changes. Installed lazily so it
+# survives across waits on the same page but is re-added after a navigation.
+_MUTATION_OBSERVER_JS = """
+if (!window.__mutationObserver) {
+    window.__lastMutation = performance.now();
+    window.__mutationObserver = new MutationObserver(function () {
+        window.__lastMutation = performance.now();
+    });
+    window.__mutationObserver.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+}
+return performance.now() - window.__lastMutation;
+"""
+
+
+def wait_for_dom_quiet(driver, quiet_ms=300, timeout=DEFAULT_TIMEOUT):
+    def condition(d):
+        since_last_mutation = d.execute_script(_MUTATION_OBSERVER_JS)
+        return since_last_mutation >= quiet_ms
+    return wait_until(driver, condition, timeout, f"DOM quiet for {quiet_ms} ms")
+
+
+# Resource Timing entries appear when a request finishes; "network idle" is the
+# document being complete and no new entry for idle_ms.
+_NETWORK_STATE_JS = """
+var entries = performance.getEntriesByType('resource');
+var last = 0;
+for (var i = 0; i < entries.length; i++) {
+    if (entries[i].responseEnd > last) { last = entries[i].responseEnd; }
+}
+return [document.readyState, entries.length, performance.now() - last];
+"""
+
+
+def wait_for_network_idle(driver, idle_ms=500, timeout=DEFAULT_TIMEOUT):
+    def condition(d):
+        ready_state, _, since_last_response = d.execute_script(_NETWORK_STATE_JS)
+        return ready_state == "complete" and since_last_response >= idle_ms
+    return wait_until(driver, condition, timeout, f"network idle for {idle_ms} ms")
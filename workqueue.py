@@ -0,0 +1,637 @@
+import argparse
+import itertools
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import urllib.parse
+
+from retailers import MAX_PAGES, REGISTRY, fetch_api, fetch_search, get_fetcher, get_retailer, kept
+from sinks import make_record, open_sinks
+
+# Work-queue execution, so a scrape can be spread over several machines (each with its
+# own Chrome pool) instead of being capped by what one box can render. A scrape is
+# split into work units - retailer x category/query x page - that go onto a shared
+# queue; workers on any node claim units under a lease, run them, and store their
+# records; `merge` then writes the usual output files from all of them:
+#
+#   python workqueue.py enqueue santaluzia karamell --job nightly   # retailers.py names
+#   python workqueue.py work --job nightly -w 4            # on every node
+#   python workqueue.py status --job nightly
+#   python workqueue.py merge --job nightly
+#
+# SCRAPER_QUEUE picks the backend: sqlite:///path/queue.db (the default, one machine,
+# any number of worker processes), redis://host:6379/0 (several machines; needs the
+# redis package), or memory:// (an in-process stand-in with the same Redis interface).
+#
+# A worker renews its lease while a unit runs; if it dies, the lease runs out and
+# another worker picks the unit up. Units are retried MAX_ATTEMPTS times before they
+# count as failed. Results are keyed by unit, so a unit that ran twice (lease lost
+# mid-run) is stored once. A unit can add more units: page 1 of a listing enqueues
+# the listing's other pages once it knows how many there are.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+QUEUE_URL = os.environ.get("SCRAPER_QUEUE", "sqlite:///" + os.path.join(HERE, ".cache", "queue.db"))
+LEASE_SECONDS = float(os.environ.get("SCRAPER_QUEUE_LEASE", "300"))
+MAX_ATTEMPTS = 3
+# Error recorded for a unit whose last lease ran out without a result
+LEASE_EXPIRED = "lease expired; the worker died or hung"
+# How often an idle worker looks for units that other workers are still adding
+POLL_SECONDS = 2.0
+
+QUEUED = "queued"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+_worker_numbers = itertools.count(1)
+
+
+class Unit:
+    def __init__(self, retailer, key, kind, payload, seq=0, attempts=0):
+        self.retailer = retailer
+        self.key = key
+        self.kind = kind
+        self.payload = payload
+        # Units are merged in (seq, page) order: seq is the position in the plan, and
+        # the pages a unit adds share its seq
+        self.seq = seq
+        self.attempts = attempts
+
+    @property
+    def id(self):
+        return f"{self.retailer}:{self.key}"
+
+    @property
+    def order(self):
+        return self.seq, self.payload.get("page", 0)
+
+    def to_json(self):
+        return json.dumps({"retailer": self.retailer, "key": self.key, "kind": self.kind,
+                           "payload": self.payload, "seq": self.seq}, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, text, attempts=0):
+        data = json.loads(text)
+        return cls(data["retailer"], data["key"], data["kind"], data["payload"], data["seq"], attempts)
+
+    def __repr__(self):
+        return f"Unit({self.id!r}, {self.kind!r})"
+
+
+# --- SQLite backend
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    job TEXT NOT NULL,
+    id TEXT NOT NULL,
+    unit TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    result TEXT,
+    error TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (job, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS units_claim ON units (job, status, lease_until);
+"""
+
+
+class SqliteQueue:
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # isolation_level=None: transactions are opened explicitly (BEGIN IMMEDIATE), so
+        # two workers can't claim the same unit
+        self._connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def _write(self, sql, params=()):
+        with self._lock:
+            return self._connection.execute(sql, params).rowcount
+
+    def put(self, job, units):
+        # Units already on the queue (by retailer and key) are left alone; returns how many were added
+        now = time.time()
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                added = sum(self._connection.execute(
+                    "INSERT OR IGNORE INTO units (job, id, unit, status, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (job, unit.id, unit.to_json(), QUEUED, now),
+                ).rowcount for unit in units)
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+        return added
+
+    def claim(self, job, worker, lease=LEASE_SECONDS):
+        # The next queued unit (or one whose lease ran out), leased to worker; None if there is none
+        now = time.time()
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                # A unit whose worker keeps dying on it (Chrome running out of memory)
+                # never reaches fail(); it fails here once its last lease runs out
+                self._connection.execute(
+                    "UPDATE units SET status = ?, error = ?, lease_until = NULL, updated_at = ? "
+                    "WHERE job = ? AND status = ? AND lease_until < ? AND attempts >= ?",
+                    (FAILED, LEASE_EXPIRED, now, job, LEASED, now, MAX_ATTEMPTS),
+                )
+                row = self._connection.execute(
+                    "SELECT id, unit, attempts FROM units WHERE job = ? AND "
+                    "(status = ? OR (status = ? AND lease_until < ?)) ORDER BY updated_at LIMIT 1",
+                    (job, QUEUED, LEASED, now),
+                ).fetchone()
+                if row is not None:
+                    self._connection.execute(
+                        "UPDATE units SET status = ?, worker = ?, lease_until = ?, attempts = attempts + 1, "
+                        "updated_at = ? WHERE job = ? AND id = ?",
+                        (LEASED, worker, now + lease, now, job, row[0]),
+                    )
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+        return Unit.from_json(row[1], row[2] + 1) if row else None
+
+    def renew(self, job, unit, worker, lease=LEASE_SECONDS):
+        # Extends the lease; False if the unit is no longer ours
+        return self._write(
+            "UPDATE units SET lease_until = ? WHERE job = ? AND id = ? AND status = ? AND worker = ?",
+            (time.time() + lease, job, unit.id, LEASED, worker),
+        ) > 0
+
+    def complete(self, job, unit, result):
+        self._write(
+            "UPDATE units SET status = ?, result = ?, error = NULL, lease_until = NULL, updated_at = ? "
+            "WHERE job = ? AND id = ?",
+            (DONE, json.dumps(result, ensure_ascii=False), time.time(), job, unit.id),
+        )
+
+    def fail(self, job, unit, worker, error):
+        # Back on the queue, unless it has used up its attempts; None if the unit is no
+        # longer worker's (its lease ran out and another worker has it now)
+        status = FAILED if unit.attempts >= MAX_ATTEMPTS else QUEUED
+        updated = self._write(
+            "UPDATE units SET status = ?, error = ?, lease_until = NULL, updated_at = ? "
+            "WHERE job = ? AND id = ? AND status = ? AND worker = ?",
+            (status, error, time.time(), job, unit.id, LEASED, worker),
+        )
+        return status if updated else None
+
+    def counts(self, job):
+        # status -> number of units; expired leases count as queued, or as failed once
+        # the unit has used up its attempts
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT CASE WHEN status = ? AND lease_until < ? THEN (CASE WHEN attempts >= ? THEN ? ELSE ? END) "
+                "ELSE status END, COUNT(*) FROM units WHERE job = ? GROUP BY 1",
+                (LEASED, time.time(), MAX_ATTEMPTS, FAILED, QUEUED, job),
+            ).fetchall()
+        return dict(rows)
+
+    def results(self, job):
+        # (unit, result) for every finished unit
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT unit, result FROM units WHERE job = ? AND status = ?", (job, DONE)
+            ).fetchall()
+        return [(Unit.from_json(unit), json.loads(result)) for unit, result in rows]
+
+    def failures(self, job):
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT unit, error FROM units WHERE job = ? AND status = ?", (job, FAILED)
+            ).fetchall()
+        return [(Unit.from_json(unit), error) for unit, error in rows]
+
+    def clear(self, job):
+        self._write("DELETE FROM units WHERE job = ?", (job,))
+
+
+# --- Redis backend
+
+class RedisQueue:
+    # Per job: a hash of units, a list of queued unit ids, a sorted set of leases (id ->
+    # expiry) and hashes for status, attempts, owner, results and errors. Only plain
+    # commands are used (no Lua), so LocalRedis can stand in for a server.
+    def __init__(self, client, prefix="scraper:queue"):
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, job, name):
+        return f"{self.prefix}:{job}:{name}"
+
+    def put(self, job, units):
+        added = 0
+        for unit in units:
+            if self.client.hsetnx(self._key(job, "units"), unit.id, unit.to_json()):
+                self.client.hset(self._key(job, "status"), unit.id, QUEUED)
+                self.client.rpush(self._key(job, "queue"), unit.id)
+                added += 1
+        return added
+
+    def _requeue_expired(self, job):
+        # Whoever manages to remove an expired lease puts the unit back on the queue, or
+        # fails it if it has used up its attempts (see SqliteQueue.claim)
+        for unit_id in self.client.zrangebyscore(self._key(job, "leases"), 0, time.time()):
+            if self.client.zrem(self._key(job, "leases"), unit_id):
+                if int(self.client.hget(self._key(job, "attempts"), unit_id) or 0) >= MAX_ATTEMPTS:
+                    self.client.hset(self._key(job, "errors"), unit_id, LEASE_EXPIRED)
+                    self.client.hset(self._key(job, "status"), unit_id, FAILED)
+                else:
+                    self.client.hset(self._key(job, "status"), unit_id, QUEUED)
+                    self.client.rpush(self._key(job, "queue"), unit_id)
+
+    def claim(self, job, worker, lease=LEASE_SECONDS):
+        self._requeue_expired(job)
+        while True:
+            unit_id = self.client.lpop(self._key(job, "queue"))
+            if unit_id is None:
+                return None
+            # A unit that was requeued and then finished by its first worker after all
+            if self.client.hget(self._key(job, "status"), unit_id) == QUEUED:
+                break
+        self.client.zadd(self._key(job, "leases"), {unit_id: time.time() + lease})
+        self.client.hset(self._key(job, "owner"), unit_id, worker)
+        self.client.hset(self._key(job, "status"), unit_id, LEASED)
+        attempts = self.client.hincrby(self._key(job, "attempts"), unit_id, 1)
+        return Unit.from_json(self.client.hget(self._key(job, "units"), unit_id), attempts)
+
+    def renew(self, job, unit, worker, lease=LEASE_SECONDS):
+        if self.client.hget(self._key(job, "owner"), unit.id) != worker or \
+                self.client.zscore(self._key(job, "leases"), unit.id) is None:
+            return False
+        self.client.zadd(self._key(job, "leases"), {unit.id: time.time() + lease})
+        return True
+
+    def complete(self, job, unit, result):
+        self.client.hset(self._key(job, "results"), unit.id, json.dumps(result, ensure_ascii=False))
+        self.client.hset(self._key(job, "status"), unit.id, DONE)
+        self.client.zrem(self._key(job, "leases"), unit.id)
+
+    def fail(self, job, unit, worker, error):
+        if self.client.hget(self._key(job, "status"), unit.id) != LEASED or \
+                self.client.hget(self._key(job, "owner"), unit.id) != worker:
+            return None
+        self.client.zrem(self._key(job, "leases"), unit.id)
+        self.client.hset(self._key(job, "errors"), unit.id, error)
+        status = FAILED if unit.attempts >= MAX_ATTEMPTS else QUEUED
+        self.client.hset(self._key(job, "status"), unit.id, status)
+        if status == QUEUED:
+            self.client.rpush(self._key(job, "queue"), unit.id)
+        return status
+
+    def counts(self, job):
+        expired = set(self.client.zrangebyscore(self._key(job, "leases"), 0, time.time()))
+        attempts = self.client.hgetall(self._key(job, "attempts"))
+        counts = {}
+        for unit_id, status in self.client.hgetall(self._key(job, "status")).items():
+            if unit_id in expired:
+                status = FAILED if int(attempts.get(unit_id, 0)) >= MAX_ATTEMPTS else QUEUED
+            counts[status] = counts.get(status, 0) + 1
+        return counts
+
+    def results(self, job):
+        units = self.client.hgetall(self._key(job, "units"))
+        return [(Unit.from_json(units[unit_id]), json.loads(result))
+                for unit_id, result in self.client.hgetall(self._key(job, "results")).items()]
+
+    def failures(self, job):
+        units = self.client.hgetall(self._key(job, "units"))
+        errors = self.client.hgetall(self._key(job, "errors"))
+        return [(Unit.from_json(units[unit_id]), errors.get(unit_id))
+                for unit_id, status in self.client.hgetall(self._key(job, "status")).items() if status == FAILED]
+
+    def clear(self, job):
+        self.client.delete(*(self._key(job, name) for name in
+                             ("units", "queue", "leases", "status", "attempts", "owner", "results", "errors")))
+
+
+class LocalRedis:
+    # In-process stand-in for the handful of Redis commands RedisQueue uses (same
+    # signatures and return values as redis-py with decode_responses=True)
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.RLock()
+
+    def _get(self, name, kind):
+        return self._data.setdefault(name, kind())
+
+    def hsetnx(self, name, key, value):
+        with self._lock:
+            values = self._get(name, dict)
+            if key in values:
+                return 0
+            values[key] = value
+            return 1
+
+    def hset(self, name, key, value):
+        with self._lock:
+            values = self._get(name, dict)
+            added = key not in values
+            values[key] = value
+            return int(added)
+
+    def hget(self, name, key):
+        with self._lock:
+            return self._data.get(name, {}).get(key)
+
+    def hgetall(self, name):
+        with self._lock:
+            return dict(self._data.get(name, {}))
+
+    def hincrby(self, name, key, amount=1):
+        with self._lock:
+            values = self._get(name, dict)
+            values[key] = str(int(values.get(key, 0)) + amount)
+            return int(values[key])
+
+    def rpush(self, name, *values):
+        with self._lock:
+            items = self._get(name, list)
+            items.extend(values)
+            return len(items)
+
+    def lpop(self, name):
+        with self._lock:
+            items = self._data.get(name)
+            return items.pop(0) if items else None
+
+    def zadd(self, name, mapping):
+        with self._lock:
+            scores = self._get(name, dict)
+            added = sum(member not in scores for member in mapping)
+            scores.update(mapping)
+            return added
+
+    def zrem(self, name, *members):
+        with self._lock:
+            scores = self._data.get(name, {})
+            return sum(scores.pop(member, None) is not None for member in members)
+
+    def zscore(self, name, member):
+        with self._lock:
+            return self._data.get(name, {}).get(member)
+
+    def zrangebyscore(self, name, min, max):
+        with self._lock:
+            scores = self._data.get(name, {})
+            return [member for member, score in sorted(scores.items(), key=lambda item: item[1])
+                    if min <= score <= max]
+
+    def delete(self, *names):
+        with self._lock:
+            return sum(self._data.pop(name, None) is not None for name in names)
+
+
+def open_queue(url=None):
+    url = url or QUEUE_URL
+    scheme = urllib.parse.urlsplit(url).scheme
+    if scheme == "sqlite":
+        return SqliteQueue(url[len("sqlite:///"):] if url.startswith("sqlite:///") else url[len("sqlite://"):])
+    if scheme == "memory":
+        return RedisQueue(LocalRedis())
+    if scheme in ("redis", "rediss"):
+        try:
+            import redis
+        except ImportError:
+            raise SystemExit("The redis backend needs the redis package: pip install redis")
+        return RedisQueue(redis.Redis.from_url(url, decode_responses=True))
+    raise ValueError(f"unknown queue backend '{url}' (expected sqlite:///, redis:// or memory://)")
+
+
+# --- what the units do
+
+HANDLERS = {}
+
+
+def handler(kind):
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+def page_unit(parent, page, follow=False):
+    # Another result page of parent's search ("adega" -> "adega/page=1", "page=1" -> "page=2")
+    prefix = parent.key.rpartition("page=")[0] if parent.kind == "page" else parent.key + "/"
+    return Unit(parent.retailer, f"{prefix}page={page}", "page", dict(parent.payload, page=page, follow=follow),
+                parent.seq)
+
+
+@handler("page")
+def run_page(unit):
+    # One result page, over plain HTTP or a browser (fetcher.py). Page 1 adds the
+    # listing's other pages.
+    retailer = get_retailer(unit.retailer)
+    search = retailer.searches[unit.payload["search"]]
+    page_number = unit.payload.get("page", 1)
+    page = get_fetcher(retailer).fetch(retailer.page_url(search, page_number), need_html=page_number == 1)
+    records = page.records
+
+    more = []
+    if page_number == 1 and records:
+        pages = retailer.page_count(page.html, len(records))
+        if pages:
+            more = [page_unit(unit, n) for n in range(2, min(pages, MAX_PAGES) + 1)]
+        else:
+            # No page count: go on one page at a time until an empty one
+            more = [page_unit(unit, 2, follow=True)]
+    elif unit.payload.get("follow") and records and page_number < MAX_PAGES:
+        more = [page_unit(unit, page_number + 1, follow=True)]
+    return records, more
+
+
+@handler("api")
+def run_api(unit):
+    # A whole search from the store's API; if the store refuses it, its result pages
+    # go onto the queue instead
+    retailer = get_retailer(unit.retailer)
+    records = fetch_api(retailer, retailer.searches[unit.payload["search"]])
+    if records is None:
+        return [], [page_unit(unit, 1)]
+    return records, []
+
+
+@handler("search")
+def run_search(unit):
+    # A listing that has to be read in one go ("Mostrar mais" in one browser session)
+    retailer = get_retailer(unit.retailer)
+    return fetch_search(retailer, retailer.searches[unit.payload["search"]]), []
+
+
+# --- what goes on the queue, and where the results go
+
+def plan(retailer):
+    # One unit per search; searches read page by page are split into their pages once
+    # page 1 (or the API, if it refuses us) says how many there are
+    for index, search in enumerate(retailer.searches):
+        key = search.category or f"search={index + 1}"
+        payload = {"search": index}
+        if retailer.pagination != "pages":
+            yield Unit(retailer.name, key, "search", payload)
+        elif retailer.source:
+            yield Unit(retailer.name, key, "api", payload)
+        else:
+            yield page_unit(Unit(retailer.name, key, "api", payload), 1)
+
+
+def enqueue(queue, job, retailers):
+    units = []
+    for name in retailers:
+        units.extend(plan(get_retailer(name)))
+    for seq, unit in enumerate(units):
+        unit.seq = seq
+    return queue.put(job, units)
+
+
+def merge(queue, job, retailers=None):
+    # Writes each retailer's output from its finished units, in plan and page order;
+    # returns {retailer: products written}
+    by_retailer = {}
+    for unit, records in sorted(queue.results(job), key=lambda item: item[0].order):
+        by_retailer.setdefault(unit.retailer, []).append((unit, records))
+
+    written = {}
+    for name, results in by_retailer.items():
+        if retailers and name not in retailers:
+            continue
+        retailer = get_retailer(name)
+        seen = set()
+        with open_sinks(name, retailer.output, retailer.columns, csv_missing=retailer.missing) as sink:
+            for unit, records in results:
+                category = retailer.searches[unit.payload["search"]].category
+                for record in kept(retailer, records):
+                    # Pages overlap when a listing shifts while it is being read; a
+                    # product is kept once per category, like retailers.run does
+                    key = (category, record["url"])
+                    if record["url"] and key in seen:
+                        continue
+                    seen.add(key)
+                    sink.write(make_record(name, record["description"], url=record["url"],
+                                           price=record.get("price"), category=category))
+        written[name] = sink.count
+        print(f"[{name}] {sink.count} products from {len(results)} unit(s)"
+              + (f" written to '{retailer.output}'" if retailer.output else ""))
+    return written
+
+
+# --- workers
+
+class Worker:
+    def __init__(self, queue, job, name=None, lease=LEASE_SECONDS):
+        self.queue = queue
+        self.job = job
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}:{next(_worker_numbers)}"
+        self.lease = lease
+        self.done = 0
+        self.failed = 0
+
+    def _keep_leased(self, unit, finished):
+        # Renews the lease every third of its length until the unit finishes
+        while not finished.wait(self.lease / 3):
+            if not self.queue.renew(self.job, unit, self.name, self.lease):
+                print(f"[{unit.id}] lease lost; another worker may run it too")
+                return
+
+    def run_unit(self, unit):
+        finished = threading.Event()
+        keeper = threading.Thread(target=self._keep_leased, args=(unit, finished), daemon=True)
+        keeper.start()
+        start_time = time.time()
+        try:
+            records, more = HANDLERS[unit.kind](unit)
+        except Exception as e:
+            status = self.queue.fail(self.job, unit, self.name, f"{type(e).__name__}: {e}")
+            self.failed += 1
+            print(f"[{unit.id}] attempt {unit.attempts} failed ({type(e).__name__}: {e}); "
+                  + (status or "lease lost, left to the worker that has it now"))
+            return
+        finally:
+            finished.set()
+        if more:
+            self.queue.put(self.job, more)
+        self.queue.complete(self.job, unit, records)
+        self.done += 1
+        print(f"[{unit.id}] {len(records)} products in {time.time() - start_time:.2f} seconds"
+              + (f", {len(more)} more unit(s) queued" if more else ""))
+
+    def run(self, wait=True):
+        # Works until the queue is drained: nothing queued and nothing leased. With
+        # wait, units leased by other workers are waited for (they may add pages, or
+        # their lease may run out).
+        while True:
+            unit = self.queue.claim(self.job, self.name, self.lease)
+            if unit is not None:
+                self.run_unit(unit)
+                continue
+            counts = self.queue.counts(self.job)
+            if not wait or not counts.get(LEASED):
+                return
+            time.sleep(POLL_SECONDS)
+
+
+def work(queue, job, workers=1):
+    # `workers` threads on this node, sharing its browser pool
+    os.environ.setdefault("SCRAPER_POOL_SIZE", str(workers))
+    node_workers = [Worker(queue, job) for _ in range(workers)]
+    threads = [threading.Thread(target=worker.run) for worker in node_workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(w.done for w in node_workers), sum(w.failed for w in node_workers)
+
+
+def print_status(queue, job):
+    counts = queue.counts(job)
+    print(f"Job '{job}': " + (", ".join(f"{counts[s]} {s}" for s in (QUEUED, LEASED, DONE, FAILED) if s in counts) or "empty"))
+    for unit, error in queue.failures(job):
+        print(f"  {unit.id} failed: {error}")
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Spread scrapes over workers through a shared queue")
+    parser.add_argument("--queue", default=QUEUE_URL, help="sqlite:///path, redis://host:port/db or memory://")
+    parser.add_argument("--job", default="default", help="name of the scrape the units belong to")
+    commands = parser.add_subparsers(dest="command", required=True)
+    enqueue_parser = commands.add_parser("enqueue", help="put retailers' work units on the queue")
+    enqueue_parser.add_argument("retailers", nargs="*", help=f"default: all of {', '.join(REGISTRY)}")
+    work_parser = commands.add_parser("work", help="claim and run units until the queue is drained")
+    work_parser.add_argument("-w", "--workers", type=int, default=1)
+    commands.add_parser("status", help="units per status, and the failures")
+    merge_parser = commands.add_parser("merge", help="write the output files from the finished units")
+    merge_parser.add_argument("retailers", nargs="*")
+    commands.add_parser("clear", help="drop the job from the queue")
+    args = parser.parse_args()
+
+    queue = open_queue(args.queue)
+    if args.command == "enqueue":
+        names = args.retailers or list(REGISTRY)
+        unknown = [name for name in names if name not in REGISTRY]
+        if unknown:
+            parser.error(f"unknown retailer(s): {', '.join(unknown)}")
+        print(f"{enqueue(queue, args.job, names)} unit(s) queued for job '{args.job}'")
+    elif args.command == "work":
+        start_time = time.time()
+        done, failed = work(queue, args.job, args.workers)
+        print(f"{done} unit(s) done, {failed} failed attempt(s) in {time.time() - start_time:.2f} seconds")
+    elif args.command == "status":
+        print_status(queue, args.job)
+    elif args.command == "merge":
+        counts = print_status(queue, args.job)
+        merge(queue, args.job, args.retailers)
+        sys.exit(0 if not counts.get(QUEUED) and not counts.get(LEASED) and not counts.get(FAILED) else 1)
+    elif args.command == "clear":
+        queue.clear(args.job)
+        print(f"Job '{args.job}' cleared.")